@@ -1,14 +1,117 @@
-import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware  # ADD THIS
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, Response
+from pydantic import BaseModel, Field
 
 # Import from main.py
-from main import OUTPUT_COLUMNS, prepare_data_for_place
+from main import OUTPUT_COLUMNS, PLACES, build_network
+from src import artifacts, http_cache, instrument, payload
+from src.jobs import DeadlineExceededError, NetworkBuilder, QueueFullError
+from src.query import EdgeIndex, edge_mask, select_columns
+from src.rescore import PARAMETERS, CategoryCodes, rescore
+from src.stressmodel.composite import PROFILES, profile_column
+from src.stressmodel.spec import SPEC
+
+# Cities loaded (or built in the background) at startup, separated by "|"
+WARM_PLACES = [
+    p.strip()
+    for p in os.environ.get("BIKE_STRESS_WARM_PLACES", "|".join(PLACES)).split("|")
+    if p.strip()
+]
+
+# Number of cities built at the same time
+BUILD_WORKERS = int(os.environ.get("BIKE_STRESS_BUILD_WORKERS", "1"))
+
+# Maximum number of builds queued or running before requests get a 503
+BUILD_MAX_PENDING = int(os.environ.get("BIKE_STRESS_BUILD_MAX_PENDING", "4"))
+
+# "process" or "thread"
+BUILD_EXECUTOR = os.environ.get("BIKE_STRESS_BUILD_EXECUTOR", "process")
+
+# Longest a request waits for a build (seconds), below the gateway timeout
+REQUEST_TIMEOUT = float(os.environ.get("BIKE_STRESS_REQUEST_TIMEOUT", "25"))
+
+# Retry-After (seconds) sent with 503 responses
+RETRY_AFTER = int(os.environ.get("BIKE_STRESS_RETRY_AFTER", "30"))
+
+# max-age (seconds) of GET /networks/{slug}, which browsers then revalidate
+NETWORK_MAX_AGE = int(os.environ.get("BIKE_STRESS_NETWORK_MAX_AGE", "0"))
+
+# Level of the stage timing logs (one JSON line per pipeline stage)
+LOG_LEVEL = os.environ.get("BIKE_STRESS_LOG_LEVEL", "INFO")
+
+logging.basicConfig(level=LOG_LEVEL, format="%(message)s")
+
+# Prometheus metrics are optional: /metrics needs prometheus_client
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+if prometheus_client is not None:
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "bike_stress_stage_seconds",
+        "Wall time of pipeline stages",
+        ["stage"],
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600),
+    )
+    STAGE_CPU_SECONDS = prometheus_client.Histogram(
+        "bike_stress_stage_cpu_seconds",
+        "CPU time of pipeline stages",
+        ["stage"],
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600),
+    )
+    STAGE_RSS = prometheus_client.Gauge(
+        "bike_stress_stage_rss_delta_bytes",
+        "RSS change over the last run of each pipeline stage",
+        ["stage"],
+    )
+    STAGE_PEAK_RSS = prometheus_client.Gauge(
+        "bike_stress_stage_peak_rss_growth_bytes",
+        "Growth of the process's peak RSS during the last run of each stage",
+        ["stage"],
+    )
+    STAGE_ROWS = prometheus_client.Gauge(
+        "bike_stress_stage_rows",
+        "Rows produced by the last run of each pipeline stage",
+        ["stage", "place"],
+    )
+
+    def record_stage_metrics(record: instrument.StageRecord):
+        STAGE_SECONDS.labels(record.name).observe(record.wall_s)
+        STAGE_CPU_SECONDS.labels(record.name).observe(record.cpu_s)
+        STAGE_RSS.labels(record.name).set(record.rss_delta_bytes)
+        STAGE_PEAK_RSS.labels(record.name).set(record.peak_rss_growth_bytes)
+        if record.rows is not None:
+            STAGE_ROWS.labels(record.name, record.place or "").set(record.rows)
+
+    instrument.add_sink(record_stage_metrics)
+
+builder = NetworkBuilder(
+    build_network,
+    max_workers=BUILD_WORKERS,
+    max_pending=BUILD_MAX_PENDING,
+    executor=BUILD_EXECUTOR,
+)
 
-app = FastAPI(title="Bike Stress Network API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load prebuilt artifacts, start background builds for missing cities
+    builder.warm(WARM_PLACES)
+    yield
+    builder.shutdown()
+
+
+app = FastAPI(title="Bike Stress Network API", lifespan=lifespan)
 
 # ADD CORS MIDDLEWARE
 app.add_middleware(
@@ -24,9 +127,63 @@ app.add_middleware(
 
 class NetworkRequest(BaseModel):
     city: str
+    profile: str | None = None  # weight profile used for "composite_score"
+    # seconds to wait for a build, capped by REQUEST_TIMEOUT
+    timeout: float | None = Field(None, gt=0)
+
+    # --- filters, for partial responses ---
+    bbox: tuple[float, float, float, float] | None = None  # minx, miny, maxx, maxy (WGS84)
+    min_score: float | None = None  # on "composite_score" (after applying profile)
+    max_score: float | None = None
+    separation_level: list[str] | None = None
+    columns: list[str] | None = None  # output columns, geometry is always included
+
+    # --- output geometry ---
+    format: str = "geojson"  # "geojson" or "topojson"
+    simplify: float | None = None  # tolerance in meters, default SIMPLIFY_TOLERANCE
+    precision: int | None = None  # coordinate decimals, default COORDINATE_PRECISION
 
     class Config:
-        json_schema_extra = {"example": {"city": "Somerville, Massachusetts, USA"}}
+        json_schema_extra = {
+            "example": {
+                "city": "Somerville, Massachusetts, USA",
+                "profile": "child",
+                "bbox": [-71.11, 42.38, -71.09, 42.39],
+                "min_score": 2.5,
+                "columns": ["name", "separation_level", "composite_score"],
+            }
+        }
+
+
+class CategoryData(BaseModel):
+    score: float
+    displayLabel: str | None = None
+    img: str | None = None
+    notes: str | None = None
+
+
+class ParameterData(BaseModel):
+    weight: float
+    displayLabel: str | None = None
+    img: str | None = None
+    link: str | None = None
+    notes: str | None = None
+    defaultCategory: str | int | None = None
+    categories: dict[str, CategoryData]
+
+
+class BikeInfrastructureModel(BaseModel):
+    """Same shape as the frontend's BikeInfrastructureModel (frontend/src/types.ts)."""
+
+    separation_level: ParameterData
+    street_classification: ParameterData
+    speed_limit: ParameterData
+
+
+class RescoreRequest(BaseModel):
+    city: str
+    model: BikeInfrastructureModel
+    format: str = "binary"  # "binary" (float32 array) or "json"
 
 
 @app.get("/")
@@ -36,44 +193,199 @@ def read_root():
         "message": "Bike Stress Network API",
         "endpoints": {
             "/getNetwork": "POST - Get bike network GeoJSON for a place",
+            "/model": "GET - Model spec (categories, scores, weights) and its hash",
+            "/profiles": "GET - Weight profiles available for composite scores",
+            "/networks/{slug}": "GET - Full network GeoJSON of a built place (cacheable)",
+            "/rescore": "POST - Composite scores for a place under a model configuration",
+            "/jobs": "POST - Start building a place in the background",
+            "/jobs/{job_id}": "GET - Status of a background build",
             "/docs": "Interactive API documentation",
         },
     }
 
 
+@app.get("/model")
+def get_model():
+    """
+    The model spec shared with the frontend (see src/stressmodel/model_spec.json).
+    "hash" changes whenever the spec does, and is part of every artifact key.
+    """
+    return {"version": SPEC.version, "hash": SPEC.hash, "spec": SPEC.raw}
+
+
+@app.get("/profiles")
+def get_profiles():
+    """Weight profiles available for composite scores."""
+    return PROFILES
+
+
+def serialize_network(edges, index, request: NetworkRequest) -> str:
+    """Filter scored edges and convert them to the GeoJSON string served by /getNetwork."""
+    with instrument.stage("serialize", request.city) as record:
+        geojson = _serialize_network(edges, index, request)
+        record.rows = len(edges)
+    return geojson
+
+
+def _serialize_network(edges, index, request: NetworkRequest) -> str:
+    score_column = (
+        "composite_score"
+        if request.profile is None
+        else profile_column(request.profile)
+    )
+
+    # Keep only the requested edges
+    mask = edge_mask(
+        edges,
+        index,
+        bbox=request.bbox,
+        min_score=request.min_score,
+        max_score=request.max_score,
+        separation_level=request.separation_level,
+        score_column=score_column,
+    )
+    if not mask.all():
+        edges = edges[mask]
+
+    # Use the requested profile as the composite score
+    if request.profile is not None:
+        edges = edges.assign(composite_score=edges[score_column])
+
+    # Keep only the requested columns, plus the edge's position in the
+    # full network (the index of its score in /rescore responses)
+    edges = select_columns(edges, request.columns).assign(
+        edge_id=np.flatnonzero(mask)
+    )
+
+    # Add "_python" suffix to all computed score columns
+    score_columns = [
+        "lanes_int_score",
+        "maxspeed_int_score",
+        "separation_level_score",
+        "street_classification_score",
+        "composite_score",
+    ]
+    edges = edges.rename(columns={col: f"{col}_python" for col in score_columns})
+
+    # Convert to GeoJSON (or TopoJSON), with simplified, rounded geometries
+    return payload.serialize(
+        edges,
+        request.format,
+        tolerance=(
+            payload.SIMPLIFY_TOLERANCE if request.simplify is None else request.simplify
+        ),
+        precision=(
+            payload.COORDINATE_PRECISION
+            if request.precision is None
+            else request.precision
+        ),
+    )
+
+
+def queue_full(e: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Too many cities are being built ({e}), try again later",
+        headers={"Retry-After": str(RETRY_AFTER)},
+    )
+
+
+def validate_request(request: NetworkRequest):
+    if request.profile is not None and request.profile not in PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile '{request.profile}', expected one of {list(PROFILES)}",
+        )
+
+    if request.format not in payload.FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{request.format}', expected one of {list(payload.FORMATS)}",
+        )
+
+    if request.simplify is not None and request.simplify < 0:
+        raise HTTPException(status_code=400, detail="simplify must be >= 0")
+
+    if request.precision is not None and not 0 <= request.precision <= 15:
+        raise HTTPException(status_code=400, detail="precision must be between 0 and 15")
+
+    if request.columns is not None:
+        unknown = [col for col in request.columns if col not in OUTPUT_COLUMNS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown columns {unknown}, expected any of {OUTPUT_COLUMNS}",
+            )
+
+
+@app.get("/metrics")
+def metrics():
+    """Pipeline stage metrics in the Prometheus text format."""
+    if prometheus_client is None:
+        raise HTTPException(
+            status_code=501, detail="Metrics need the prometheus_client package"
+        )
+    return Response(
+        prometheus_client.generate_latest(),
+        media_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
+
+
 @app.post("/getNetwork")
-def get_network_geojson(request: NetworkRequest):
+async def get_network_geojson(request: NetworkRequest):
     """
     Get the bike network GeoJSON for a place.
 
     Example request body:
     {
-        "city": "Somerville, Massachusetts, USA"
+        "city": "Somerville, Massachusetts, USA",
+        "profile": "child"
     }
+
+    Every profile score is returned as "composite_score_<profile>";
+    "composite_score" holds the requested profile (default: "default").
+
+    Optional filters return only part of the network: "bbox" (edges
+    intersecting the box), "min_score"/"max_score" (on the composite score),
+    "separation_level" (list of levels) and "columns" (output columns).
+
+    Geometries are simplified ("simplify", tolerance in meters) and rounded
+    ("precision", decimals); "format": "topojson" returns a TopoJSON
+    topology with the features in its "streets" object.
+
+    Uncached places are built on request; concurrent requests for the same
+    place wait on a single shared build. Returns 503 (with Retry-After) if
+    too many builds are queued, and 504 if the build does not finish within
+    the request timeout.
     """
+    validate_request(request)
+
+    timeout = REQUEST_TIMEOUT
+    if request.timeout is not None:
+        timeout = min(request.timeout, REQUEST_TIMEOUT)
+    deadline = time.time() + timeout
+
     try:
-        # Process the data
-        nodes, edges = prepare_data_for_place(request.city)
+        # Get the cached network, or wait for it to be built
+        edges = await builder.get_or_build(request.city, deadline=deadline)
+
+        # Index, filter and serialize off the event loop
+        def serialize():
+            index = builder.get_derived(request.city, EdgeIndex.from_edges, edges)
+            return serialize_network(edges, index, request)
 
-        # Filter down to output columns
-        edges = edges[OUTPUT_COLUMNS]
+        geojson_str = await run_in_threadpool(serialize)
 
-        # Add "_python" suffix to all computed score columns
-        score_columns = [
-            "lanes_int_score",
-            "maxspeed_int_score",
-            "separation_level_score",
-            "street_classification_score",
-            "composite_score",
-        ]
-        for col in score_columns:
-            edges.rename(columns={col: f"{col}_python"}, inplace=True)
+        return Response(content=geojson_str, media_type="application/json")
 
-        # Convert to GeoJSON
-        geojson_str = edges.to_json()
-        geojson_dict = json.loads(geojson_str)
+    except QueueFullError as e:
+        raise queue_full(e)
 
-        return JSONResponse(content=geojson_dict)
+    except DeadlineExceededError as e:
+        raise HTTPException(
+            status_code=504,
+            detail=f"{e}; start a job with POST /jobs and poll it instead",
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -81,6 +393,176 @@ def get_network_geojson(request: NetworkRequest):
         )
 
 
+def _network_variant(
+    slug: str, request: Request, profile: str | None, version: str | None = None
+):
+    """Response for GET /networks/{slug}[/{version}]."""
+    if profile is not None and profile not in PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile '{profile}', expected one of {list(PROFILES)}",
+        )
+    profile_name = profile or "default"
+
+    # the body must be serialized from the artifact the version is the digest
+    # of: if it is replaced (e.g. by update.py) meanwhile, get() reloads it
+    path = artifacts.artifact_path(slug, builder.artifact_dir)
+    for _ in range(3):
+        edges = builder.get(slug)
+        if edges is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"'{slug}' is not built, start a job with POST /jobs first",
+            )
+        current = http_cache.content_digest(path)[:16]
+        if builder.get(slug) is edges:
+            break
+    else:
+        raise HTTPException(
+            status_code=503,
+            detail=f"'{slug}' is being updated, try again later",
+            headers={"Retry-After": "1"},
+        )
+    if version is not None and version != current:
+        raise HTTPException(
+            status_code=404, detail=f"Version '{version}' of '{slug}' is gone"
+        )
+
+    # versioned URLs never change; the unversioned one is revalidated
+    location = f"/networks/{slug}/{current}" + (f"?profile={profile}" if profile else "")
+    headers = {
+        "Cache-Control": (
+            "public, max-age=31536000, immutable"
+            if version is not None
+            else f"public, max-age={NETWORK_MAX_AGE}, must-revalidate"
+        ),
+        "Vary": "Accept-Encoding",
+        "Content-Location": location,
+    }
+
+    if http_cache.etag_matches(request.headers.get("if-none-match"), current, profile_name):
+        headers["ETag"] = http_cache.etag(current, profile_name)
+        return Response(status_code=304, headers=headers)
+
+    def serialize():
+        index = builder.get_derived(slug, EdgeIndex.from_edges, edges)
+        return serialize_network(
+            edges, index, NetworkRequest(city=slug, profile=profile)
+        )
+
+    paths = http_cache.write_variants(path, current, profile_name, serialize)
+    encoding = http_cache.choose_encoding(request.headers.get("accept-encoding"), paths)
+    headers["ETag"] = http_cache.etag(current, profile_name, encoding)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return FileResponse(paths[encoding], media_type="application/json", headers=headers)
+
+
+@app.get("/networks/{slug}")
+async def get_network_cached(slug: str, request: Request, profile: str | None = None):
+    """
+    Full network GeoJSON of an already built place, by place slug
+    (e.g. "somerville_massachusetts_usa"), with HTTP caching.
+
+    Responses carry a strong ETag derived from the artifact's content, and
+    a matching If-None-Match gets a 304. Bodies are served from files
+    written once per artifact version, gzip- or brotli-compressed if the
+    client accepts it. Content-Location points at the immutable URL of this
+    version, /networks/{slug}/{version}.
+    """
+    return await run_in_threadpool(_network_variant, slug, request, profile)
+
+
+@app.get("/networks/{slug}/{version}")
+async def get_network_version(
+    slug: str, version: str, request: Request, profile: str | None = None
+):
+    """
+    One version of a place's full network GeoJSON, cacheable forever.
+    Returns 404 once the place was rebuilt or updated.
+    """
+    return await run_in_threadpool(_network_variant, slug, request, profile, version)
+
+
+@app.post("/rescore")
+async def rescore_network(request: RescoreRequest):
+    """
+    Composite score of every edge of a place under a model configuration.
+
+    The body's "model" has the same shape as the frontend's
+    BikeInfrastructureModel (category scores and weight per parameter).
+    Scores are returned in /getNetwork's "edge_id" order, either as raw
+    little-endian float32 bytes ("binary", NaN for missing) or as JSON.
+    """
+    if request.format not in ("binary", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'binary' or 'json'")
+
+    try:
+        edges = await builder.get_or_build(
+            request.city, deadline=time.time() + REQUEST_TIMEOUT
+        )
+    except QueueFullError as e:
+        raise queue_full(e)
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error processing city '{request.city}': {str(e)}"
+        )
+
+    category_scores = {
+        p: {
+            name: category.score
+            for name, category in getattr(request.model, p).categories.items()
+        }
+        for p in PARAMETERS
+    }
+    weights = {p: getattr(request.model, p).weight for p in PARAMETERS}
+
+    # category codes are built on first use: off the event loop
+    def compute():
+        codes = builder.get_derived(request.city, CategoryCodes.from_edges, edges)
+        return rescore(codes, category_scores, weights)
+
+    scores = await run_in_threadpool(compute)
+
+    if request.format == "json":
+        return {
+            "composite_score": [
+                None if np.isnan(score) else float(score) for score in scores
+            ]
+        }
+
+    return Response(
+        content=scores.astype("<f4").tobytes(),
+        media_type="application/octet-stream",
+        headers={"X-Edge-Count": str(len(scores))},
+    )
+
+
+@app.post("/jobs", status_code=202)
+def create_job(request: NetworkRequest):
+    """
+    Start building a place in the background, returns the job to poll.
+
+    If the place is already being built, the running job is returned.
+    """
+    try:
+        return builder.submit(request.city).to_dict()
+    except QueueFullError as e:
+        raise queue_full(e)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status of a background build."""
+    job = builder.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job.to_dict()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,10 +1,19 @@
+import logging
 import os
 import shutil
 
-import osmnx as ox
 import pandas as pd
 
 import src.stressmodel as sm
+from src import payload
+from src.artifacts import place_slug
+from src.boundaries import get_boundary
+from src.dag import Stage, run_dag
+from src.instrument import stage
+from src.reciprocal import collapse_reciprocal_edges
+from src.schema import compact_edges
+from src.stage_cache import run_stage
+from src.tags import max_value, to_arrow_tags
 from util import extract_width, first_if_list
 
 OUT_PATH = "data/out/main"
@@ -16,8 +25,8 @@ PLACES = [
 ]
 
 
-# add cycleway to useful tags
-ox.settings.useful_tags_way = ox.settings.useful_tags_way + [
+# extra OSM way tags to keep (cycleway etc.), see configure_osmnx()
+USEFUL_TAGS_WAY = [
     "massgis:way_id",
     "condition",
     "smoothness",
@@ -29,6 +38,7 @@ ox.settings.useful_tags_way = ox.settings.useful_tags_way + [
     "cycleway:both",
     "cycleway:buffer",
     "cycleway:separation",
+    "oneway:bicycle",
     "sidewalk:left",
     "sidewalk:right",
     "sidewalk:both",
@@ -37,6 +47,53 @@ ox.settings.useful_tags_way = ox.settings.useful_tags_way + [
     "parking:both",
 ]
 
+
+# Overpass and Nominatim endpoints, e.g. the local stand-in of the load tests
+# (tests/load/mock_osm.py); osmnx's public defaults if unset
+OVERPASS_URL = os.environ.get("BIKE_STRESS_OVERPASS_URL")
+NOMINATIM_URL = os.environ.get("BIKE_STRESS_NOMINATIM_URL")
+
+
+def configure_osmnx():
+    """
+    Import osmnx, add USEFUL_TAGS_WAY to its settings and point it at
+    OVERPASS_URL and NOMINATIM_URL if set.
+
+    osmnx (and networkx, scikit-learn, scipy through it) is imported only
+    when a network is fetched, so the API can start and serve prebuilt
+    artifacts without loading it.
+    """
+    import osmnx as ox
+
+    # add cycleway to useful tags
+    missing = [t for t in USEFUL_TAGS_WAY if t not in ox.settings.useful_tags_way]
+    ox.settings.useful_tags_way = ox.settings.useful_tags_way + missing
+
+    if OVERPASS_URL:
+        ox.settings.overpass_url = OVERPASS_URL
+    if NOMINATIM_URL:
+        ox.settings.nominatim_url = NOMINATIM_URL
+    return ox
+
+
+# "fast" (src/consolidate.py) or "osmnx" (ox.consolidate_intersections)
+CONSOLIDATION = os.environ.get("BIKE_STRESS_CONSOLIDATION", "fast")
+
+# Optional tile size (meters) to consolidate large areas in parallel tiles
+CONSOLIDATION_TILE_SIZE = (
+    float(os.environ["BIKE_STRESS_CONSOLIDATION_TILE_SIZE"])
+    if os.environ.get("BIKE_STRESS_CONSOLIDATION_TILE_SIZE")
+    else None
+)
+
+# Serve each two-way street as one edge instead of one per direction
+# (src/reciprocal.py)
+COLLAPSE_TWO_WAY = os.environ.get("BIKE_STRESS_COLLAPSE_TWO_WAY", "0") == "1"
+
+# Also report the size of the full-precision GeoJSON when saving (serializes
+# the network once more, so off by default)
+REPORT_RAW_SIZE = os.environ.get("BIKE_STRESS_REPORT_RAW_SIZE", "0") == "1"
+
 OUTPUT_COLUMNS = [
     "name",
     # --- maxspeed ---
@@ -46,47 +103,112 @@ OUTPUT_COLUMNS = [
     # --- separation level ---
     "separation_level",
     "separation_level_score",
+    "separation_level_forward",
+    "separation_level_backward",
     # --- street classification ---
     "street_0",
     "street_classification",
     "street_classification_score",
     # --- composite ---
     "composite_score",
+    *[sm.composite.profile_column(p) for p in sm.composite.PROFILES],
+    "composite_score_directed",
+    "composite_score_directed_backward",
     # --- basics ---
     "length",
     "width_float",
     "width_half",
+    "two_way",
     "geometry",
 ]
 
 
-def get_network(place: str, network_type: str = "bike"):
-    G = ox.graph_from_place(place, network_type=network_type)
+def get_network(
+    place: str,
+    network_type: str = "bike",
+    consolidation: str = CONSOLIDATION,
+    bbox: tuple[float, float, float, float] | None = None,
+):
+    """
+    Fetch and consolidate the network of a place, or of a bounding box
+    (left, bottom, right, top) if given (place then only labels the stages).
+    """
+    ox = configure_osmnx()
+
+    with stage("fetch", place) as record:
+        if bbox is None:
+            # the place's polygon comes from the boundary store, not Nominatim
+            polygon = get_boundary(place).union_all()
+            G = ox.graph_from_polygon(polygon, network_type=network_type)
+        else:
+            G = ox.graph_from_bbox(bbox, network_type=network_type)
+        record.rows = G.number_of_edges()
+
+    if consolidation == "fast":
+        # scipy is only needed here, keep it out of the API's imports
+        from src.consolidate import consolidate_intersections
+
+        with stage("graph_to_gdfs", place) as record:
+            nodes, edges = ox.graph_to_gdfs(G)
+            record.rows = len(edges)
+
+        # consolidate intersections within 10 meters
+        with stage("consolidate", place) as record:
+            nodes, edges = consolidate_intersections(
+                nodes, edges, tolerance=10, tile_size=CONSOLIDATION_TILE_SIZE
+            )
+            record.rows = len(edges)
+
+        return nodes, arrow_tags(edges, place)
 
     # project graph to UTM
-    G = ox.project_graph(G)
+    with stage("project", place):
+        G = ox.project_graph(G)
 
     # consolidate intersections within 10 meters
-    G = ox.consolidate_intersections(G, tolerance=10)
+    with stage("consolidate", place) as record:
+        G = ox.consolidate_intersections(G, tolerance=10)
+        record.rows = G.number_of_edges()
 
     # project back to WGS84
-    G = ox.project_graph(G, to_crs="EPSG:4326")
+    with stage("project_back", place):
+        G = ox.project_graph(G, to_crs="EPSG:4326")
 
-    nodes, edges = ox.graph_to_gdfs(G)
-    return nodes, edges
+    with stage("graph_to_gdfs", place) as record:
+        nodes, edges = ox.graph_to_gdfs(G)
+        record.rows = len(edges)
+
+    return nodes, arrow_tags(edges, place)
+
+
+def arrow_tags(edges: pd.DataFrame, place: str) -> pd.DataFrame:
+    """Tag columns (strings or lists of strings) as Arrow columns, see src/tags.py."""
+    with stage("arrow_tags", place, rows=len(edges)):
+        return to_arrow_tags(edges)
+
+
+def _fetch_network(place: str):
+    print(f"> Getting bike network for {place}")
+    return get_network(place, "bike")
 
 
 def process_network(edges: pd.DataFrame) -> pd.DataFrame:
-    # drop some unneeded columns
+    # drop some unneeded columns (osmnx only has columns for tags in the data)
     edges = edges.drop(
-        ["ref", "service", "access", "bridge", "tunnel", "junction"], axis=1
+        ["ref", "service", "access", "bridge", "tunnel", "junction"],
+        axis=1,
+        errors="ignore",
     )
+    if "width" not in edges:
+        edges["width"] = None
 
     # if "name" is null, drop the row (gets rid of tiny dead ends)
     # edges = edges[edges["name"].notnull()]
 
-    # parse width
-    edges["width_float"] = edges["width"].apply(extract_width).astype("Float64")
+    # parse width (the widest of a list)
+    edges["width_float"] = pd.Series(
+        max_value(edges["width"], extract_width), index=edges.index
+    ).astype("Float64")
 
     # if width is missing, set to 10 meters
     edges["width_float"] = edges["width_float"].fillna(10.0)
@@ -100,66 +222,210 @@ def process_network(edges: pd.DataFrame) -> pd.DataFrame:
     return edges
 
 
-def prepare_data_for_place(place: str):
-    print(f"> Getting bike network for {place}")
-    nodes, edges = get_network(place, "bike")
+def prepare_data_for_place(
+    place: str,
+    keep_raw_tags: bool = False,
+    use_cache: bool = False,
+    collapse_two_way: bool = False,
+):
+    """
+    Fetch the bike network for a place and run every stress model on it.
+
+    With use_cache=True, the OSM network and each model's output are cached
+    (see src/stage_cache.py), keyed by the model spec section each stage
+    uses, so a model change only re-runs the affected model.
+
+    With collapse_two_way=True, both directions of a two-way street become a
+    single edge (see src/reciprocal.py), for display.
+    """
+    (nodes, edges), network_key = run_stage(
+        "network",
+        network_cache_key(place),
+        lambda: _fetch_network(place),
+        enabled=use_cache,
+    )
 
-    print(f"> Processing network for {place}")
-    edges = process_network(edges)
+    edges = score_edges(
+        edges,
+        place,
+        network_key,
+        keep_raw_tags=keep_raw_tags,
+        use_cache=use_cache,
+        collapse_two_way=collapse_two_way,
+    )
+    return nodes, edges
 
-    # MODEL - SPEED: parse maxspeed
-    print(f"> MODEL 1: Preparing speed data for {place}")
-    edges["maxspeed_int"], edges["maxspeed_int_score"] = sm.speed.run(edges)
 
-    # MODEL - SEPARATION LEVEL: combine cycleway types for separation level
-    print(f"> MODEL 2: Preparing separation level data for {place}")
-    edges["separation_level"], edges["separation_level_score"] = (
-        sm.separation_level.run(edges)
-    )
+def network_cache_key(place: str) -> str:
+    """Stage cache key of a place's fetched, consolidated network."""
+    return f"{place_slug(place)}-{CONSOLIDATION}"
+
+
+def score_edges(
+    edges: pd.DataFrame,
+    place: str,
+    network_key: str | None = None,
+    keep_raw_tags: bool = False,
+    use_cache: bool = False,
+    collapse_two_way: bool = False,
+) -> pd.DataFrame:
+    """
+    Run every stress model on fetched edges (see prepare_data_for_place).
+
+    Every model scores each edge on its own tags, so any subset of a network
+    can be scored alone, e.g. the edges changed by an update (update.py).
+    network_key identifies the edges in the model cache keys (use_cache).
+    """
+    # no-op for networks from get_network, converts older cached networks
+    edges = to_arrow_tags(edges)
+
+    # one edge per two-way street, or keep both directions
+    if collapse_two_way:
+        with stage("collapse_two_way", place) as record:
+            edges = collapse_reciprocal_edges(edges)
+            record.rows = len(edges)
+        network_key = f"{network_key}-two_way"
+    else:
+        edges = edges.assign(two_way=False)
 
-    # MODEL - CATEGORY: classify street types
-    print(f"> MODEL 3: Preparing street category data for {place}")
-    edges["street_classification"], edges["street_classification_score"] = (
-        sm.classification.run(edges)
-    )
+    print(f"> Processing network for {place}")
+    with stage("process_network", place) as record:
+        edges = process_network(edges)
+        record.rows = len(edges)
 
-    # MODEL - LANES: parse number of lanes
-    print(f"> MODEL 4: Preparing lanes data for {place}")
-    edges["lanes_int"], edges["lanes_int_score"] = sm.lanes.run(edges)
+    # every model, then the composite score, as a DAG (see src/dag.py)
+    print(f"> MODELS: Scoring {len(edges)} edges for {place}")
+    prefix = f"{place_slug(place)}-{network_key}" if use_cache else None
+    edges, _ = run_dag(model_stages(prefix), edges, place)
 
     # copy some OG vals so they are easy to compare with new vals
     edges["street_0"] = edges["highway"]
     edges["maxspeed_0"] = edges["maxspeed"]
     edges["lanes_0"] = edges["lanes"]
 
-    # sort columns alphabetically again
-    edges = edges.reindex(sorted(edges.columns), axis=1)
+    # sort columns alphabetically again, composite scores last
+    composite = [c for c in edges.columns if c.startswith("composite_score")]
+    edges = edges.reindex(
+        sorted(c for c in edges.columns if c not in composite) + composite, axis=1
+    )
 
-    # compute composite score
-    print(f"> MODEL: Preparing composite score for {place}")
+    # cast to compact dtypes, dropping raw tags unless requested
+    with stage("compact", place, rows=len(edges)):
+        edges = compact_edges(edges, keep_raw_tags=keep_raw_tags)
 
-    edges["composite_score"] = compute_composite_score(edges)
+    return edges
 
-    return nodes, edges
 
+def composite_scores(edges: pd.DataFrame) -> pd.DataFrame:
+    """Composite score of every weight profile, plus the default and directed ones."""
+    scores = sm.composite.run(edges)
+    scores["composite_score"] = scores[
+        sm.composite.profile_column(sm.composite.DEFAULT_PROFILE)
+    ]
 
-def compute_composite_score(edges: pd.DataFrame) -> pd.Series:
-    weights = pd.Series(
-        {
-            "separation_level_score": 0.60,
-            "maxspeed_int_score": 0.20,
-            "street_classification_score": 0.20,
-        }
+    # routing weights for travel u -> v (and v -> u, used for the reverse
+    # direction of collapsed two-way streets): only the facilities on that side
+    scores["composite_score_directed"] = compute_composite_score(
+        edges.assign(separation_level_score=edges["separation_level_forward_score"])
     )
-
-    # Compute weighted sum using dot, ignoring NaNs
-    weighted_sum = edges[weights.index].fillna(0).dot(weights)
-
-    # Compute sum of weights for non-missing values
-    sum_weights = edges[weights.index].notna().dot(weights)
-
-    # Normalize
-    return weighted_sum / sum_weights
+    scores["composite_score_directed_backward"] = compute_composite_score(
+        edges.assign(separation_level_score=edges["separation_level_backward_score"])
+    )
+    return scores
+
+
+def model_stages(cache_prefix: str | None = None) -> list[Stage]:
+    """
+    The stress models and the composite score as DAG stages.
+
+    With a cache_prefix, each model's result is cached under
+    "<cache_prefix>-<hash of its model spec section>".
+    """
+
+    def key(section: str) -> str | None:
+        if cache_prefix is None:
+            return None
+        return f"{cache_prefix}-{sm.spec.SPEC.section_hash(section)}"
+
+    directed = [
+        f"separation_level_{d}{s}" for d in ["forward", "backward"] for s in ["", "_score"]
+    ]
+    profiles = [sm.composite.profile_column(p) for p in sm.composite.PROFILES]
+    return [
+        # MODEL 1 - SPEED: parse maxspeed
+        Stage(
+            "speed",
+            sm.speed.run,
+            inputs=tuple(sm.speed.INPUTS),
+            outputs=("maxspeed_int", "maxspeed_int_score"),
+            cache_key=key("speed_limit"),
+        ),
+        # MODEL 2 - SEPARATION LEVEL: combine cycleway types for separation level
+        Stage(
+            "separation_level",
+            sm.separation_level.run,
+            inputs=tuple(sm.separation_level.INPUTS),
+            outputs=("separation_level", "separation_level_score"),
+            cache_key=key("separation_level"),
+        ),
+        # separation level per travel direction, from the cycleway side tags
+        Stage(
+            "separation_level_directed",
+            sm.separation_level.run_directed,
+            inputs=tuple(sm.separation_level.INPUTS),
+            outputs=tuple(directed),
+            cache_key=key("separation_level"),
+        ),
+        # MODEL 3 - CATEGORY: classify street types
+        Stage(
+            "classification",
+            sm.classification.run,
+            inputs=tuple(sm.classification.INPUTS),
+            outputs=("street_classification", "street_classification_score"),
+            cache_key=key("street_classification"),
+        ),
+        # MODEL 4 - LANES: parse number of lanes
+        Stage(
+            "lanes",
+            sm.lanes.run,
+            inputs=tuple(sm.lanes.INPUTS),
+            outputs=("lanes_int", "lanes_int_score"),
+            cache_key=key("lanes"),
+        ),
+        # composite score for every weight profile (vectorized, releases the GIL)
+        Stage(
+            "composite",
+            composite_scores,
+            inputs=(
+                *sm.composite.SUB_SCORES,
+                "separation_level_forward_score",
+                "separation_level_backward_score",
+            ),
+            outputs=(
+                *profiles,
+                "composite_score",
+                "composite_score_directed",
+                "composite_score_directed_backward",
+            ),
+            gil=False,
+        ),
+    ]
+
+
+def compute_composite_score(
+    edges: pd.DataFrame, profile: str = sm.composite.DEFAULT_PROFILE
+) -> pd.Series:
+    """Composite score for a single weight profile (see sm.composite.PROFILES)."""
+    scores = sm.composite.run(edges, {profile: sm.composite.PROFILES[profile]})
+    return scores[sm.composite.profile_column(profile)]
+
+
+def build_network(place: str):
+    """Scored edges for a place, filtered down to OUTPUT_COLUMNS (used by the API)."""
+    nodes, edges = prepare_data_for_place(
+        place, use_cache=True, collapse_two_way=COLLAPSE_TWO_WAY
+    )
+    return edges[OUTPUT_COLUMNS]
 
 
 def save_data_for_place(place: str, out_path: str, nodes, edges):
@@ -168,19 +434,43 @@ def save_data_for_place(place: str, out_path: str, nodes, edges):
 
     # save to csv
     print(f"> Saving edges to CSV for {place}")
-    edges.to_csv(f"{out_path}_streets.csv", index=True)
+    with stage("save_csv", place, rows=len(edges)):
+        edges.to_csv(f"{out_path}_streets.csv", index=True)
 
     # also save to GeoPackage
     print(f"> Saving edges and nodes to GeoPackage for {place}")
-    edges.to_file(f"{out_path}_streets.gpkg", layer="streets", driver="GPKG")
-    nodes.to_file(f"{out_path}_streets.gpkg", layer="nodes", driver="GPKG")
+    with stage("save_gpkg", place, rows=len(edges)):
+        edges.to_file(f"{out_path}_streets.gpkg", layer="streets", driver="GPKG")
+        nodes.to_file(f"{out_path}_streets.gpkg", layer="nodes", driver="GPKG")
 
     # also save geojson
     print(f"> Saving edges to GeoJSON for {place}")
-    edges.to_file(f"{out_path}_streets.geojson", driver="GeoJSON")
+    # (simplified and rounded, see src/payload.py)
+    with stage("save_geojson", place, rows=len(edges)):
+        geojson = payload.serialize(edges, "geojson")
+        with open(f"{out_path}_streets.geojson", "w") as f:
+            f.write(geojson)
+
+    # and the same features as TopoJSON
+    with stage("save_topojson", place, rows=len(edges)):
+        topojson = payload.serialize(edges, "topojson")
+        with open(f"{out_path}_streets.topojson", "w") as f:
+            f.write(topojson)
+
+    sizes = (
+        f"GeoJSON {len(geojson) / 1e6:.1f} MB, "
+        f"TopoJSON {len(topojson) / 1e6:.1f} MB"
+    )
+    if REPORT_RAW_SIZE:
+        raw_size = len(edges.to_json())
+        sizes = f"full precision GeoJSON {raw_size / 1e6:.1f} MB, {sizes}"
+    print(f"> Payload sizes: {sizes}")
 
 
 def main():
+    # log stage timings (src/instrument.py)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # delete contents of data/out directory
     print("> Clearing data/out/main")
     if os.path.exists(OUT_PATH):
@@ -190,10 +480,10 @@ def main():
     for place in PLACES:
         print(f"\nProcessing place: {place}")
 
-        nodes, edges = prepare_data_for_place(place)
+        nodes, edges = prepare_data_for_place(place, collapse_two_way=COLLAPSE_TWO_WAY)
 
         # also get boundary polygon
-        city_gdf = ox.geocode_to_gdf(place)
+        city_gdf = get_boundary(place)
 
         # filter down to output columns
         edges = edges[OUTPUT_COLUMNS]
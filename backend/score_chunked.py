@@ -0,0 +1,50 @@
+"""
+Score a large network (e.g. a whole state) chunk by chunk, with peak memory
+bounded by the chunk size (see src/chunked.py):
+
+    python score_chunked.py edges.parquet scored.parquet \\
+        --fetch "Massachusetts, USA" [--two-way] [--chunk-rows 50000]
+
+--fetch fetches and consolidates the place's network first and writes it to
+edges.parquet in spatially coherent row groups. Without it, edges.parquet
+must already have been written (by an earlier --fetch, or write_edges).
+Read the result with src.chunked.read_scored.
+"""
+
+import argparse
+import logging
+import os
+
+from main import get_network, score_edges
+from src.chunked import CHUNK_ROWS, score_parquet, write_edges
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    parser = argparse.ArgumentParser(description="Score edges chunk by chunk")
+    parser.add_argument("edges", help="edges GeoParquet")
+    parser.add_argument("out", help="scored edges GeoParquet")
+    parser.add_argument("--fetch", metavar="PLACE", help="fetch PLACE first")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--two-way", action="store_true", help="collapse_two_way")
+    args = parser.parse_args()
+
+    place = args.fetch or os.path.basename(args.edges)
+    if args.fetch:
+        _, edges = get_network(args.fetch)
+        chunks = write_edges(edges, args.edges, args.chunk_rows)
+        print(f"> {len(edges)} edges in {chunks} chunks: {args.edges}")
+        del edges
+
+    rows = score_parquet(
+        args.edges,
+        args.out,
+        lambda edges: score_edges(edges, place, collapse_two_way=args.two_way),
+        place,
+    )
+    print(f"> {rows} scored edges: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+On-disk store for scored city networks.
+
+The API builds each city once and saves the scored edges here, so later
+requests (and restarts) can load them instead of re-running the pipeline.
+
+Artifacts are uncompressed Arrow IPC files: numeric scores, categorical
+labels (dictionary encoded) and WKB geometry. They are memory-mapped
+read-only when loaded, so the float columns of a city are backed by the OS
+page cache and shared by every uvicorn worker that serves it, instead of
+each worker holding its own copy. Geometries are still decoded into shapely
+objects per process.
+"""
+
+import json
+import os
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import shapely
+
+from src.boundaries import place_key
+from src.stressmodel.spec import SPEC
+
+ARTIFACT_DIR = os.environ.get("BIKE_STRESS_ARTIFACT_DIR", "data/out/api")
+
+
+def place_slug(place: str) -> str:
+    """
+    Normalize a place name into a file-system friendly key. Spellings of the
+    same place share it (see src/boundaries.py).
+
+    >>> place_slug("Somerville, Massachusetts, USA")
+    'somerville_massachusetts_usa'
+    >>> place_slug("Somerville, MA, USA")
+    'somerville_massachusetts_usa'
+    """
+    return place_key(place)
+
+
+def artifact_key(place: str) -> str:
+    """Place slug plus model spec hash: a spec change never reuses old scores."""
+    return f"{place_slug(place)}-{SPEC.hash[:12]}"
+
+
+def artifact_path(place: str, artifact_dir: str = ARTIFACT_DIR) -> str:
+    return os.path.join(artifact_dir, f"{artifact_key(place)}.arrow")
+
+
+def has_artifact(place: str, artifact_dir: str = ARTIFACT_DIR) -> bool:
+    return os.path.exists(artifact_path(place, artifact_dir))
+
+
+def artifact_signature(path: str) -> tuple[int, int] | None:
+    """(mtime, size) of an artifact file, None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def to_arrow(edges: gpd.GeoDataFrame) -> pa.Table:
+    """
+    Convert scored edges to an Arrow table with a WKB "geometry" column
+    (GeoParquet-style "geo" metadata records its CRS).
+    """
+    geometry_name = edges.geometry.name
+    df = pd.DataFrame(edges.drop(columns=geometry_name))
+    table = pa.Table.from_pandas(df, preserve_index=True)
+
+    # keep NaN as a value instead of a null, so floats can be read zero-copy
+    for column in df.columns:
+        if df[column].dtype.kind == "f":
+            i = table.column_names.index(column)
+            values = pa.array(df[column].to_numpy(), from_pandas=False)
+            table = table.set_column(i, column, values)
+
+    wkb = shapely.to_wkb(edges.geometry.array)
+    table = table.append_column("geometry", pa.array(wkb, pa.binary()))
+
+    geo = {
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "crs": None if edges.crs is None else edges.crs.to_json(),
+            }
+        },
+    }
+    metadata = {**table.schema.metadata, b"geo": json.dumps(geo).encode("utf-8")}
+    return table.replace_schema_metadata(metadata)
+
+
+def from_arrow(table: pa.Table) -> gpd.GeoDataFrame:
+    """Inverse of to_arrow; float columns stay backed by the table's buffers."""
+    geo = json.loads(table.schema.metadata[b"geo"])
+    crs = geo["columns"]["geometry"]["crs"]
+
+    geometry = shapely.from_wkb(
+        table.column("geometry").to_numpy(zero_copy_only=False)
+    )
+    # split_blocks: one block per column, so pandas does not copy them into 2D blocks
+    df = table.drop_columns(["geometry"]).to_pandas(split_blocks=True)
+
+    return gpd.GeoDataFrame(df, geometry=geometry, crs=crs)
+
+
+def load_artifact(place: str, artifact_dir: str = ARTIFACT_DIR):
+    """
+    Memory-map the scored edges for a place, or None if it was never built.
+    Do not modify the returned frame in place: its floats are read-only.
+    """
+    path = artifact_path(place, artifact_dir)
+    if not os.path.exists(path):
+        return None
+
+    # the mapping stays open as long as any column references it
+    source = pa.memory_map(path, "r")
+    return from_arrow(pa.ipc.open_file(source).read_all())
+
+
+def save_artifact(place: str, edges, artifact_dir: str = ARTIFACT_DIR) -> str:
+    """Save scored edges for a place as an Arrow IPC file, returns the path."""
+    os.makedirs(artifact_dir, exist_ok=True)
+    path = artifact_path(place, artifact_dir)
+    table = to_arrow(edges)
+
+    # write to a temp file first so readers never see a partial artifact
+    # (uncompressed: compressed buffers could not be memory-mapped)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    return path
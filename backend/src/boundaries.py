@@ -0,0 +1,172 @@
+"""
+Local store of place boundaries, so builds geocode each place only once.
+
+`ox.graph_from_place` and `ox.geocode_to_gdf` both ask Nominatim for a
+place's polygon on every call. `get_boundary` keeps each polygon as a
+GeoJSON file under BIKE_STRESS_BOUNDARY_DIR, keyed by the normalized place
+name, and only geocodes places it does not have yet. Names are normalized
+so that spellings of the same place share an entry:
+
+>>> place_key("Somerville, MA, USA")
+'somerville_massachusetts_usa'
+>>> place_key("somerville,  Massachusetts, United States")
+'somerville_massachusetts_usa'
+
+The store can be filled from a local file of polygons, so builds work
+without Nominatim:
+
+    python -m src.boundaries boundaries.geojson --name-column place
+"""
+
+import argparse
+import os
+import re
+
+import geopandas as gpd
+
+BOUNDARY_DIR = os.environ.get("BIKE_STRESS_BOUNDARY_DIR", "cache/boundaries")
+
+US_STATES = {
+    "al": "alabama",
+    "ak": "alaska",
+    "az": "arizona",
+    "ar": "arkansas",
+    "ca": "california",
+    "co": "colorado",
+    "ct": "connecticut",
+    "de": "delaware",
+    "dc": "district of columbia",
+    "fl": "florida",
+    "ga": "georgia",
+    "hi": "hawaii",
+    "id": "idaho",
+    "il": "illinois",
+    "in": "indiana",
+    "ia": "iowa",
+    "ks": "kansas",
+    "ky": "kentucky",
+    "la": "louisiana",
+    "me": "maine",
+    "md": "maryland",
+    "ma": "massachusetts",
+    "mi": "michigan",
+    "mn": "minnesota",
+    "ms": "mississippi",
+    "mo": "missouri",
+    "mt": "montana",
+    "ne": "nebraska",
+    "nv": "nevada",
+    "nh": "new hampshire",
+    "nj": "new jersey",
+    "nm": "new mexico",
+    "ny": "new york",
+    "nc": "north carolina",
+    "nd": "north dakota",
+    "oh": "ohio",
+    "ok": "oklahoma",
+    "or": "oregon",
+    "pa": "pennsylvania",
+    "ri": "rhode island",
+    "sc": "south carolina",
+    "sd": "south dakota",
+    "tn": "tennessee",
+    "tx": "texas",
+    "ut": "utah",
+    "vt": "vermont",
+    "va": "virginia",
+    "wa": "washington",
+    "wv": "west virginia",
+    "wi": "wisconsin",
+    "wy": "wyoming",
+}
+
+COUNTRY_ALIASES = {
+    "us": "usa",
+    "u.s.": "usa",
+    "u.s.a.": "usa",
+    "united states": "usa",
+    "united states of america": "usa",
+}
+
+
+def normalize_place(place: str) -> str:
+    """
+    Lowercase a place name, collapse whitespace and spell out US state and
+    country abbreviations (in every part after the first).
+    """
+    parts = [re.sub(r"\s+", " ", p.strip().lower()) for p in place.split(",")]
+    parts = [p for p in parts if p]
+    for i, part in enumerate(parts[1:], start=1):
+        part = US_STATES.get(part, part)
+        parts[i] = COUNTRY_ALIASES.get(part, part)
+    return ", ".join(parts)
+
+
+def place_key(place: str) -> str:
+    """File-system friendly key of a normalized place name."""
+    return re.sub(r"[^a-z0-9]+", "_", normalize_place(place)).strip("_")
+
+
+def boundary_path(place: str, boundary_dir: str = BOUNDARY_DIR) -> str:
+    return os.path.join(boundary_dir, f"{place_key(place)}.geojson")
+
+
+def save_boundary(
+    place: str, boundary: gpd.GeoDataFrame, boundary_dir: str = BOUNDARY_DIR
+) -> str:
+    """Store a place's boundary (WGS84), returns the path."""
+    os.makedirs(boundary_dir, exist_ok=True)
+    path = boundary_path(place, boundary_dir)
+
+    # write to a temp file first so readers never see a partial boundary
+    tmp_path = f"{path}.tmp"
+    boundary.to_crs("EPSG:4326").to_file(tmp_path, driver="GeoJSON")
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_boundary(place: str, boundary_dir: str = BOUNDARY_DIR) -> gpd.GeoDataFrame:
+    """
+    Boundary of a place (as from `ox.geocode_to_gdf`), from the store or,
+    the first time, geocoded with Nominatim and stored.
+    """
+    path = boundary_path(place, boundary_dir)
+    if os.path.exists(path):
+        return gpd.read_file(path)
+
+    # osmnx (and its dependencies) only when a place must be geocoded
+    import osmnx as ox
+
+    boundary = ox.geocode_to_gdf(place)
+    save_boundary(place, boundary, boundary_dir)
+    return boundary
+
+
+def preload(path: str, name_column: str = "place", boundary_dir: str = BOUNDARY_DIR):
+    """
+    Store every polygon of a local file (any format geopandas reads),
+    named by name_column. Rows with the same place are merged.
+
+    Returns:
+        list of stored place names
+    """
+    polygons = gpd.read_file(path)
+    places = []
+    for place, rows in polygons.groupby(name_column, sort=False):
+        save_boundary(place, rows.dissolve(), boundary_dir)
+        places.append(place)
+    return places
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload place boundaries")
+    parser.add_argument("path", help="file of polygons, e.g. boundaries.geojson")
+    parser.add_argument("--name-column", default="place")
+    args = parser.parse_args()
+
+    for place in preload(args.path, args.name_column):
+        print(f"> {place}: {boundary_path(place)}")
+
+
+if __name__ == "__main__":
+    main()
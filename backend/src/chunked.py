@@ -0,0 +1,231 @@
+"""
+Bounded-memory scoring of large edge tables, chunk by chunk.
+
+`prepare_data_for_place` scores a whole network at once, so a statewide
+build needs several copies of every edge in memory. Every model scores each
+edge on its own tags, so the edges can instead be scored in chunks:
+
+1. `write_edges` stores fetched edges as GeoParquet, sorted along a Hilbert
+   curve and cut into row groups of about BIKE_STRESS_CHUNK_ROWS edges
+   (default 50000). Both directions of a street always share a row group,
+   so two-way streets can still be collapsed.
+2. `score_parquet` reads one row group at a time, scores it (with
+   main.score_edges: width parsing, the models, the composite scores,
+   compact dtypes) and appends the scored chunk to the output file as a row
+   group. Peak memory depends on the chunk size, not the network size.
+3. `read_scored` reads the output back with the same dtypes as the
+   in-memory path (categories are stored as strings).
+
+See score_chunked.py for the command line:
+
+    python score_chunked.py edges.parquet scored.parquet \\
+        --fetch "Massachusetts, USA" --two-way
+"""
+
+import json
+import os
+from typing import Callable
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.instrument import stage
+from src.schema import compact_edges
+from src.tags import TAG_DTYPE, TAG_TYPE
+
+# edges per chunk (row group)
+CHUNK_ROWS = int(os.environ.get("BIKE_STRESS_CHUNK_ROWS", "50000"))
+
+
+def _pairs(edges: pd.DataFrame) -> np.ndarray:
+    """Id of each edge's undirected (u, v) node pair (its row, without u, v)."""
+    if not {"u", "v"} <= set(edges.index.names):
+        return np.arange(len(edges))
+    u = edges.index.get_level_values("u").to_numpy()
+    v = edges.index.get_level_values("v").to_numpy()
+    pairs = pd.MultiIndex.from_arrays([np.minimum(u, v), np.maximum(u, v)])
+    return pd.factorize(pairs)[0]
+
+
+def spatial_order(edges: gpd.GeoDataFrame) -> np.ndarray:
+    """
+    Row order along a Hilbert curve (of the edges' centroids), with every
+    edge of a node pair at the position of the pair's first edge.
+    """
+    pairs = _pairs(edges)
+    distance = edges.geometry.hilbert_distance().to_numpy()
+    distance = pd.Series(distance).groupby(pairs).transform("min").to_numpy()
+    return np.lexsort((pairs, distance))
+
+
+def chunk_bounds(pairs: np.ndarray, chunk_rows: int) -> list[tuple[int, int]]:
+    """(start, stop) of chunks of about chunk_rows rows, never splitting a pair."""
+    n = len(pairs)
+    starts = np.flatnonzero(np.r_[True, pairs[1:] != pairs[:-1]]) if n else []
+    targets = np.searchsorted(starts, np.arange(chunk_rows, n, chunk_rows))
+    cuts = np.unique(np.asarray(starts)[targets[targets < len(starts)]])
+    bounds = [0, *cuts.tolist(), n]
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _storable(series: pd.Series) -> pd.Series:
+    """
+    Object columns mixing values and lists (osmid, reversed of merged ways)
+    as lists only, which Parquet can store. Their first item is unchanged.
+    """
+    if series.dtype != object:
+        return series
+    is_list = series.map(lambda v: isinstance(v, (list, np.ndarray)))
+    if not is_list.any() or is_list.all():
+        return series
+    return series.map(
+        lambda v: v if isinstance(v, (list, np.ndarray)) or v is None else [v]
+    )
+
+
+def _geo_metadata(edges: gpd.GeoDataFrame) -> bytes:
+    """GeoParquet "geo" metadata (WKB geometry, geometry types left open)."""
+    crs = None if edges.crs is None else edges.crs.to_json_dict()
+    column = {"encoding": "WKB", "geometry_types": [], "crs": crs}
+    metadata = {
+        "version": "1.0.0",
+        "primary_column": edges.geometry.name,
+        "columns": {edges.geometry.name: column},
+    }
+    return json.dumps(metadata).encode()
+
+
+def to_table(edges: gpd.GeoDataFrame) -> pa.Table:
+    """GeoParquet table of edges (index as columns, Arrow tags kept)."""
+    geometry = edges.geometry.name
+    frame = pd.DataFrame(
+        {
+            col: edges[col].to_wkb() if col == geometry else _storable(edges[col])
+            for col in edges.columns
+        },
+        index=edges.index,
+    )
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    return table.replace_schema_metadata(
+        {**table.schema.metadata, b"geo": _geo_metadata(edges)}
+    )
+
+
+def read_edges(table: pa.Table) -> gpd.GeoDataFrame:
+    """
+    Edges from a table written by to_table, with their index and Arrow tag
+    columns (pandas cannot rebuild nested Arrow dtypes from the metadata).
+    """
+    pandas_metadata = json.loads(table.schema.metadata[b"pandas"])
+    geo = json.loads(table.schema.metadata[b"geo"])
+    index = [c for c in pandas_metadata["index_columns"] if isinstance(c, str)]
+
+    frame = table.to_pandas(
+        ignore_metadata=True, types_mapper={TAG_TYPE: TAG_DTYPE}.get
+    )
+    if index:
+        frame = frame.set_index(index)
+        frame.index.names = [
+            None if name.startswith("__index_level_") else name
+            for name in frame.index.names
+        ]
+
+    column = geo["primary_column"]
+    geometry = gpd.GeoSeries.from_wkb(
+        frame[column].to_numpy(),
+        index=frame.index,
+        crs=geo["columns"][column].get("crs", "OGC:CRS84"),
+    )
+    frame[column] = geometry
+    return gpd.GeoDataFrame(frame, geometry=column)
+
+
+def write_edges(
+    edges: gpd.GeoDataFrame, path: str, chunk_rows: int = CHUNK_ROWS
+) -> int:
+    """
+    Write fetched edges (as from get_network) as GeoParquet for
+    score_parquet, in spatially coherent row groups. Returns their number.
+    """
+    order = spatial_order(edges)
+    edges = edges.iloc[order]
+    bounds = chunk_bounds(_pairs(edges), chunk_rows)
+
+    table = to_table(edges)
+    tmp_path = f"{path}.tmp"
+    with pq.ParquetWriter(tmp_path, table.schema) as writer:
+        for start, stop in bounds:
+            chunk = table.slice(start, stop - start)
+            writer.write_table(chunk, row_group_size=len(chunk))
+    os.replace(tmp_path, path)
+    return len(bounds)
+
+
+def _scored_table(edges: gpd.GeoDataFrame) -> pa.Table:
+    """Scored chunk as a table, categories as strings so every chunk matches."""
+    edges = edges.copy(deep=False)
+    for col in edges.columns:
+        if isinstance(edges[col].dtype, pd.CategoricalDtype):
+            edges[col] = edges[col].astype(str)
+    return to_table(edges)
+
+
+def score_parquet(
+    in_path: str,
+    out_path: str,
+    score_fn: Callable[[gpd.GeoDataFrame], gpd.GeoDataFrame],
+    place: str = "",
+) -> int:
+    """
+    Score the edges of a GeoParquet file one row group at a time.
+
+    Args:
+        in_path: Edges, as written by write_edges.
+        out_path: Output GeoParquet file, one row group per input row group.
+        score_fn: Scores a chunk of edges, e.g. main.score_edges (compact
+            output, without raw tags).
+        place: Name used in stage logs.
+    Returns:
+        Number of scored edges.
+    """
+    source = pq.ParquetFile(in_path)
+    tmp_path = f"{out_path}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for i in range(source.num_row_groups):
+            with stage("read_chunk", place) as record:
+                edges = read_edges(source.read_row_group(i))
+                record.rows = len(edges)
+
+            scored = score_fn(edges)
+            del edges
+
+            with stage("write_chunk", place, rows=len(scored)):
+                table = _scored_table(scored)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table.cast(writer.schema), row_group_size=len(table))
+            rows += len(scored)
+            del scored, table
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"{in_path} has no edges")
+    os.replace(tmp_path, out_path)
+    return rows
+
+
+def read_scored(path: str, columns: list[str] | None = None, **kwargs):
+    """
+    Scored edges written by score_parquet, with the dtypes of score_edges.
+    Other keyword arguments (e.g. bbox) go to gpd.read_parquet.
+    """
+    edges = gpd.read_parquet(path, columns=columns, **kwargs)
+    return compact_edges(edges, keep_raw_tags=True)
+
@@ -0,0 +1,256 @@
+"""
+Declarative stage DAG for the per-edge models.
+
+Each `Stage` declares the columns it reads and the columns it writes. A
+stage depends on the stages producing its inputs, so the stress models
+(which read disjoint OSM tags) are independent and run concurrently, and
+the composite score waits for all of them. Each stage only receives its
+input columns, not the whole edges frame.
+
+Executors (BIKE_STRESS_STAGE_EXECUTOR):
+- "thread" (default): every stage in a thread pool. NumPy/pandas
+  vectorized work releases the GIL; pure-Python `.apply` work does not.
+- "process": stages marked `gil=True` (pure-Python work) run in a process
+  pool, the others in threads. Only their input columns are pickled.
+- "serial": one stage after the other, in declaration order.
+
+`run_dag` logs (and returns) a `DagReport` with each stage's start and end
+time and the critical path: the chain of dependent stages that bounds the
+wall time, i.e. where speeding up a stage shortens the whole run.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+import pandas as pd
+
+from src import instrument
+from src.stage_cache import load_stage, store_stage
+
+STAGE_EXECUTOR = os.environ.get("BIKE_STRESS_STAGE_EXECUTOR", "thread")
+
+# Workers per pool (default: one per stage)
+STAGE_WORKERS = os.environ.get("BIKE_STRESS_STAGE_WORKERS")
+
+EXECUTORS = ("thread", "process", "serial")
+
+logger = logging.getLogger("bike_stress.stages")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A pipeline stage.
+
+    name: Stage name, for logs, metrics and the stage cache.
+    run: Function DataFrame -> a Series, a tuple of Series (one per output)
+        or a DataFrame with the output columns. Must be a module-level
+        function to run in a process.
+    inputs: Columns the stage reads (missing ones are skipped).
+    outputs: Columns the stage writes.
+    gil: True if the stage is mostly pure-Python work.
+    cache_key: If set, the result is cached under this key (src/stage_cache.py).
+    """
+
+    name: str
+    run: Callable
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    gil: bool = True
+    cache_key: str | None = None
+
+
+@dataclass
+class DagReport:
+    place: str | None
+    executor: str
+    wall_s: float = 0.0
+    stage_s: dict[str, tuple[float, float]] = field(default_factory=dict)
+    critical_path: list[str] = field(default_factory=list)
+    critical_path_s: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def dependencies(stages: list[Stage]) -> dict[str, set[str]]:
+    """Stage name -> names of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for column in stage.outputs:
+            if column in producers:
+                raise ValueError(
+                    f"'{column}' is written by both '{producers[column]}' and '{stage.name}'"
+                )
+            producers[column] = stage.name
+
+    deps = {
+        stage.name: {producers[c] for c in stage.inputs if c in producers} - {stage.name}
+        for stage in stages
+    }
+
+    # topological sort: whatever cannot be ordered is on (or after) a cycle
+    ordered = set()
+    while True:
+        ready = {name for name in deps if name not in ordered and deps[name] <= ordered}
+        if not ready:
+            break
+        ordered |= ready
+    if len(ordered) < len(deps):
+        cycle = sorted(name for name in deps if name not in ordered)
+        raise ValueError(f"Dependency cycle between stages {cycle}")
+
+    return deps
+
+
+def critical_path(
+    deps: dict[str, set[str]], durations: dict[str, float]
+) -> tuple[list[str], float]:
+    """Longest chain of dependent stages by duration, and its length."""
+    longest = {}  # name -> (length of the longest chain ending here, previous)
+
+    def visit(name, seen=()):
+        if name in seen:
+            raise ValueError(f"Dependency cycle through '{name}'")
+        if name not in longest:
+            best = max(
+                ((visit(d, (*seen, name))[0], d) for d in deps[name]),
+                default=(0.0, None),
+            )
+            longest[name] = (best[0] + durations.get(name, 0.0), best[1])
+        return longest[name]
+
+    if not deps:
+        return [], 0.0
+
+    end = max(deps, key=lambda name: visit(name)[0])
+    path = []
+    name = end
+    while name is not None:
+        path.append(name)
+        name = longest[name][1]
+    return path[::-1], longest[end][0]
+
+
+def _outputs(stage: Stage, result) -> dict:
+    """Output column -> values, from a stage's return value."""
+    if isinstance(result, pd.DataFrame):
+        return {column: result[column] for column in stage.outputs}
+    if isinstance(result, tuple):
+        return dict(zip(stage.outputs, result, strict=True))
+    return {stage.outputs[0]: result}
+
+
+def _run_stage(run, frame: pd.DataFrame, name: str, place: str | None):
+    """Worker entry point: run a stage, return its result and stage records."""
+    with instrument.collect() as records:
+        with instrument.stage(name, place, rows=len(frame)):
+            result = run(frame)
+    return result, records
+
+
+def run_dag(
+    stages: list[Stage],
+    frame: pd.DataFrame,
+    place: str | None = None,
+    executor: str = STAGE_EXECUTOR,
+    max_workers: int | None = None,
+) -> tuple[pd.DataFrame, DagReport]:
+    """
+    Run stages in dependency order, concurrently where possible.
+
+    Returns:
+        (frame with every stage's output columns, DagReport)
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {EXECUTORS}")
+
+    deps = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    workers = max_workers or (int(STAGE_WORKERS) if STAGE_WORKERS else len(stages))
+    report = DagReport(place=place, executor=executor)
+    frame = frame.copy(deep=False)
+
+    def finish(stage: Stage, result, start: float):
+        report.stage_s[stage.name] = (start - t0, time.perf_counter() - t0)
+        for column, values in _outputs(stage, result).items():
+            frame[column] = values
+
+    processes = None
+    if executor == "process" and any(stage.gil for stage in stages):
+        processes = ProcessPoolExecutor(max_workers=workers)
+        # start the workers now, before this function starts any thread
+        processes.submit(int).result()
+    threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage")
+
+    t0 = time.perf_counter()
+    done, running = set(), {}
+    try:
+        while len(done) < len(stages):
+            progress = len(done)
+
+            # submit every stage whose inputs are ready
+            for stage in stages:
+                if stage.name in done or stage.name in running.values():
+                    continue
+                if not deps[stage.name] <= done:
+                    continue
+                if executor == "serial" and running:
+                    break
+
+                start = time.perf_counter()
+                cached = (
+                    load_stage(stage.name, stage.cache_key)
+                    if stage.cache_key is not None
+                    else None
+                )
+                if cached is not None:
+                    with instrument.stage(stage.name, place, rows=len(frame)):
+                        finish(stage, cached, start)
+                    done.add(stage.name)
+                    continue
+
+                inputs = frame[[c for c in stage.inputs if c in frame.columns]]
+                pool = processes if stage.gil and processes is not None else threads
+                future = pool.submit(_run_stage, stage.run, inputs, stage.name, place)
+                future.start = start
+                running[future] = stage.name
+                if executor == "serial":
+                    break
+
+            if not running:
+                if len(done) == progress:
+                    waiting = sorted(set(by_name) - done)
+                    raise ValueError(f"Stages {waiting} can never run")
+                continue  # a cached stage finished, check what became ready
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = by_name[running.pop(future)]
+                result, records = future.result()
+                instrument.forward(records)
+                if stage.cache_key is not None:
+                    store_stage(stage.name, stage.cache_key, result)
+                finish(stage, result, future.start)
+                done.add(stage.name)
+    finally:
+        threads.shutdown(cancel_futures=True)
+        if processes is not None:
+            processes.shutdown(cancel_futures=True)
+
+    report.wall_s = time.perf_counter() - t0
+    durations = {name: end - start for name, (start, end) in report.stage_s.items()}
+    report.critical_path, report.critical_path_s = critical_path(deps, durations)
+
+    logger.info(json.dumps({"event": "dag", **report.to_dict()}))
+    return frame, report
@@ -0,0 +1,192 @@
+"""
+Equity aggregation of block-to-school routes by block group and tract.
+
+Route results (one row per block x school, from src/route.py, or an
+ODMatrix from src/odmatrix.py) are turned into one long table of pairs, and
+every statistic is computed in one grouped pass, per area and school and
+per area over all schools:
+
+- length_weighted_score: mean score per meter traveled, over all routes
+  from the area (sum of score x length / sum of length);
+- mean_max_score: mean of each route's worst edge score;
+- low_stress_share: share of the area's blocks whose route never uses an
+  edge scored above `low_stress`, zero-length routes included (over all
+  schools: share of blocks with a low-stress route to at least one school);
+- median_detour: median ratio of route length to the shortest route;
+- n_blocks, n_routes.
+
+Areas come from the block GEOID: its first 12 digits are the block group
+GEOID, its first 11 the tract's. `join_geometries` dissolves the clipped
+census blocks (see notebooks/blocks.ipynb) into those areas, for
+choropleth-ready GeoParquet:
+
+    python -m src.equity data/out/od/somerville \\
+        data/out/somerville_census_blocks.parquet data/out/equity
+"""
+
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+# Routes whose worst edge scores at most this (on the 0-4 scale) are low stress
+LOW_STRESS_SCORE = float(os.environ.get("BIKE_STRESS_LOW_STRESS_SCORE", "2"))
+
+# level -> number of leading GEOID digits
+LEVELS = {"block_group": 12, "tract": 11}
+
+PAIR_COLUMNS = [
+    "block",
+    "school",
+    "sum_length",
+    "weighted_mean_score",
+    "max_score",
+    "detour_ratio",
+]
+
+
+def pairs_from_routes(routes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pair table from route GeoDataFrames (compute_routes_from_census_blocks_*).
+    They have no shortest route, so detour_ratio is NaN unless present.
+    """
+    pairs = pd.DataFrame(
+        {
+            "block": routes["from_block_geoid"].astype(str).to_numpy(),
+            "school": routes["to_school_id"].to_numpy(),
+            "sum_length": routes["sum_length"].to_numpy(dtype=float),
+            "weighted_mean_score": routes["weighted_mean_score"].to_numpy(
+                dtype=float, na_value=np.nan
+            ),
+            "max_score": routes["max_score"].to_numpy(dtype=float, na_value=np.nan),
+        }
+    )
+    if "detour_ratio" in routes:
+        pairs["detour_ratio"] = routes["detour_ratio"].to_numpy(dtype=float)
+    else:
+        pairs["detour_ratio"] = np.nan
+    return pairs[PAIR_COLUMNS]
+
+
+def pairs_from_od(od) -> pd.DataFrame:
+    """Pair table from an ODMatrix, dropping unreachable pairs."""
+    n_blocks, n_schools = len(od.blocks), len(od.schools)
+    pairs = pd.DataFrame(
+        {
+            # metrics are (blocks, schools): ravel in Fortran order, school-major
+            "block": np.tile(od.blocks.astype(str).to_numpy(), n_schools),
+            "school": np.repeat(od.schools.to_numpy(), n_blocks),
+            **{
+                name: np.ravel(od.metrics[name], order="F").astype(float)
+                for name in PAIR_COLUMNS[2:]
+            },
+        }
+    )
+    return pairs[pairs["sum_length"].notna()].reset_index(drop=True)
+
+
+def _stats(pairs: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """Grouped statistics of a pair table with "area" and "low" columns."""
+    grouped = pairs.groupby(by, sort=True)
+    stats = grouped.agg(
+        score_length=("score_length", "sum"),
+        scored_length=("scored_length", "sum"),
+        mean_max_score=("max_score", "mean"),
+        median_detour=("detour_ratio", "median"),
+        n_routes=("block", "size"),
+    )
+    stats["length_weighted_score"] = stats.pop("score_length") / stats.pop(
+        "scored_length"
+    ).replace(0, np.nan)
+
+    # share of blocks: collapse to one row per block first (any low-stress route)
+    blocks = pairs.groupby([*by, "block"], sort=False)["low"].any()
+    stats["low_stress_share"] = blocks.groupby(level=by).mean()
+    stats["n_blocks"] = blocks.groupby(level=by).size()
+
+    return stats.reset_index()
+
+
+def aggregate(
+    pairs: pd.DataFrame, level: str = "block_group", low_stress: float = LOW_STRESS_SCORE
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Equity statistics of routes per area.
+
+    Args:
+        pairs: Pair table, from pairs_from_routes or pairs_from_od.
+        level: "block_group" or "tract".
+        low_stress: Highest edge score of a low-stress route.
+
+    Returns:
+        (by_school, overall): one row per (area, school), and one per area
+        over all schools, with an "area" GEOID column.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {list(LEVELS)}")
+
+    scored = pairs["weighted_mean_score"].notna()
+    pairs = pairs.assign(
+        area=pairs["block"].str[: LEVELS[level]],
+        # a zero-length route (block centroid on the school's node) has no
+        # edges, hence no max_score, but is as low-stress as it gets
+        low=(pairs["max_score"] <= low_stress) | (pairs["sum_length"] == 0),
+        score_length=(pairs["weighted_mean_score"] * pairs["sum_length"]).where(
+            scored, 0.0
+        ),
+        scored_length=pairs["sum_length"].where(scored, 0.0),
+    )
+    return _stats(pairs, ["area", "school"]), _stats(pairs, ["area"])
+
+
+def area_geometries(blocks: gpd.GeoDataFrame, level: str) -> gpd.GeoDataFrame:
+    """Dissolve census blocks (GEOID20 + geometry) into block groups or tracts."""
+    areas = blocks[["GEOID20", blocks.geometry.name]].assign(
+        area=blocks["GEOID20"].astype(str).str[: LEVELS[level]]
+    )
+    return areas.dissolve(by="area")[[blocks.geometry.name]].reset_index()
+
+
+def join_geometries(stats: pd.DataFrame, areas: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Attach area polygons (from area_geometries) to aggregated statistics."""
+    return areas.merge(stats, on="area", how="right")
+
+
+def write_equity(
+    pairs: pd.DataFrame,
+    blocks: gpd.GeoDataFrame,
+    out_dir: str,
+    low_stress: float = LOW_STRESS_SCORE,
+) -> list[str]:
+    """
+    Aggregate pairs at every level and write GeoParquet files
+    <level>.parquet (over all schools) and <level>_by_school.parquet.
+
+    Returns:
+        list of written paths
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for level in LEVELS:
+        by_school, overall = aggregate(pairs, level, low_stress)
+        areas = area_geometries(blocks, level)
+        for name, stats in [(level, overall), (f"{level}_by_school", by_school)]:
+            path = os.path.join(out_dir, f"{name}.parquet")
+            join_geometries(stats, areas).to_parquet(path, index=False)
+            paths.append(path)
+    return paths
+
+
+def main():
+    from src.odmatrix import ODMatrix
+
+    od_dir, blocks_path, out_dir = sys.argv[1:4]
+    blocks = gpd.read_parquet(blocks_path, columns=["GEOID20", "geometry"])
+    for path in write_equity(pairs_from_od(ODMatrix.load(od_dir)), blocks, out_dir):
+        print(f"> Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
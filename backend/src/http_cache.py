@@ -0,0 +1,147 @@
+"""
+HTTP caching for full-network downloads (GET /networks/{slug}).
+
+A city's full GeoJSON only changes when its artifact does, so it is
+serialized once per artifact and profile, and saved next to the artifact
+together with gzip (and, if the brotli package is installed, brotli)
+compressed copies. Requests are answered straight from those files.
+
+Each variant is named after a digest of the artifact file, which is also
+its ETag and the version in its immutable URL:
+
+    <artifact dir>/<artifact key>.<version>.<profile>.geojson[.gz|.br]
+"""
+
+import glob
+import gzip
+import hashlib
+import os
+import uuid
+
+# brotli is optional: without it only gzip variants are written
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz", "identity": ""}
+
+_digests = {}  # path -> ((mtime, size), digest)
+
+
+def content_digest(path: str) -> str:
+    """SHA-256 of a file (hex), cached until the file changes."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    digest = sha.hexdigest()
+    _digests[path] = (signature, digest)
+    return digest
+
+
+def variant_paths(artifact_path: str, version: str, profile: str) -> dict[str, str]:
+    """Content-Encoding -> path of each variant of an artifact."""
+    base = f"{artifact_path.removesuffix('.arrow')}.{version}.{profile}.geojson"
+    encodings = [e for e in ENCODINGS if e != "br" or brotli is not None]
+    return {e: base + ENCODINGS[e] for e in encodings}
+
+
+def _write(path: str, data: bytes):
+    # unique temp name: two requests may write the same variant at once
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_variants(
+    artifact_path: str, version: str, profile: str, serialize
+) -> dict[str, str]:
+    """
+    Variants of an artifact for a profile, writing them if missing.
+
+    Args:
+        artifact_path: Path of the artifact.
+        version: Artifact version (digest), part of the file names.
+        profile: Weight profile of the payload.
+        serialize: Function () -> payload str, called only if needed.
+
+    Returns:
+        dict Content-Encoding -> path
+    """
+    paths = variant_paths(artifact_path, version, profile)
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    body = serialize().encode("utf-8")
+    _write(paths["identity"], body)
+    _write(paths["gzip"], gzip.compress(body, compresslevel=6, mtime=0))
+    if "br" in paths:
+        _write(paths["br"], brotli.compress(body, quality=9))
+
+    # drop the variants of older versions of this artifact
+    stale = glob.glob(f"{artifact_path.removesuffix('.arrow')}.*.{profile}.geojson*")
+    for path in stale:
+        if f".{version}." not in os.path.basename(path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    return paths
+
+
+def choose_encoding(accept_encoding: str | None, available) -> str:
+    """
+    Best Content-Encoding the client accepts ("identity" if none), from an
+    Accept-Encoding header.
+    """
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+
+    for encoding in ENCODINGS:
+        if encoding == "identity" or encoding not in available:
+            continue
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return "identity"
+
+
+def etag(version: str, profile: str, encoding: str = "identity") -> str:
+    """Strong ETag of a variant: each encoding is a different representation."""
+    suffix = "" if encoding == "identity" else f"-{encoding}"
+    return f'"{version}-{profile}{suffix}"'
+
+
+def etag_matches(if_none_match: str | None, version: str, profile: str) -> bool:
+    """
+    True if an If-None-Match header names any encoding of this version and
+    profile (weak comparison, as for conditional GETs).
+    """
+    if not if_none_match:
+        return False
+
+    base = f"{version}-{profile}"
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag == "*" or tag == base or tag.startswith(f"{base}-"):
+            return True
+    return False
@@ -0,0 +1,65 @@
+"""
+Import time per module, to keep the API's cold start fast.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+parses its report. From the backend directory:
+
+    python -m src.importtime api
+"""
+
+import os
+import subprocess
+import sys
+
+# modules are imported from the backend directory, like the API does
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules the API should only load when it builds a network
+HEAVY_MODULES = ["osmnx", "networkx", "sklearn", "scipy", "fiona", "matplotlib"]
+
+
+def measure(module: str) -> dict[str, float]:
+    """
+    Import a module in a new interpreter.
+
+    Returns:
+        dict of imported module name -> cumulative import time in seconds
+        (including its own imports), in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # lines look like "import time:  self [us] | cumulative | imported package"
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header
+        times[name.strip()] = int(cumulative) / 1e6
+
+    return times
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "api"
+    times = measure(module)
+
+    print(f"{module}: {times.get(module, 0.0):.3f}s")
+    top_level = {name: t for name, t in times.items() if "." not in name}
+    for name, t in sorted(top_level.items(), key=lambda kv: -kv[1])[:20]:
+        print(f"  {name:<30} {t:.3f}s")
+
+    heavy = [m for m in HEAVY_MODULES if m in times]
+    if heavy:
+        print(f"heavy modules imported: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Per-stage timing and profiling for the pipeline.
+
+Wrap a stage in `stage(...)` to record its wall time, CPU time, memory
+(RSS) change, growth of the process's peak RSS and row count. Every record
+is logged as one JSON line on the "bike_stress.stages" logger, and handed
+to the registered sinks (e.g. the API's Prometheus metrics).
+
+Set BIKE_STRESS_PROFILE_DIR to also dump a profile per stage into that
+directory: cProfile .prof files by default, or pyinstrument HTML reports if
+BIKE_STRESS_PROFILER=pyinstrument and pyinstrument is installed.
+
+Usage
+-----
+>>> with stage("process_network", place=place) as record:
+...     edges = process_network(edges)
+...     record.rows = len(edges)
+"""
+
+import cProfile
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger("bike_stress.stages")
+
+PROFILE_DIR = os.environ.get("BIKE_STRESS_PROFILE_DIR")
+PROFILER = os.environ.get("BIKE_STRESS_PROFILER", "cprofile")
+
+_sinks = []
+_local = threading.local()
+
+
+@dataclass
+class StageRecord:
+    name: str
+    place: str | None = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    # change of the resident set size over the stage (negative if it shrank)
+    rss_delta_bytes: int = 0
+    # growth of the process's peak RSS: 0 unless the stage set a new peak
+    peak_rss_growth_bytes: int = 0
+    rows: int | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def add_sink(sink):
+    """Register a function StageRecord -> None, called by publish()."""
+    _sinks.append(sink)
+
+
+def remove_sink(sink):
+    """Unregister a sink added with add_sink."""
+    _sinks.remove(sink)
+
+
+def publish(records: list[StageRecord]):
+    """Hand stage records to every registered sink."""
+    for record in records:
+        for sink in _sinks:
+            sink(record)
+
+
+@contextmanager
+def collect():
+    """
+    Collect the stage records produced in this thread instead of publishing
+    them, e.g. to send them back from a worker process. Yields the list.
+    """
+    records = []
+    stack = _collectors()
+    stack.append(records)
+    try:
+        yield records
+    finally:
+        stack.remove(records)
+
+
+def _collectors() -> list:
+    if not hasattr(_local, "collectors"):
+        _local.collectors = []
+    return _local.collectors
+
+
+def _peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (0 where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+@contextmanager
+def _profile(name: str, place: str | None):
+    if PROFILE_DIR is None:
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    label = re.sub(r"[^a-z0-9]+", "_", f"{place or ''} {name}".lower()).strip("_")
+    path = os.path.join(PROFILE_DIR, f"{label}-{int(time.time())}")
+
+    if PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{path}.html", "w") as f:
+                    f.write(profiler.output_html())
+            return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{path}.prof")
+
+
+@contextmanager
+def stage(name: str, place: str | None = None, rows: int | None = None):
+    """
+    Record one pipeline stage. Yields the StageRecord, so the stage can set
+    `rows` once it knows its output size.
+    """
+    record = StageRecord(name=name, place=place, rows=rows)
+
+    rss_before = _rss_bytes()
+    peak_before = _peak_rss_bytes()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+
+    with _profile(name, place):
+        yield record
+
+    record.wall_s = time.perf_counter() - wall_before
+    record.cpu_s = time.process_time() - cpu_before
+    record.rss_delta_bytes = _rss_bytes() - rss_before
+    record.peak_rss_growth_bytes = _peak_rss_bytes() - peak_before
+
+    logger.info(json.dumps({"event": "stage", **record.to_dict()}))
+    forward([record])
+
+
+def forward(records: list[StageRecord]):
+    """
+    Hand records to this thread's innermost collect(), or publish them if
+    there is none, e.g. records collected in a worker thread or process.
+    """
+    collectors = _collectors()
+    if collectors:
+        collectors[-1].extend(records)
+    else:
+        publish(records)
@@ -0,0 +1,313 @@
+"""
+Background builds of city networks for the API.
+
+`NetworkBuilder` keeps scored networks in memory, loads prebuilt artifacts
+from disk, and runs the pipeline for uncached cities in a worker pool so the
+event loop is never blocked. Concurrent requests for the same city share a
+single build (single-flight), and the number of builds queued or running is
+bounded so bursts get a quick "try again later" instead of a long wait.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from src import artifacts, instrument
+
+
+class QueueFullError(Exception):
+    """Raised when too many builds are already queued or running."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a build does not finish before the request deadline."""
+
+
+@dataclass
+class Job:
+    id: str
+    place: str
+    status: str = "pending"  # "pending" | "running" | "done" | "failed" | "cancelled"
+    error: str | None = None
+    created: float = field(default_factory=time.time)
+    finished: float | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class _Flight:
+    """A build in flight, shared by every request for the same place."""
+
+    job: Job
+    future: Future
+    waiters: int = 0  # requests currently awaiting the build
+    keep: bool = False  # started by a job or warm-up, never cancelled
+
+
+def _build_and_save(build_fn, place: str, artifact_dir: str):
+    """
+    Worker entry point (must be picklable for the process pool).
+
+    Returns the stage records, so the API process can publish them. The
+    edges themselves are not sent back: the API memory-maps the saved
+    artifact instead of keeping a private copy of the network.
+    """
+    with instrument.collect() as records:
+        edges = build_fn(place)
+        with instrument.stage("save_artifact", place, rows=len(edges)):
+            artifacts.save_artifact(place, edges, artifact_dir)
+    return records
+
+
+def _done_future(result) -> Future:
+    """A future that is already resolved, for places that are cached."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class NetworkBuilder:
+    """
+    In-memory cache of scored networks, backed by the artifact store,
+    with coalesced, bounded background builds.
+
+    Args:
+        build_fn: Top-level function place -> scored edges GeoDataFrame.
+        max_workers: Number of cities built at the same time.
+        max_pending: Maximum number of builds queued or running.
+        executor: "process" (default) to build in worker processes, so
+            pipeline runs do not compete for the API process's GIL, or "thread".
+        artifact_dir: Directory for saved artifacts.
+    """
+
+    def __init__(
+        self,
+        build_fn,
+        max_workers: int = 1,
+        max_pending: int = 4,
+        executor: str = "process",
+        artifact_dir: str = artifacts.ARTIFACT_DIR,
+    ):
+        if executor not in ("process", "thread"):
+            raise ValueError("executor must be 'process' or 'thread'")
+
+        self.build_fn = build_fn
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor_kind = executor
+        self.artifact_dir = artifact_dir
+        self._executor = None
+
+        self.networks = {}  # slug -> edges
+        self.signatures = {}  # slug -> artifact_signature of the loaded artifact
+        self.derived = {}  # (slug, factory) -> (edges, structure derived from them)
+        self.jobs = {}  # job id -> Job
+        self._flights = {}  # slug -> _Flight, for builds in flight
+        self._lock = threading.RLock()
+
+    @property
+    def executor(self):
+        # created lazily, so importing the API does not start worker processes
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # never fork the (multithreaded) server process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="network-build"
+                )
+        return self._executor
+
+    def get(self, place: str):
+        """
+        Return the cached network for a place (memory, then disk), or None.
+        The network is reloaded when its artifact changed on disk (e.g.
+        patched by update.py), see `signatures`.
+        """
+        slug = artifacts.place_slug(place)
+        signature = artifacts.artifact_signature(
+            artifacts.artifact_path(place, self.artifact_dir)
+        )
+        if slug in self.networks and signature in (self.signatures[slug], None):
+            return self.networks[slug]
+        if signature is None:
+            return None
+        return self._load(slug, place)
+
+    def get_derived(self, place: str, factory, edges=None):
+        """
+        A structure derived from a cached network, built on first use and
+        again whenever the network is reloaded.
+
+        Args:
+            place: Place name, must be cached.
+            factory: Function edges -> structure, e.g. EdgeIndex.from_edges.
+            edges: The network the structure is for (default: the cached one),
+                so that it matches edges returned by an earlier get().
+        """
+        key = (artifacts.place_slug(place), factory)
+        if edges is None:
+            edges = self.networks[key[0]]
+        cached = self.derived.get(key)
+        if cached is None or cached[0] is not edges:
+            cached = (edges, factory(edges))
+            self.derived[key] = cached
+        return cached[1]
+
+    def submit(self, place: str) -> Job:
+        """
+        Start building a place in the background.
+
+        Returns the job already building the place if there is one, or a job
+        that is immediately done if the place is cached.
+
+        Raises:
+            QueueFullError: if max_pending builds are already queued or running.
+        """
+        return self._submit(place, keep=True).job
+
+    def job(self, job_id: str) -> Job | None:
+        """Look up a job, refreshing its status from the worker pool."""
+        job = self.jobs.get(job_id)
+        if job is not None and job.status == "pending":
+            flight = self._flights.get(artifacts.place_slug(job.place))
+            if flight is not None and flight.job is job and flight.future.running():
+                job.status = "running"
+        return job
+
+    async def get_or_build(self, place: str, deadline: float | None = None):
+        """
+        Return the network for a place, waiting for a (shared) build if needed.
+
+        Args:
+            place: Place name.
+            deadline: time.time() by which the network is needed, or None.
+
+        Raises:
+            QueueFullError: if the build cannot be queued.
+            DeadlineExceededError: if the build does not finish in time. The
+                build keeps running if anyone else still needs it, and is
+                cancelled if it has not started and nobody does.
+        """
+        # loading an artifact (and decoding it) is slow: not on the event loop
+        edges = await asyncio.to_thread(self.get, place)
+        if edges is not None:
+            return edges
+
+        with self._lock:
+            flight = self._submit(place, keep=False)
+            flight.waiters += 1
+
+        try:
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(flight.future)), timeout
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(
+                f"Building '{place}' did not finish before the deadline"
+            ) from None
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not flight.keep:
+                    flight.future.cancel()
+
+        return await asyncio.to_thread(self.get, place)
+
+    def warm(self, places: list[str]) -> list[Job]:
+        """Load prebuilt artifacts for places, and start builds for the rest."""
+        jobs = []
+        for place in places:
+            self.get(place)
+            try:
+                jobs.append(self.submit(place))
+            except QueueFullError:
+                break
+        return jobs
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self, slug: str, place: str):
+        """Load a place's artifact (and its signature) into the cache."""
+        path = artifacts.artifact_path(place, self.artifact_dir)
+        signature = artifacts.artifact_signature(path)
+        edges = artifacts.load_artifact(place, self.artifact_dir)
+        if edges is None:
+            return None
+        with self._lock:
+            self.networks[slug] = edges
+            self.signatures[slug] = signature
+            for key in [key for key in self.derived if key[0] == slug]:
+                del self.derived[key]
+        return edges
+
+    def _submit(self, place: str, keep: bool) -> _Flight:
+        slug = artifacts.place_slug(place)
+
+        with self._lock:
+            flight = self._flights.get(slug)
+            if flight is not None:
+                flight.keep = flight.keep or keep
+                return flight
+
+            job = Job(id=uuid.uuid4().hex, place=place)
+
+            # only check that the artifact exists: get_or_build calls this on
+            # the event loop, where loading it would block other requests
+            if slug in self.networks or artifacts.has_artifact(
+                place, self.artifact_dir
+            ):
+                job.status = "done"
+                job.finished = time.time()
+                self.jobs[job.id] = job
+                return _Flight(job=job, future=_done_future([]))
+
+            if len(self._flights) >= self.max_pending:
+                raise QueueFullError(
+                    f"{len(self._flights)} builds already queued or running"
+                )
+
+            future = self.executor.submit(
+                _build_and_save, self.build_fn, place, self.artifact_dir
+            )
+            flight = _Flight(job=job, future=future, keep=keep)
+            self._flights[slug] = flight
+            self.jobs[job.id] = job
+
+        future.add_done_callback(lambda f: self._finish(slug, flight, f))
+        return flight
+
+    def _finish(self, slug: str, flight: _Flight, future: Future):
+        job = flight.job
+        job.finished = time.time()
+
+        if future.cancelled():
+            job.status = "cancelled"
+        elif future.exception() is not None:
+            job.status = "failed"
+            job.error = str(future.exception())
+        else:
+            instrument.publish(future.result())
+            try:
+                self._load(slug, job.place)
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"Could not load the built artifact: {e}"
+            else:
+                job.status = "done"
+
+        with self._lock:
+            if self._flights.get(slug) is flight:
+                del self._flights[slug]
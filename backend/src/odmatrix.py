@@ -0,0 +1,278 @@
+"""
+Origin-destination matrix of block-to-school routes.
+
+`compute_routes_from_census_blocks_to_all_schools` (src/route.py) returns a
+GeoDataFrame row, with a full LineString, per block x school pair. For
+city-wide analysis `compute_od_matrix` instead keeps one dense float32
+array per route metric, shaped (blocks, schools), so questions like "which
+blocks are within 1.5 km of school Y on low-stress streets" are array
+slices:
+
+>>> od = compute_od_matrix(G, blocks, schools)
+>>> od.save("data/out/od/somerville")
+>>> od = ODMatrix.load("data/out/od/somerville")
+>>> od.blocks_within(school_id, max_length=1500, max_score=2)
+
+Each school needs one Dijkstra run on the reversed graph (plus one by
+length, for the detour ratio) instead of one route per pair; route metrics
+are accumulated along the shortest-path tree. Routes themselves are
+optional and kept as lists of edge ids (positions in `edge_index`, the
+graph's (u, v, key) edges), not geometries.
+
+On disk, an OD matrix is a directory with one .npy file per array (loaded
+memory-mapped, school columns contiguous) and an index.json with the block
+and school ids.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import osmnx as ox
+import pandas as pd
+
+from src.route import ROUTE_WEIGHTS, _score_attribute
+
+# metrics stored for every block x school pair
+METRICS = [
+    "sum_length",
+    "weighted_mean_score",
+    "min_score",
+    "max_score",
+    "shortest_length",
+    "detour_ratio",
+]
+
+
+@dataclass
+class ODMatrix:
+    """
+    Route metrics per (block, school) pair.
+
+    metrics: name -> float32 array (n_blocks, n_schools), NaN if unreachable
+    route_offsets: int64 (n_schools * n_blocks + 1), school-major offsets
+        into route_edges, or None if routes were not kept
+    route_edges: int32 edge ids (rows of edge_index), in travel order
+    edge_index: int64 (n_edges, 3) of (u, v, key)
+    """
+
+    blocks: pd.Index
+    schools: pd.Index
+    weight: str
+    metrics: dict[str, np.ndarray]
+    route_offsets: np.ndarray | None = None
+    route_edges: np.ndarray | None = None
+    edge_index: np.ndarray | None = field(default=None, repr=False)
+
+    def metric(self, name: str) -> pd.DataFrame:
+        """One metric as a DataFrame (blocks x schools)."""
+        return pd.DataFrame(self.metrics[name], index=self.blocks, columns=self.schools)
+
+    def blocks_within(
+        self, school, max_length: float, max_score: float | None = None
+    ) -> pd.Index:
+        """
+        Blocks whose route to a school is at most max_length meters long and,
+        if given, never uses an edge scored above max_score.
+        """
+        j = self.schools.get_loc(school)
+        mask = self.metrics["sum_length"][:, j] <= max_length
+        if max_score is not None:
+            mask &= self.metrics["max_score"][:, j] <= max_score
+        return self.blocks[mask]
+
+    def route(self, block, school) -> np.ndarray:
+        """(u, v, key) of the edges of one route, in travel order."""
+        if self.route_offsets is None:
+            raise ValueError("Routes were not kept (keep_routes=False)")
+        i = self.blocks.get_loc(block)
+        j = self.schools.get_loc(school)
+        pair = j * len(self.blocks) + i
+        ids = self.route_edges[self.route_offsets[pair] : self.route_offsets[pair + 1]]
+        return self.edge_index[ids]
+
+    def save(self, path: str) -> str:
+        """Write the matrix to a directory (created if needed), returns it."""
+        os.makedirs(path, exist_ok=True)
+        for name, values in self.metrics.items():
+            # Fortran order: each school's column is contiguous on disk
+            np.save(os.path.join(path, f"{name}.npy"), np.asfortranarray(values))
+
+        arrays = {
+            "route_offsets": self.route_offsets,
+            "route_edges": self.route_edges,
+            "edge_index": self.edge_index,
+        }
+        for name, values in arrays.items():
+            if values is not None:
+                np.save(os.path.join(path, f"{name}.npy"), values)
+
+        index = {
+            "weight": self.weight,
+            "blocks": self.blocks.tolist(),
+            "schools": self.schools.tolist(),
+            "metrics": list(self.metrics),
+            "routes": self.route_offsets is not None,
+        }
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump(index, f)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ODMatrix":
+        """Load a saved matrix; arrays are memory-mapped read-only."""
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        routes = index["routes"]
+        return cls(
+            blocks=pd.Index(index["blocks"]),
+            schools=pd.Index(index["schools"]),
+            weight=index["weight"],
+            metrics={name: array(name) for name in index["metrics"]},
+            route_offsets=array("route_offsets") if routes else None,
+            route_edges=array("route_edges") if routes else None,
+            edge_index=array("edge_index") if routes else None,
+        )
+
+
+def _tree_metrics(G, target, weight: str, score_attr: str, edge_ids: dict):
+    """
+    Shortest-path tree of every node to target, with route metrics.
+
+    Returns dicts node -> (length, score x length, min score, max score)
+    and node -> (next node, edge id) towards target.
+    """
+    # paths to target are paths from target in the reversed graph
+    pred, dist = nx.dijkstra_predecessor_and_distance(
+        G.reverse(copy=False), target, weight=weight
+    )
+
+    metrics = {target: (0.0, 0.0, np.inf, -np.inf)}
+    step = {}
+    # dist is filled in the order Dijkstra settles nodes: parents come first
+    for node in dist:
+        if node == target:
+            continue
+        parent = pred[node][0]
+        # parallel edges: the one the route uses is the lowest weight one
+        key, data = min(
+            G[node][parent].items(), key=lambda kv: kv[1].get(weight, 1)
+        )
+        length = data.get("length", 0)
+        score = data.get(score_attr, 0)
+
+        total, weighted, low, high = metrics[parent]
+        metrics[node] = (
+            total + length,
+            weighted + score * length,
+            min(low, score),
+            max(high, score),
+        )
+        step[node] = (parent, edge_ids[(node, parent, key)])
+
+    return metrics, step
+
+
+def _distances(G, target, weight: str) -> dict:
+    return nx.single_source_dijkstra_path_length(
+        G.reverse(copy=False), target, weight=weight
+    )
+
+
+def compute_od_matrix(
+    G: nx.MultiDiGraph,
+    blocks: gpd.GeoDataFrame,
+    schools: gpd.GeoDataFrame,
+    weight: str = "composite_score",
+    keep_routes: bool = False,
+    block_id: str = "GEOID20",
+    school_id: str = "GlobalID",
+) -> ODMatrix:
+    """
+    Route every block to every school and keep the metrics as arrays.
+
+    Blocks and schools are snapped to their nearest graph nodes, like
+    `get_route_gdf`. Metrics are those of `get_route_gdf` (length-weighted
+    mean, min and max of the routed score, total length), plus the length
+    of the shortest route by distance and the detour ratio
+    sum_length / shortest_length.
+
+    Args:
+        G: Routing graph, with "length" and the weight on every edge.
+        blocks: Census block points (or centroids), in G's CRS.
+        schools: School points, in G's CRS.
+        weight: Edge weight to route on, one of ROUTE_WEIGHTS.
+        keep_routes: Also keep each route's edge ids.
+        block_id, school_id: Columns with the block and school ids.
+
+    Returns:
+        ODMatrix
+    """
+    if weight not in ROUTE_WEIGHTS:
+        raise ValueError(f"weight must be one of {ROUTE_WEIGHTS}")
+    score_attr = _score_attribute(weight)
+
+    block_nodes = ox.nearest_nodes(G, X=blocks.geometry.x, Y=blocks.geometry.y)
+    school_nodes = ox.nearest_nodes(G, X=schools.geometry.x, Y=schools.geometry.y)
+
+    edge_index = np.array(list(G.edges(keys=True)), dtype=np.int64).reshape(-1, 3)
+    edge_ids = {tuple(e): i for i, e in enumerate(G.edges(keys=True))}
+
+    shape = (len(blocks), len(schools))
+    metrics = {name: np.full(shape, np.nan, dtype=np.float32) for name in METRICS}
+    routes = []
+
+    for j, target in enumerate(school_nodes):
+        tree, step = _tree_metrics(G, target, weight, score_attr, edge_ids)
+        shortest = _distances(G, target, "length")
+
+        for i, node in enumerate(block_nodes):
+            if node not in tree:
+                if keep_routes:
+                    routes.append([])
+                continue
+
+            total, weighted, low, high = tree[node]
+            metrics["sum_length"][i, j] = total
+            metrics["shortest_length"][i, j] = shortest.get(node, np.nan)
+            if total > 0:
+                metrics["weighted_mean_score"][i, j] = weighted / total
+            if node != target:
+                metrics["min_score"][i, j] = low
+                metrics["max_score"][i, j] = high
+
+            if keep_routes:
+                route = []
+                while node != target:
+                    node, edge = step[node]
+                    route.append(edge)
+                routes.append(route)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics["detour_ratio"] = np.where(
+            metrics["shortest_length"] > 0,
+            metrics["sum_length"] / metrics["shortest_length"],
+            np.nan,
+        ).astype(np.float32)
+
+    od = ODMatrix(
+        blocks=pd.Index(blocks[block_id]),
+        schools=pd.Index(schools[school_id]),
+        weight=weight,
+        metrics=metrics,
+    )
+    if keep_routes:
+        lengths = np.array([len(r) for r in routes], dtype=np.int64)
+        od.route_offsets = np.concatenate([[0], np.cumsum(lengths)])
+        od.route_edges = np.array(
+            [e for r in routes for e in r], dtype=np.int32
+        )
+        od.edge_index = edge_index
+    return od
@@ -0,0 +1,86 @@
+"""
+Read OSM change files (.osc, osmChange XML), e.g. the minutely/daily diffs
+published by planet.openstreetmap.org or produced by `osmium derive-changes`.
+
+Only what network updates need is kept: the ids of changed ways and nodes,
+the new tags and node lists of created/modified ways, and the new
+coordinates of created/modified nodes.
+"""
+
+import gzip
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+
+
+@dataclass
+class OsmChange:
+    # created or modified way id -> {"tags": {...}, "nodes": [node ids]}
+    ways: dict[int, dict] = field(default_factory=dict)
+    deleted_ways: set[int] = field(default_factory=set)
+    # created or modified node id -> (lon, lat)
+    nodes: dict[int, tuple[float, float]] = field(default_factory=dict)
+    deleted_nodes: set[int] = field(default_factory=set)
+
+    @property
+    def touched_ways(self) -> set[int]:
+        return set(self.ways) | self.deleted_ways
+
+    @property
+    def touched_nodes(self) -> set[int]:
+        return set(self.nodes) | self.deleted_nodes
+
+    def __bool__(self) -> bool:
+        return bool(self.touched_ways or self.touched_nodes)
+
+
+def read_osc(path: str) -> OsmChange:
+    """
+    Parse an osmChange file (.osc, or gzipped .osc.gz).
+
+    When an element changes several times in one file, the last change wins,
+    like when the file is applied in order.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    change = OsmChange()
+
+    with opener(path, "rb") as f:
+        # <osmChange><create|modify|delete><node|way|relation .../>...
+        action = None
+        for event, element in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if element.tag in ("create", "modify", "delete"):
+                    action = element.tag
+                continue
+
+            if element.tag == "node" and action is not None:
+                node_id = int(element.get("id"))
+                if action == "delete":
+                    change.nodes.pop(node_id, None)
+                    change.deleted_nodes.add(node_id)
+                else:
+                    change.deleted_nodes.discard(node_id)
+                    change.nodes[node_id] = (
+                        float(element.get("lon")),
+                        float(element.get("lat")),
+                    )
+                element.clear()
+
+            elif element.tag == "way" and action is not None:
+                way_id = int(element.get("id"))
+                if action == "delete":
+                    change.ways.pop(way_id, None)
+                    change.deleted_ways.add(way_id)
+                else:
+                    change.deleted_ways.discard(way_id)
+                    change.ways[way_id] = {
+                        "tags": {
+                            tag.get("k"): tag.get("v") for tag in element.iter("tag")
+                        },
+                        "nodes": [int(nd.get("ref")) for nd in element.iter("nd")],
+                    }
+                element.clear()
+
+            elif element.tag in ("create", "modify", "delete"):
+                action = None
+
+    return change
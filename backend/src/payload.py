@@ -0,0 +1,167 @@
+"""
+Smaller output payloads: simplified, quantized geometries and TopoJSON.
+
+Scored edges keep full-precision WGS84 coordinates (15+ significant digits
+per value) on every vertex, which is most of a GeoJSON payload. Before
+serializing, `shrink_geometry`:
+
+- simplifies each line with Douglas-Peucker in a projected (UTM) CRS, so the
+  tolerance is in meters; end points are always kept, so edges still meet
+  at their nodes;
+- rounds coordinates to `precision` decimals (6 decimals of a degree are
+  about 0.1 m).
+
+`to_topojson` writes the same features as a TopoJSON topology: coordinates
+are quantized to integers and delta-encoded, and identical (or reversed)
+lines share one arc. Edges only touch at their end nodes, so arcs are not
+split at junctions.
+"""
+
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# Simplification tolerance in meters (0 disables it)
+SIMPLIFY_TOLERANCE = float(os.environ.get("BIKE_STRESS_SIMPLIFY_TOLERANCE", "1"))
+
+# Decimals kept in output coordinates
+COORDINATE_PRECISION = int(os.environ.get("BIKE_STRESS_COORDINATE_PRECISION", "6"))
+
+FORMATS = ("geojson", "topojson")
+
+
+def simplify(geometry: gpd.GeoSeries, tolerance: float) -> gpd.GeoSeries:
+    """
+    Topology-preserving simplification with a tolerance in meters.
+
+    Geographic geometries are simplified in their UTM zone and projected
+    back; projected ones are simplified as they are.
+    """
+    if tolerance <= 0 or len(geometry) == 0:
+        return geometry
+
+    if geometry.crs is None or not geometry.crs.is_geographic:
+        return gpd.GeoSeries(
+            shapely.simplify(geometry.array, tolerance, preserve_topology=True),
+            index=geometry.index,
+            crs=geometry.crs,
+        )
+
+    utm = geometry.estimate_utm_crs()
+    projected = geometry.to_crs(utm)
+    simplified = gpd.GeoSeries(
+        shapely.simplify(projected.array, tolerance, preserve_topology=True),
+        index=geometry.index,
+        crs=utm,
+    )
+    return simplified.to_crs(geometry.crs)
+
+
+def quantize(geometry: gpd.GeoSeries, precision: int) -> gpd.GeoSeries:
+    """Round every coordinate to `precision` decimals."""
+    return gpd.GeoSeries(
+        shapely.transform(geometry.array, lambda xy: np.round(xy, precision)),
+        index=geometry.index,
+        crs=geometry.crs,
+    )
+
+
+def shrink_geometry(
+    edges: gpd.GeoDataFrame,
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    precision: int | None = COORDINATE_PRECISION,
+) -> gpd.GeoDataFrame:
+    """
+    Simplify (tolerance in meters) and round (decimals) the edge geometries.
+
+    Returns a new GeoDataFrame; the input is not modified.
+    """
+    geometry = simplify(edges.geometry, tolerance)
+    if precision is not None:
+        geometry = quantize(geometry, precision)
+    return edges.set_geometry(geometry.rename(edges.geometry.name))
+
+
+def to_topojson(
+    edges: gpd.GeoDataFrame, precision: int = COORDINATE_PRECISION, name: str = "streets"
+) -> str:
+    """
+    TopoJSON topology with one LineString per edge, in the object `name`.
+
+    Coordinates are quantized to a grid of 10 ** -precision (the topology's
+    "transform") and delta-encoded within each arc.
+    """
+    geometry = edges.geometry.array
+    coords, index = shapely.get_coordinates(geometry, return_index=True)
+    counts = np.bincount(index, minlength=len(edges))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+    scale = 10.0**-precision
+    translate = coords.min(axis=0) if len(coords) else np.zeros(2)
+    grid = np.round((coords - translate) / scale).astype(np.int64)
+
+    # delta encoding: the first point of each arc is absolute
+    deltas = grid.copy()
+    deltas[1:] -= grid[:-1]
+    deltas[starts[counts > 0]] = grid[starts[counts > 0]]
+
+    properties = json.loads(
+        pd.DataFrame(edges.drop(columns=edges.geometry.name)).to_json(
+            orient="records"
+        )
+    )
+
+    arcs = []
+    arc_ids = {}
+    geometries = []
+    for i, (start, count) in enumerate(zip(starts, counts)):
+        if count == 0:
+            geometries.append({"type": None, "properties": properties[i]})
+            continue
+
+        line = grid[start : start + count]
+        key = line.tobytes()
+        if key in arc_ids:
+            arc = arc_ids[key]
+        elif (reverse := line[::-1].tobytes()) in arc_ids:
+            arc = ~arc_ids[reverse]  # TopoJSON: ~i is arc i reversed
+        else:
+            arc = arc_ids[key] = len(arcs)
+            arcs.append(deltas[start : start + count].tolist())
+
+        geometries.append(
+            {"type": "LineString", "arcs": [arc], "properties": properties[i]}
+        )
+
+    topology = {
+        "type": "Topology",
+        "transform": {"scale": [scale, scale], "translate": translate.tolist()},
+        "objects": {name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": arcs,
+    }
+    return json.dumps(topology, separators=(",", ":"))
+
+
+def serialize(
+    edges: gpd.GeoDataFrame,
+    format: str = "geojson",
+    tolerance: float = SIMPLIFY_TOLERANCE,
+    precision: int | None = COORDINATE_PRECISION,
+) -> str:
+    """
+    Edges as a GeoJSON FeatureCollection or TopoJSON topology string, after
+    simplifying and rounding their geometries.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of {FORMATS}")
+
+    edges = shrink_geometry(edges, tolerance, precision)
+    if format == "topojson":
+        return to_topojson(
+            edges, COORDINATE_PRECISION if precision is None else precision
+        )
+    return edges.to_json()
@@ -0,0 +1,89 @@
+"""
+Partial responses: select edges by bounding box and attribute values.
+
+`EdgeIndex` is built once per cached network: an STRtree over the edge
+geometries plus the arrays the filters compare against, so each request
+only needs a tree query and a few boolean masks.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import shapely
+
+
+@dataclass
+class EdgeIndex:
+    tree: shapely.STRtree
+    separation_level: pd.Categorical
+
+    @classmethod
+    def from_edges(cls, edges) -> "EdgeIndex":
+        return cls(
+            tree=shapely.STRtree(edges.geometry.values),
+            separation_level=pd.Categorical(edges["separation_level"]),
+        )
+
+
+def edge_mask(
+    edges,
+    index: EdgeIndex,
+    bbox: tuple[float, float, float, float] | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+    separation_level: list[str] | None = None,
+    score_column: str = "composite_score",
+) -> np.ndarray:
+    """
+    Boolean mask of the edges matching every given filter.
+
+    Args:
+        edges: Scored edges the index was built from.
+        index: EdgeIndex for the edges.
+        bbox: (minx, miny, maxx, maxy) in the edges' CRS; keeps edges
+            intersecting the box.
+        min_score, max_score: Inclusive bounds on score_column. Edges with a
+            missing score are dropped when either bound is given.
+        separation_level: Keep edges with one of these separation levels.
+        score_column: Score the bounds apply to.
+
+    Returns:
+        np.ndarray of bool, one per edge
+    """
+    mask = np.ones(len(edges), dtype=bool)
+
+    if bbox is not None:
+        hits = index.tree.query(shapely.box(*bbox), predicate="intersects")
+        in_bbox = np.zeros(len(edges), dtype=bool)
+        in_bbox[hits] = True
+        mask &= in_bbox
+
+    if min_score is not None or max_score is not None:
+        scores = edges[score_column].to_numpy("float64", na_value=np.nan)
+        lower = -np.inf if min_score is None else min_score
+        upper = np.inf if max_score is None else max_score
+        # comparisons with NaN are False, so missing scores drop out
+        mask &= (scores >= lower) & (scores <= upper)
+
+    if separation_level is not None:
+        mask &= np.asarray(index.separation_level.isin(separation_level))
+
+    return mask
+
+
+def select_columns(edges, columns: list[str] | None = None):
+    """
+    Keep only the given columns (all if None). The geometry column is always kept.
+
+    Raises:
+        KeyError: if a column does not exist.
+    """
+    if columns is None:
+        return edges
+
+    missing = [col for col in columns if col not in edges.columns]
+    if missing:
+        raise KeyError(f"Unknown columns: {missing}")
+
+    return edges[[col for col in columns if col != "geometry"] + ["geometry"]]
@@ -0,0 +1,145 @@
+"""
+Collapse both directions of two-way streets into one display edge.
+
+`ox.graph_to_gdfs` returns a two-way street as two edges, u -> v and v -> u,
+with the same tags and reversed geometry (osmnx marks the second copy with
+`reversed=True`). For display and scoring one copy is enough, which halves
+the features served by /getNetwork. `expand_two_way` restores the reverse
+copies for routing (see route.routing_graph).
+"""
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from src import tags
+from src.schema import to_label
+from src.stressmodel.separation_level import _first
+
+# columns that legitimately differ between the two copies of a street
+DIRECTED_COLUMNS = ["geometry", "reversed", "u_original", "v_original"]
+
+# (u -> v, v -> u) column pairs, swapped in the reverse copy of an edge
+SWAPPED_COLUMNS = [
+    ("u_original", "v_original"),
+    ("separation_level_forward", "separation_level_backward"),
+    ("separation_level_forward_score", "separation_level_backward_score"),
+    ("composite_score_directed", "composite_score_directed_backward"),
+]
+
+
+def _attribute_hash(edges: pd.DataFrame) -> np.ndarray:
+    """Hash of each edge's undirected attributes (tags, rounded length)."""
+    columns = {}
+    for col in edges.columns:
+        if col in DIRECTED_COLUMNS:
+            continue
+        values = edges[col]
+        if col == "length":
+            values = values.round(2)
+        elif tags.is_tag_column(values):
+            values = tags.labels(values)
+        elif values.dtype == object:
+            # lists are not hashable: use their ";"-joined label
+            values = values.map(to_label)
+        columns[col] = values.to_numpy()
+
+    frame = pd.DataFrame(columns, index=pd.RangeIndex(len(edges)))
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def collapse_reciprocal_edges(edges: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop the reverse copy of every u -> v / v -> u pair with identical
+    attributes.
+
+    The copy kept is the one in the OSM way's direction (`reversed=False`),
+    so cycleway:left/right stay relative to its geometry. Adds a "two_way"
+    column, True for edges that now stand for both directions.
+
+    Args:
+        edges: Edges with a (u, v, key) index, as from `ox.graph_to_gdfs`.
+    Returns:
+        pd.DataFrame (or GeoDataFrame, if the input was one)
+    """
+    u = edges.index.get_level_values("u").to_numpy()
+    v = edges.index.get_level_values("v").to_numpy()
+    attrs = _attribute_hash(edges)
+
+    # pair the n-th u < v edge with the n-th u > v edge of the same street
+    keys = pd.DataFrame(
+        {"lo": np.minimum(u, v), "hi": np.maximum(u, v), "attrs": attrs}
+    )
+    forward = u < v
+    keys["rank"] = keys.groupby(
+        [keys["lo"], keys["hi"], keys["attrs"], forward]
+    ).cumcount()
+    keys["row"] = np.arange(len(edges))
+
+    on = ["lo", "hi", "attrs", "rank"]
+    pairs = keys[forward].merge(
+        keys[~forward & (u != v)], on=on, suffixes=("_fwd", "_bwd")
+    )
+    row_fwd = pairs["row_fwd"].to_numpy()
+    row_bwd = pairs["row_bwd"].to_numpy()
+
+    if "reversed" in edges:
+        # merged ways have a list: use its first value, like separation_level
+        first = edges["reversed"].map(_first).to_numpy(dtype=object)
+        is_reversed = first == True  # noqa: E712
+    else:
+        is_reversed = np.zeros(len(edges), dtype=bool)
+
+    # drop the reversed copy (the v > u one if neither or both are marked)
+    drop_fwd = is_reversed[row_fwd] & ~is_reversed[row_bwd]
+    drop = np.where(drop_fwd, row_fwd, row_bwd)
+    keep = np.where(drop_fwd, row_bwd, row_fwd)
+
+    two_way = np.zeros(len(edges), dtype=bool)
+    two_way[keep] = True
+    mask = np.ones(len(edges), dtype=bool)
+    mask[drop] = False
+
+    return edges.assign(two_way=two_way)[mask]
+
+
+def expand_two_way(edges: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the v -> u copy of every collapsed two-way edge (`two_way`), the
+    inverse of collapse_reciprocal_edges for routing.
+
+    The copy has the reversed geometry and `reversed` flag, and its
+    directed columns swapped (SWAPPED_COLUMNS), so e.g. its
+    "composite_score_directed" only counts the facilities on its side.
+    It gets the next free key between v and u.
+    """
+    if "two_way" not in edges:
+        return edges
+    two_way = edges["two_way"].fillna(False).to_numpy(dtype=bool)
+    if not two_way.any():
+        return edges
+
+    forward = edges[two_way]
+    backward = forward.copy()
+    for a, b in SWAPPED_COLUMNS:
+        if a in forward and b in forward:
+            backward[a] = forward[b].to_numpy()
+            backward[b] = forward[a].to_numpy()
+    if "reversed" in forward:
+        backward["reversed"] = ~forward["reversed"].fillna(False).astype(bool)
+    if "geometry" in forward:
+        backward["geometry"] = shapely.reverse(forward["geometry"].to_numpy())
+
+    # keys continue after the edges already going v -> u
+    u = forward.index.get_level_values("u").to_numpy()
+    v = forward.index.get_level_values("v").to_numpy()
+    keys = edges.index.get_level_values("key")
+    last_key = (
+        pd.Series(keys, index=edges.index.droplevel("key")).groupby(level=[0, 1]).max()
+    )
+    start = np.array([last_key.get((b, a), -1) + 1 for a, b in zip(u, v)])
+    offset = pd.Series(0, index=range(len(u))).groupby([v, u]).cumcount().to_numpy()
+    backward.index = pd.MultiIndex.from_arrays(
+        [v, u, start + offset], names=edges.index.names
+    )
+    return pd.concat([edges, backward])
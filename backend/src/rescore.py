@@ -0,0 +1,118 @@
+"""
+Re-score a cached network with a different model configuration.
+
+The frontend lets users change category scores and weights. Instead of
+re-scoring every feature in the browser, `CategoryCodes` stores, once per
+network, the integer category code of every edge for each model input. A
+new configuration then only needs one table lookup per input and a single
+weighted sum.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.stressmodel.composite import weighted_scores
+from src.stressmodel.spec import SPEC
+
+# Speed buckets (see model_spec.json): a speed belongs to the first bucket
+# whose upper bound (mph) it does not exceed.
+SPEED_CATEGORIES = SPEC.speed_categories
+SPEED_THRESHOLDS = SPEC.speed_thresholds
+
+# model parameters (keys of the frontend's BikeInfrastructureModel)
+PARAMETERS = ["separation_level", "street_classification", "speed_limit"]
+
+# parameter -> category of edges without a value (or with a category the
+# model has no score for), as scored by the pipeline; others are left out
+UNKNOWN_CATEGORIES = {"street_classification": SPEC.default_classification}
+
+
+@dataclass
+class CategoryCodes:
+    """
+    Integer category codes for every edge, per model parameter.
+
+    codes[p] indexes into categories[p] + [missing]: a code equal to
+    len(categories[p]) means the edge has no value for the parameter.
+    """
+
+    categories: dict[str, list[str]]
+    codes: dict[str, np.ndarray]
+
+    @classmethod
+    def from_edges(cls, edges) -> "CategoryCodes":
+        categories = {}
+        codes = {}
+
+        for param in ["separation_level", "street_classification"]:
+            values = edges[param]
+            if param in UNKNOWN_CATEGORIES and values.isna().any():
+                values = values.astype(object).fillna(UNKNOWN_CATEGORIES[param])
+            values = pd.Categorical(values)
+            categories[param] = list(values.categories)
+            codes[param] = _with_missing(values.codes, len(values.categories))
+
+        speed = pd.to_numeric(edges["maxspeed_int"], errors="coerce").to_numpy(
+            "float64", na_value=np.nan
+        )
+        speed_codes = np.searchsorted(SPEED_THRESHOLDS, speed, side="left")
+        speed_codes = np.minimum(speed_codes, len(SPEED_CATEGORIES) - 1)
+        speed_codes[np.isnan(speed)] = -1
+        categories["speed_limit"] = SPEED_CATEGORIES
+        codes["speed_limit"] = _with_missing(speed_codes, len(SPEED_CATEGORIES))
+
+        return cls(categories=categories, codes=codes)
+
+    def __len__(self) -> int:
+        return len(self.codes["speed_limit"])
+
+
+def _with_missing(codes: np.ndarray, n_categories: int) -> np.ndarray:
+    """Map missing codes (-1) to n_categories, the slot of the missing value."""
+    codes = np.where(codes < 0, n_categories, codes)
+    return codes.astype(np.min_scalar_type(n_categories))
+
+
+def lookup_table(
+    categories: list[str], scores: dict[str, float], unknown: str | None = None
+) -> np.ndarray:
+    """
+    Score per category code, plus NaN for missing values.
+    Categories without a score in the model get the score of the unknown
+    category if given, or are treated as missing.
+    """
+    default = scores.get(unknown, np.nan)
+    table = [scores.get(category, default) for category in categories] + [np.nan]
+    return np.array(table, dtype="float64")
+
+
+def rescore(
+    codes: CategoryCodes,
+    category_scores: dict[str, dict[str, float]],
+    weights: dict[str, float],
+) -> np.ndarray:
+    """
+    Composite score of every edge under a model configuration.
+
+    Args:
+        codes: Precomputed category codes for the network.
+        category_scores: parameter -> {category: score}, for each of PARAMETERS.
+        weights: parameter -> weight, for each of PARAMETERS.
+
+    Returns:
+        np.ndarray of float32, NaN where no parameter has a score. Missing
+        scores are left out of the weighted mean, as in the frontend model.
+    """
+    scores = np.column_stack(
+        [
+            lookup_table(
+                codes.categories[p], category_scores[p], UNKNOWN_CATEGORIES.get(p)
+            )[codes.codes[p]]
+            for p in PARAMETERS
+        ]
+    )
+    weight_vector = np.array([[weights[p]] for p in PARAMETERS], dtype="float64")
+
+    return weighted_scores(scores, weight_vector)[:, 0].astype(np.float32)
@@ -5,6 +5,33 @@ import pandas as pd
 from shapely.geometry import LineString, Point
 from tqdm import tqdm
 
+from src.reciprocal import expand_two_way
+from src.stressmodel.composite import PROFILES, profile_column
+
+# edge attributes that can be used as routing weights
+# ("composite_score_directed" only counts bike facilities on the side of travel)
+ROUTE_WEIGHTS = [
+    "composite_score",
+    "composite_score_directed",
+    "length",
+] + [profile_column(p) for p in PROFILES]
+
+
+def routing_graph(nodes: gpd.GeoDataFrame, edges: gpd.GeoDataFrame) -> nx.MultiDiGraph:
+    """
+    Routing graph of scored nodes and edges (as from prepare_data_for_place).
+
+    Collapsed two-way streets (collapse_two_way=True) get back their v -> u
+    edge, so they can be travelled both ways, and "composite_score_directed"
+    counts the facilities on the side of travel in both directions.
+    """
+    return ox.graph_from_gdfs(nodes, expand_two_way(edges))
+
+
+def _score_attribute(weight: str) -> str:
+    """Score attribute summarized along a route: the weight itself if it is a score."""
+    return weight if weight.startswith("composite_score") else "composite_score"
+
 
 def get_route_gdf(G, start_coord, end_coord, weight="composite_score"):
     """
@@ -16,7 +43,10 @@ def get_route_gdf(G, start_coord, end_coord, weight="composite_score"):
     - start_coord: tuple (x, y) OR shapely.geometry.Point
     - end_coord: tuple (x, y) OR shapely.geometry.Point
     - weight: str, edge attribute to use as weight (default: "composite_score")
-              Common options: "composite_score", "length"
+              Common options: "composite_score", "length", a profile score
+              like "composite_score_child", or "composite_score_directed"
+              (bike facilities on the side of travel only). Route statistics
+              summarize the score routed on, "composite_score" for "length".
 
     Returns:
     - GeoDataFrame with columns: ['geometry', 'weighted_mean_score',
@@ -67,6 +97,7 @@ def get_route_gdf(G, start_coord, end_coord, weight="composite_score"):
         raise ValueError("No route found between start and end")
 
     # --- 4. Extract edge data ---
+    score_attr = _score_attribute(weight)
     route_edges = list(zip(route[:-1], route[1:]))
     composite_scores = []
     lengths = []
@@ -75,7 +106,7 @@ def get_route_gdf(G, start_coord, end_coord, weight="composite_score"):
         data = G.get_edge_data(u, v)
         if data is not None:
             edge = list(data.values())[0]
-            composite_scores.append(edge.get("composite_score", 0))
+            composite_scores.append(edge.get(score_attr, 0))
             lengths.append(edge.get("length", 0))
         else:
             composite_scores.append(0)
@@ -132,7 +163,8 @@ def compute_routes_from_census_blocks_to_school(
     - somerville_census_blocks: GeoDataFrame with census blocks centroids
     - school: pd.Series with school information (must contain 'geometry', 'Name', '
         GlobalID' fields)
-    - weight: str, edge attribute to use as weight (default: "composite_score" | "length")
+    - weight: str, edge attribute to use as weight (default: "composite_score" | "length"),
+        see ROUTE_WEIGHTS
     """
 
     errors = []
@@ -159,6 +191,9 @@ def compute_routes_from_census_blocks_to_school(
             route_gdf["to_school_id"] = school["GlobalID"]
             dataframes.append(route_gdf)
 
+    if not dataframes:  # every block failed (or there were none)
+        return gpd.GeoDataFrame(geometry=[], crs=use_crs), errors
+
     combined_gdf = gpd.GeoDataFrame(
         pd.concat(dataframes, ignore_index=True), crs=use_crs
     )
@@ -170,6 +205,7 @@ def compute_routes_from_census_blocks_to_all_schools(
     somerville_census_blocks: gpd.GeoDataFrame,
     schools_gdf: gpd.GeoDataFrame,
     weight="composite_score",
+    out_dir: str | None = None,
 ):
     """
     Compute routes from census blocks to all schools and aggregate results.
@@ -183,8 +219,13 @@ def compute_routes_from_census_blocks_to_all_schools(
     somerville_census_blocks : GeoDataFrame
         Census blocks to route from
     weight : str, optional
-        Edge weight to use for routing. Must be "composite_score" or "length".
-        Default is "composite_score".
+        Edge weight to use for routing. Must be one of ROUTE_WEIGHTS:
+        "composite_score", "length" or a profile score like
+        "composite_score_child". Default is "composite_score".
+    out_dir : str, optional
+        Checkpoint each chunk of routes to this directory and resume an
+        interrupted run from it (see src/route_batch.py). By default all
+        routes are kept in memory.
 
     Returns
     -------
@@ -193,17 +234,27 @@ def compute_routes_from_census_blocks_to_all_schools(
     errors : list
         List of error messages encountered during routing
     """
-    if weight not in ["composite_score", "length"]:
-        raise ValueError("weight must be 'composite_score' or 'length'")
+    if weight not in ROUTE_WEIGHTS:
+        raise ValueError(f"weight must be one of {ROUTE_WEIGHTS}")
+
+    if out_dir is not None:
+        from src.route_batch import read_routes, run_routes
+
+        errors = run_routes(
+            G, somerville_census_blocks, schools_gdf, out_dir, weight=weight
+        )
+        return read_routes(out_dir), errors
 
     all_routes = []  # accumulate all GeoDataFrames
+    errors = []  # and the errors of every school
 
     for i, school in schools_gdf.iterrows():
         print(f"----- {school['Name']} -----")
 
-        combined_gdf, errors = compute_routes_from_census_blocks_to_school(
+        combined_gdf, school_errors = compute_routes_from_census_blocks_to_school(
             G, somerville_census_blocks, school, weight=weight
         )
+        errors.extend(f"{school['Name']}: {e}" for e in school_errors)
 
         # add school name column
         combined_gdf = combined_gdf.assign(school_name=school["Name"])
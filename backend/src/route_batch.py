@@ -0,0 +1,210 @@
+"""
+Checkpointed, resumable batch routing.
+
+`run_routes` routes the census blocks to every school, one chunk of
+BIKE_STRESS_ROUTE_CHUNK_SIZE blocks (default 500) at a time, and writes each
+chunk as soon as it is routed:
+
+    <out_dir>/manifest.json
+    <out_dir>/parts/school<j>-chunk<k>.parquet   (GeoParquet)
+
+The manifest records the run's parameters (including digests of the graph
+and the model spec) and, for every completed chunk,
+its school, row count and routing errors. It is rewritten after each chunk,
+so a run that dies at school 14 of 20 (or a restarted notebook kernel)
+resumes where it stopped: completed chunks are skipped and only the others
+are routed. At most one chunk of routes is held in memory.
+
+The parts are only merged when read, by `routes_dataset` (a lazy
+pyarrow dataset, for scanning in batches) or `read_routes`:
+
+    run_routes(G, blocks, schools, "data/out/routes/somerville")
+    routes = read_routes("data/out/routes/somerville")
+"""
+
+import hashlib
+import json
+import os
+
+import geopandas as gpd
+import networkx as nx
+import pandas as pd
+import pyarrow.dataset as ds
+
+from src.route import (
+    ROUTE_WEIGHTS,
+    _score_attribute,
+    compute_routes_from_census_blocks_to_school,
+)
+from src.stressmodel.spec import SPEC
+
+# number of census blocks routed (and written) per chunk
+ROUTE_CHUNK_SIZE = int(os.environ.get("BIKE_STRESS_ROUTE_CHUNK_SIZE", "500"))
+
+MANIFEST = "manifest.json"
+PARTS = "parts"
+
+
+def _digest(values) -> str:
+    data = "\n".join(str(v) for v in values).encode()
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _graph_digest(G: nx.MultiDiGraph, weight: str) -> str:
+    """Digest of the graph's edges and the attributes routes are computed from."""
+    attrs = list(dict.fromkeys([weight, _score_attribute(weight), "length"]))
+    edges = sorted(
+        (u, v, key, *(data.get(a) for a in attrs))
+        for u, v, key, data in G.edges(keys=True, data=True)
+    )
+    return _digest(edges)
+
+
+def _params(G, blocks, schools, weight: str, chunk_size: int) -> dict:
+    """
+    What a run routes: resuming with other parameters, or on a rebuilt or
+    rescored network, would mix results.
+    """
+    return {
+        "weight": weight,
+        "chunk_size": chunk_size,
+        "model": SPEC.hash,
+        "graph": _graph_digest(G, weight),
+        "blocks": _digest(blocks["GEOID20"]),
+        "schools": _digest(schools["GlobalID"]),
+    }
+
+
+def load_manifest(out_dir: str) -> dict | None:
+    """The manifest of a batch run, or None if it has not started."""
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir: str, manifest: dict):
+    path = os.path.join(out_dir, MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _write_part(out_dir: str, name: str, routes: gpd.GeoDataFrame):
+    path = os.path.join(out_dir, PARTS, name)
+    # dot-prefixed, so a half-written part is never read as a dataset file
+    tmp_path = os.path.join(out_dir, PARTS, f".{name}.tmp")
+    routes.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def run_routes(
+    G: nx.classes.multidigraph.MultiDiGraph,
+    somerville_census_blocks: gpd.GeoDataFrame,
+    schools_gdf: gpd.GeoDataFrame,
+    out_dir: str,
+    weight: str = "composite_score",
+    chunk_size: int = ROUTE_CHUNK_SIZE,
+) -> list[str]:
+    """
+    Route census blocks to all schools, checkpointing each chunk to out_dir.
+
+    Args:
+        G: Street network graph.
+        somerville_census_blocks: Census blocks to route from (GEOID20,
+            BLKGRP20, TRACT20, geometry).
+        schools_gdf: Schools (Name, GlobalID, geometry).
+        out_dir: Output directory. If it holds an unfinished run with the same
+            parameters, that run is resumed.
+        weight: Edge weight, one of ROUTE_WEIGHTS.
+        chunk_size: Number of blocks routed per chunk.
+
+    Returns:
+        Errors of every chunk (including chunks from earlier, resumed runs).
+    """
+    if weight not in ROUTE_WEIGHTS:
+        raise ValueError(f"weight must be one of {ROUTE_WEIGHTS}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    params = _params(G, somerville_census_blocks, schools_gdf, weight, chunk_size)
+    manifest = load_manifest(out_dir)
+    if manifest is None:
+        manifest = {"params": params, "chunks": {}}
+    elif manifest["params"] != params:
+        raise ValueError(
+            f"{out_dir} holds a run with other parameters ({manifest['params']}), "
+            "use another out_dir or delete it"
+        )
+    os.makedirs(os.path.join(out_dir, PARTS), exist_ok=True)
+
+    n_chunks = -(-len(somerville_census_blocks) // chunk_size)
+    for j, (_, school) in enumerate(schools_gdf.iterrows()):
+        print(f"----- {school['Name']} -----")
+
+        for k in range(n_chunks):
+            name = f"school{j:04d}-chunk{k:05d}.parquet"
+            if name in manifest["chunks"]:
+                continue
+
+            start = k * chunk_size
+            blocks = somerville_census_blocks.iloc[start : start + chunk_size]
+            routes, errors = compute_routes_from_census_blocks_to_school(
+                G, blocks, school, weight=weight
+            )
+            if not routes.empty:
+                _write_part(out_dir, name, routes.assign(school_name=school["Name"]))
+
+            manifest["chunks"][name] = {
+                "school_id": school["GlobalID"],
+                "school_name": school["Name"],
+                "rows": len(routes),
+                "errors": [f"{school['Name']}: {e}" for e in errors],
+            }
+            _write_manifest(out_dir, manifest)
+
+    return [e for chunk in manifest["chunks"].values() for e in chunk["errors"]]
+
+
+def routes_dataset(out_dir: str) -> ds.Dataset:
+    """
+    The completed parts of a batch run as one lazy pyarrow dataset.
+
+    Nothing is read until the dataset is scanned, e.g.
+    `dataset.to_batches(columns=[...])` to keep memory bounded, or
+    `dataset.to_table(filter=ds.field("to_school_id") == school_id)`.
+    """
+    manifest = load_manifest(out_dir) or {"chunks": {}}
+    paths = [
+        os.path.join(out_dir, PARTS, name)
+        for name, chunk in manifest["chunks"].items()
+        if chunk["rows"] > 0
+    ]
+    return ds.dataset(paths, format="parquet")
+
+
+def read_routes(
+    out_dir: str, columns: list[str] | None = None, filter=None
+) -> pd.DataFrame:
+    """
+    Merge the completed parts of a batch run.
+
+    Args:
+        out_dir: Output directory of run_routes.
+        columns: Columns to read (all by default).
+        filter: pyarrow.dataset expression selecting rows.
+    Returns:
+        gpd.GeoDataFrame of routes, as from
+        compute_routes_from_census_blocks_to_all_schools (a pd.DataFrame if
+        the geometry column is not read).
+    """
+    dataset = routes_dataset(out_dir)
+    if not dataset.files:
+        return gpd.GeoDataFrame(columns=columns or ["geometry"])
+
+    table = dataset.to_table(columns=columns, filter=filter)
+    if "geometry" not in table.column_names:
+        return table.to_pandas()
+    return gpd.GeoDataFrame.from_arrow(table)
@@ -0,0 +1,120 @@
+"""
+Compact output schema for scored edges.
+
+After the stress models run, the edges GeoDataFrame still carries every raw
+OSM tag (often as Python lists inside object columns), nullable extension
+arrays and duplicated copies of the original values. `compact_edges` casts
+the model outputs to small NumPy dtypes and categoricals and drops the raw
+tag columns, so a scored city can be kept in memory cheaply.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src import tags
+from src.stressmodel.classification import CLASSIFICATION_SCORES
+from src.stressmodel.composite import PROFILES, profile_column
+from src.stressmodel.separation_level import RANKING
+
+SEPARATION_LEVEL_DTYPE = pd.CategoricalDtype(list(RANKING))
+STREET_CLASSIFICATION_DTYPE = pd.CategoricalDtype(list(CLASSIFICATION_SCORES))
+
+# column -> dtype for every column kept by `compact_edges`
+# (geometry is always kept; "category" infers categories from the data)
+COMPACT_SCHEMA = {
+    "name": "category",
+    "highway": "category",
+    "oneway": "bool",
+    "two_way": "bool",
+    # --- basics ---
+    "length": "float32",
+    "width_float": "float32",
+    "width_half": "float32",
+    # --- maxspeed ---
+    "maxspeed_0": "category",
+    "maxspeed_int": "float32",
+    "maxspeed_int_score": "float32",
+    # --- separation level ---
+    "separation_level": SEPARATION_LEVEL_DTYPE,
+    "separation_level_score": "float32",
+    "separation_level_forward": SEPARATION_LEVEL_DTYPE,
+    "separation_level_forward_score": "float32",
+    "separation_level_backward": SEPARATION_LEVEL_DTYPE,
+    "separation_level_backward_score": "float32",
+    # --- street classification ---
+    "street_0": "category",
+    "street_classification": STREET_CLASSIFICATION_DTYPE,
+    "street_classification_score": "float32",
+    # --- lanes ---
+    "lanes_int": "float32",
+    "lanes_int_score": "float32",
+    # --- composite ---
+    "composite_score": "float32",
+    **{profile_column(p): "float32" for p in PROFILES},
+    "composite_score_directed": "float32",
+    "composite_score_directed_backward": "float32",
+}
+
+
+def to_label(value) -> str | None:
+    """
+    Flatten a raw OSM tag value into a single string label.
+
+    Lists (and arrays) are joined with ";", the OSM convention for
+    multiple values. Missing values become None.
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, list):
+        items = [str(v) for v in value if not (isinstance(v, float) and np.isnan(v))]
+        return ";".join(items) if items else None
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return str(value)
+
+
+def _cast(series: pd.Series, dtype) -> pd.Series:
+    """Cast a single column to its compact dtype."""
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == "category":
+        if tags.is_tag_column(series):
+            series = tags.labels(series)
+        elif series.dtype == object:
+            series = series.map(to_label)
+        if isinstance(dtype, pd.CategoricalDtype):
+            # keep values outside the known categories instead of nulling them
+            extra = sorted(set(series.dropna().unique()) - set(dtype.categories))
+            dtype = pd.CategoricalDtype([*dtype.categories, *extra])
+        return series.astype(dtype)
+
+    if dtype == "bool":
+        return series.fillna(False).astype(bool)
+
+    # numeric: go through float64 so nullable Int64/Float64 NAs become NaN
+    return pd.to_numeric(series, errors="coerce").astype("float64").astype(dtype)
+
+
+def compact_edges(edges: pd.DataFrame, keep_raw_tags: bool = False) -> pd.DataFrame:
+    """
+    Cast scored edges to the compact output schema.
+
+    Args:
+        edges: Scored edges, as returned by the stress models.
+        keep_raw_tags: If True, keep every other column unchanged
+            (raw OSM tags, intermediate values). Otherwise only the columns in
+            COMPACT_SCHEMA and the geometry are kept.
+
+    Returns:
+        pd.DataFrame (or GeoDataFrame, if the input was one)
+    """
+    columns = {}
+    for col in edges.columns:
+        if col in COMPACT_SCHEMA:
+            columns[col] = _cast(edges[col], COMPACT_SCHEMA[col])
+        elif col == "geometry" or keep_raw_tags:
+            columns[col] = edges[col]
+
+    compact = edges[list(columns)].copy()
+    for col, values in columns.items():
+        compact[col] = values
+
+    return compact
@@ -0,0 +1,76 @@
+"""
+Content-addressed cache for pipeline stage results.
+
+Each stage result is pickled under cache/stages/<stage>/<key>.pkl. The key
+of a stage combines the digest of its input (the upstream stage's result)
+with the hash of the model spec section it uses, so changing one model only
+re-runs that model; the OSM fetch and the other models are reused.
+
+Code changes to a stage are not part of its key: clear the stage's cache
+directory after changing how a model works.
+"""
+
+import hashlib
+import os
+import pickle
+
+CACHE_DIR = os.environ.get("BIKE_STRESS_STAGE_CACHE_DIR", "cache/stages")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def run_stage(stage: str, key: str, fn, enabled: bool = True, cache_dir=CACHE_DIR):
+    """
+    Run a stage, or load its result from the cache.
+
+    Args:
+        stage: Stage name, e.g. "network" or "speed".
+        key: Cache key for the stage's inputs.
+        fn: Function computing the result when it is not cached.
+        enabled: If False, always run fn and do not touch the cache.
+        cache_dir: Root cache directory.
+
+    Returns:
+        (result, digest) where digest identifies the result's content, for
+        use in downstream keys (None when the cache is disabled).
+    """
+    if not enabled:
+        return fn(), None
+
+    path = _path(stage, key, cache_dir)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        return pickle.loads(data), _digest(data)
+
+    result = fn()
+    return result, store_stage(stage, key, result, cache_dir)
+
+
+def _path(stage: str, key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, stage, f"{key}.pkl")
+
+
+def load_stage(stage: str, key: str, cache_dir=CACHE_DIR):
+    """A cached stage result, or None if it is not cached."""
+    path = _path(stage, key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def store_stage(stage: str, key: str, result, cache_dir=CACHE_DIR) -> str:
+    """Cache (or replace) a stage result, returns its digest."""
+    data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+    path = _path(stage, key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    return _digest(data)
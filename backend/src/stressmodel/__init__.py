@@ -1,11 +1,15 @@
 import src.stressmodel.classification as classification
+import src.stressmodel.composite as composite
 import src.stressmodel.lanes as lanes
 import src.stressmodel.separation_level as separation_level
+import src.stressmodel.spec as spec
 import src.stressmodel.speed as speed
 
 __all__ = [
     "classification",
+    "composite",
     "lanes",
     "separation_level",
+    "spec",
     "speed",
 ]
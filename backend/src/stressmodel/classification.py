@@ -3,48 +3,21 @@ from typing import List, Union
 import numpy as np
 import pandas as pd
 
+from src import tags
+from src.stressmodel.spec import SPEC
+
 StreetInput = Union[str, List[str]]
 
-# Street type classifications
-# See: https://wiki.openstreetmap.org/wiki/Key:highway
-STREET_CLASSIFICATIONS = {
-    # Cycleway category - dedicated bike infrastructure and low-traffic paths
-    "cycleway": "dedicated_path",
-    "path": "dedicated_path",
-    "pedestrian": "dedicated_path",
-    "footway": "dedicated_path",
-    "bridleway": "dedicated_path",
-    "steps": "dedicated_path",  # Though not rideable, it's pedestrian infrastructure
-    # Residential category - low-traffic local streets
-    "residential": "residential",
-    "living_street": "residential",
-    "service": "residential",
-    "unclassified": "residential",
-    "track": "residential",
-    # Medium-capacity category - connecting roads with moderate traffic
-    "tertiary": "medium-capacity",
-    "secondary": "medium-capacity",
-    "secondary_link": "medium-capacity",
-    "primary": "medium-capacity",
-    "primary_link": "medium-capacity",
-    # Motorway category - high-capacity roads
-    "trunk": "motorway",
-    "trunk_link": "motorway",
-    "motorway": "motorway",
-    "motorway_link": "motorway",
-    "busway": "motorway",
-}
-
-# Scores for each classification (best to worst for cycling)
-CLASSIFICATION_SCORES = {
-    "dedicated_path": 0,
-    "residential": 2,
-    "medium-capacity": 3,
-    "motorway": 4,
-}
-
-# Default classification for unknown types
-DEFAULT_CLASSIFICATION = "medium-capacity"
+# Street type classifications (highway tag -> classification),
+# scores for each classification (best to worst for cycling),
+# and the classification for unknown types. See model_spec.json and
+# https://wiki.openstreetmap.org/wiki/Key:highway
+STREET_CLASSIFICATIONS = SPEC.street_classifications
+CLASSIFICATION_SCORES = SPEC.classification_scores
+DEFAULT_CLASSIFICATION = SPEC.default_classification
+
+# columns read by run
+INPUTS = ["highway"]
 
 
 def extract_street_type(value: StreetInput) -> str:
@@ -87,7 +60,7 @@ def get_street_classification(street_type: str) -> str:
     return STREET_CLASSIFICATIONS.get(street_type, DEFAULT_CLASSIFICATION)
 
 
-def get_street_score(classification: str) -> int:
+def get_street_score(classification: str) -> float:
     """Get score based on street classification."""
     if pd.isna(classification):
         return 0
@@ -106,17 +79,30 @@ def run(df):
         Tuple[pd.Series, pd.Series]
         (street_classification, street_score)
     """
-    # make a copy
-    df = df.copy()
-
-    # extract street type first
-    df["street_type"] = df["highway"].apply(extract_street_type)
-
-    # classify street type
-    df["street_classification"] = df["street_type"].apply(get_street_classification)
+    highway = tags.flatten(df["highway"])
+
+    # classify and score each distinct street type once
+    classifications = np.array(
+        [
+            get_street_classification(extract_street_type(v))
+            for v in highway.dictionary
+        ],
+        dtype=object,
+    )
+    scores = np.array([get_street_score(c) for c in classifications], dtype=float)
 
-    # get score from classification
-    df["street_score"] = df["street_classification"].apply(get_street_score)
+    # if multiple types, keep the best one for cycling (lowest score)
+    keys = scores[highway.codes]
+    default = get_street_classification("")
+    street_classification = tags.segment_best(
+        keys, classifications[highway.codes], highway.offsets, default
+    )
+    street_score = tags.segment_best(
+        keys, keys, highway.offsets, get_street_score(default)
+    )
 
     # return classification and score series
-    return df["street_classification"], df["street_score"]
+    return (
+        pd.Series(street_classification, index=df.index, name="street_classification"),
+        pd.Series(street_score, index=df.index, name="street_score"),
+    )
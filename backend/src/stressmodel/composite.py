@@ -0,0 +1,83 @@
+"""
+Combine the sub-scores into composite scores, one per weight profile.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.stressmodel.spec import SPEC, SCORE_COLUMNS
+
+# sub-score columns, in weight matrix row order
+SUB_SCORES = list(SCORE_COLUMNS.values())
+
+# Weight profiles for different kinds of riders, from model_spec.json:
+# "default" uses the parameter weights (separation level 60%, speed 20%,
+# busyness 20%), the others are listed under "profiles".
+# Weights are normalized over the non-missing sub-scores.
+PROFILES = SPEC.profiles
+
+DEFAULT_PROFILE = "default"
+
+
+def profile_column(profile: str) -> str:
+    """Name of the output column for a profile, e.g. 'composite_score_child'."""
+    return f"composite_score_{profile}"
+
+
+def weight_matrix(profiles: dict[str, dict[str, float]] = PROFILES) -> np.ndarray:
+    """
+    Build the (sub-scores x profiles) weight matrix.
+
+    Sub-scores missing from a profile get a weight of 0.
+    """
+    return np.array(
+        [[profiles[p].get(s, 0.0) for p in profiles] for s in SUB_SCORES],
+        dtype="float64",
+    )
+
+
+def weighted_scores(scores: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    NaN-aware weighted mean of sub-scores for every profile at once.
+
+    Args:
+        scores: (edges x sub-scores) array, NaN where a sub-score is missing.
+        weights: (sub-scores x profiles) weight matrix.
+
+    Returns:
+        (edges x profiles) array. Missing sub-scores are left out and the
+        remaining weights renormalized; NaN if no weighted sub-score exists.
+    """
+    present = ~np.isnan(scores)
+
+    # one matrix multiply for the weighted sums, one for the weight totals
+    weighted_sum = np.where(present, scores, 0.0) @ weights
+    sum_weights = present.astype(weights.dtype) @ weights
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(sum_weights > 0, weighted_sum / sum_weights, np.nan)
+
+
+def run(
+    df: pd.DataFrame, profiles: dict[str, dict[str, float]] = PROFILES
+) -> pd.DataFrame:
+    """
+    Compute the composite score for every weight profile.
+
+    Args:
+        df: DataFrame with the SUB_SCORES columns.
+        profiles: Mapping of profile name -> {sub-score column: weight}.
+    Returns:
+        pd.DataFrame with one 'composite_score_<profile>' column per profile
+    """
+    scores = np.column_stack(
+        [
+            pd.to_numeric(df[col], errors="coerce").to_numpy("float64", na_value=np.nan)
+            for col in SUB_SCORES
+        ]
+    )
+    result = weighted_scores(scores, weight_matrix(profiles))
+
+    return pd.DataFrame(
+        result, index=df.index, columns=[profile_column(p) for p in profiles]
+    )
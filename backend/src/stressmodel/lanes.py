@@ -3,18 +3,19 @@ from typing import List, Union
 import numpy as np
 import pandas as pd
 
+from src import tags
+from src.stressmodel.spec import SPEC, threshold_scores
+
 LanesInput = Union[str, int, float, List[str], None]
 
-LANES_RANKINGS = [
-    (2, 0),  # 1-2 lanes -> 0 points
-    (3, 2),  # 3 lanes -> 2 points
-    (4, 3),  # 4 lanes -> 3 points
-    (5, 3.5),  # 5 lanes -> 3.5 points
-    (float("inf"), 4),  # 6+ lanes -> 4 points
-]
+# (upper bound on number of lanes, score) pairs, see model_spec.json
+LANES_RANKINGS = list(zip(SPEC.lanes_thresholds.tolist(), SPEC.lanes_scores.tolist()))
 
 DEFAULT_LANES = None  # Global default for missing lane values
 
+# columns read by run
+INPUTS = ["lanes"]
+
 
 def extract_lanes(value: LanesInput) -> float:
     """
@@ -74,15 +75,22 @@ def run(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
     # make a copy
     df = df.copy()
 
-    # extract lanes
-    df["lanes_int"] = df["lanes"].apply(extract_lanes).astype("Int64")
+    # extract lanes (the most of a list), parsing each distinct value once
+    df["lanes_int"] = pd.Series(
+        tags.max_value(df["lanes"], extract_lanes), index=df.index
+    ).astype("Int64")
 
     # fill missing values with default
     if DEFAULT_LANES is not None:
         df["lanes_int"] = df["lanes_int"].fillna(DEFAULT_LANES).astype("Int64")
 
-    # score
-    df["lanes_int_score"] = df["lanes_int"].apply(get_lanes_score)
+    # score (missing lanes score 0)
+    df["lanes_int_score"] = threshold_scores(
+        df["lanes_int"].to_numpy("float64", na_value=np.nan),
+        SPEC.lanes_thresholds,
+        SPEC.lanes_scores,
+        missing=0.0,
+    )
 
     # return lanes and score series
     return df["lanes_int"], df["lanes_int_score"]
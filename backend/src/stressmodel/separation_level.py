@@ -5,80 +5,141 @@ What type of cycleway is it?
 import numpy as np
 import pandas as pd
 
-RANKING = {
-    "separate": 0,  # totally separated
-    "track": 1,  # totally separated (but sometimes used for lane with buffer)
-    "lane_buffered": 1.5,  # Added buffered lane type
-    "lane": 2.5,  # dedicated bike lane, not separate
-    "share_busway": 3,  # shared with bus
-    "shared_lane": 3.5,  # in traffic
-    "none": 4,  # no cycling infrastructure
-}
-
-
-def combine_cycleways(row):
-    """Accumulate all cycleway values into a single list."""
-
-    cols = ["cycleway", "cycleway:both", "cycleway:left", "cycleway:right"]
-
-    values = []
-    for col in cols:
-        v = row[col]
-
-        # Normalize: listify arrays
-        if isinstance(v, np.ndarray):
-            v = v.tolist()
-
-        # if missing, mark as "none"
-        if v is None or v == "no":
-            v = "none"
-        if isinstance(v, float) and pd.isna(v):
-            v = "none"
+from src import tags
+from src.stressmodel.spec import SPEC
+
+# separation level -> score, lower is better (see model_spec.json):
+#   "separate"      : totally separated
+#   "track"         : totally separated (but sometimes used for lane with buffer)
+#   "lane_buffered" : bike lane with buffer
+#   "lane"          : dedicated bike lane, not separate
+#   "share_busway"  : shared with bus
+#   "shared_lane"   : in traffic
+#   "none"          : no cycling infrastructure
+RANKING = SPEC.separation_ranking
+
+CYCLEWAY_COLUMNS = ["cycleway", "cycleway:both", "cycleway:left", "cycleway:right"]
+
+# separation values that turn "track" into "lane_buffered"
+SOFT_SEPARATION = ["flex_post", "parking_lane"]
+
+# columns read by run and run_directed
+INPUTS = [
+    *CYCLEWAY_COLUMNS,
+    "cycleway:buffer",
+    "cycleway:separation",
+    "highway",
+    "bicycle",
+    "oneway",
+    "oneway:bicycle",
+    "reversed",
+]
+
+
+def normalize_cycleway(v) -> list:
+    """The values of one cycleway tag, as a list ("none" if missing or "no")."""
+    # Normalize: listify arrays
+    if isinstance(v, np.ndarray):
+        v = v.tolist()
+
+    # if missing, mark as "none"
+    if v is None or (isinstance(v, str) and v == "no"):
+        v = "none"
+    if isinstance(v, float) and pd.isna(v):
+        v = "none"
+
+    # Handle lists
+    return list(v) if isinstance(v, list) else [v]
+
+
+def _rank(level) -> float:
+    return np.inf if level is None else RANKING.get(level, 0)
+
+
+def _tag_levels(values: pd.Series, variant: np.ndarray):
+    """
+    Best level (and its rank) within one cycleway tag column.
 
-        # Handle lists
-        if isinstance(v, list):
-            values.extend(v)
-        else:
-            values.append(v)
+    The per-row rules (buffer, soft separation) only rewrite values, so each
+    distinct tag value is resolved once per rule variant:
+    variant = 2 * has_buffer + soft_separation.
 
-    return values
+    Returns:
+        (levels, ranks): object and float arrays ("none" where the tag is
+        missing).
+    """
+    flat = tags.flatten(values)
+
+    table = []
+    for value in flat.dictionary:
+        level = normalize_cycleway(value)[0]
+        buffered = "lane_buffered" if level == "lane" else level
+        row = []
+        for variant_level in (level, buffered):
+            soft = "lane_buffered" if variant_level == "track" else variant_level
+            row.extend([variant_level, soft])
+        table.append(row)
+
+    table = np.array(table, dtype=object).reshape(-1, 4)
+    ranks = np.vectorize(_rank, otypes=[float])(table) if len(table) else table
+
+    # each item under its row's variant, then the first best item of each row
+    items = (flat.codes, variant[flat.rows])
+    keys = ranks[items].astype(float)
+    levels = tags.segment_best(keys, table[items], flat.offsets, "none")
+    return levels, tags.segment_best(keys, keys, flat.offsets, _rank("none"))
+
+
+def _variants(df: pd.DataFrame) -> np.ndarray:
+    """Rule variant of each row, see _tag_levels."""
+    n = len(df)
+    missing = pd.Series([None] * n, index=df.index, dtype=object)
+
+    # buffer: cycleway:buffer, or cycleway:separation without a buffer column
+    # (a column with a missing buffer does not fall back to the separation)
+    buffer = df.get("cycleway:buffer", df.get("cycleway:separation", missing))
+    has_buffer = (tags.flatten(buffer).lengths > 0) & (
+        tags.single_value(buffer) != "no"
+    )
 
+    separation = tags.single_value(df.get("cycleway:separation", missing))
+    soft = np.isin(separation, SOFT_SEPARATION)
 
-def pick_best(values):
-    return min(values, key=lambda v: RANKING.get(v, 0), default=None)
+    return 2 * has_buffer.astype(int) + soft.astype(int)
 
 
-def apply_buffer_to_list(values, row):
-    """Upgrade 'lane' to 'lane_buffered' in a list if buffer exists."""
-    buffer_val = row.get("cycleway:buffer")
-    if buffer_val is None:
-        buffer_val = row.get("cycleway:separation")
+def _is_cycleway(df: pd.DataFrame) -> np.ndarray:
+    """highway=cycleway, or highway=path + bicycle=designated"""
+    highway = tags.single_value(df["highway"])
+    bicycle = tags.single_value(df.get("bicycle", pd.Series(None, index=df.index)))
+    return (highway == "cycleway") | ((highway == "path") & (bicycle == "designated"))
 
-    # Check if buffer exists and is valid
-    has_buffer = (
-        buffer_val is not None
-        and buffer_val != "no"
-        and not (isinstance(buffer_val, float) and pd.isna(buffer_val))
-    )
 
-    if not has_buffer:
-        return values
+def _best(levels: np.ndarray, ranks: np.ndarray, use: np.ndarray) -> np.ndarray:
+    """Best level per row among the tag columns where use is True."""
+    ranks = np.where(use, ranks, np.inf)
+    best = np.argmin(ranks, axis=1)
+    rows = np.arange(len(levels))
+    return np.where(np.isinf(ranks[rows, best]), None, levels[rows, best])
 
-    # Upgrade any 'lane' to 'lane_buffered'
-    return ["lane_buffered" if v == "lane" else v for v in values]
 
+def _levels(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Best level and rank of each of CYCLEWAY_COLUMNS, as (n, 4) arrays."""
+    variant = _variants(df)
+    missing = pd.Series(np.nan, index=df.index, dtype=object)
+    columns = [
+        _tag_levels(df.get(col, missing), variant) for col in CYCLEWAY_COLUMNS
+    ]
+    levels = np.column_stack([c[0] for c in columns])
+    ranks = np.column_stack([c[1] for c in columns])
+    return levels, ranks
 
-def adjust_track_with_separation(row):
-    """
-    If cycleway is 'track' but separation is 'flex_post' or 'parking_lane', rename to 'lane_buffered'.
-    """
-    cycleway_all = row["cycleway_all"]
-    separation = row.get("cycleway:separation")
 
-    if "track" in cycleway_all and separation in ["flex_post", "parking_lane"]:
-        # Replace 'track' with 'lane_buffered'
-        cycleway_all = ["lane_buffered" if v == "track" else v for v in cycleway_all]
-    return cycleway_all
+def _scores(levels: np.ndarray) -> np.ndarray:
+    codes, uniques = pd.factorize(pd.Series(levels, dtype=object))
+    # the last slot is for missing levels (code -1)
+    table = np.array([*(RANKING.get(v, 0) for v in uniques), 0], dtype=float)
+    return table[codes]
 
 
 def run(df):
@@ -106,33 +167,96 @@ def run(df):
         Numerical score for separation level, higher is better
 
     """
-    # make a copy
-    df = df.copy()
-
-    # combine all vals from cycleway tags into a single list
-    df["cycleway_all"] = df.apply(combine_cycleways, axis=1)
-
-    # rename: if buffer exists, rename 'lane' to 'lane_buffered'
-    df["cycleway_all"] = df.apply(
-        lambda row: apply_buffer_to_list(row["cycleway_all"], row), axis=1
-    )
+    levels, ranks = _levels(df)
 
-    # rename: if cycleway="track" but cycleway:separation="flex_post," rename to "lane_buffered"
-    df["cycleway_all"] = df.apply(adjust_track_with_separation, axis=1)
-
-    # pick best of list
-    df["separation_level"] = df["cycleway_all"].apply(pick_best)
+    # best of all cycleway tags
+    separation_level = _best(levels, ranks, np.ones(levels.shape, dtype=bool))
 
     # overwrite other vals:
     # check if highway=cycleway OR highway=path + bicycle=designated
     # if so, set cycleway_type to 'separate'
-    is_cycleway = (df["highway"] == "cycleway") | (
-        (df["highway"] == "path") & (df["bicycle"] == "designated")
+    separation_level[_is_cycleway(df)] = "separate"
+
+    # return separation level and score pd.Series
+    return (
+        pd.Series(separation_level, index=df.index, name="separation_level"),
+        pd.Series(_scores(separation_level), index=df.index, name="separation_score"),
     )
-    df.loc[is_cycleway, "separation_level"] = "separate"
 
-    # apply score column
-    df["separation_score"] = df["separation_level"].apply(lambda v: RANKING.get(v, 0))
 
-    # return separation level and score pd.Series
-    return df["separation_level"], df["separation_score"]
+def _first(value):
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    return value[0] if isinstance(value, list) and value else value
+
+
+def run_directed(df):
+    """
+    Separation level in each travel direction of an edge.
+
+    `run` takes the best cycleway tag of a street for both directions, so a
+    track on one side makes the whole street "track". Here each direction
+    only uses the tags on its side (right-hand traffic):
+
+        along the OSM way    : cycleway, cycleway:both, cycleway:right
+        against the OSM way  : cycleway, cycleway:both, cycleway:left
+
+    On a oneway street (unless oneway:bicycle=no) every side serves the one
+    allowed direction, and the other direction has no level (None).
+    Directions are relative to the edge (u -> v), using osmnx's `reversed`
+    flag to tell whether the edge runs along or against the OSM way.
+
+    Args:
+        df : pd.DataFrame
+            DataFrame containing OSM edge data with cycleway-related columns,
+            plus "oneway", "reversed" and optionally "oneway:bicycle".
+    Returns:
+        pd.DataFrame with "separation_level_forward" (u -> v),
+        "separation_level_backward" (v -> u) and their "_score" columns
+    """
+    levels, ranks = _levels(df)
+    n = len(df)
+
+    def column(name, default):
+        if name not in df:
+            return np.full(n, default, dtype=object)
+        if df[name].dtype == bool:
+            return df[name].to_numpy(dtype=object)
+        return df[name].map(_first).to_numpy(dtype=object)
+
+    oneway = column("oneway", False)
+    oneway = (oneway == True) | (oneway == "yes")  # noqa: E712
+    bikes_oneway = oneway
+    if "oneway:bicycle" in df:
+        bikes_oneway = oneway & (tags.first_value(df["oneway:bicycle"]) != "no")
+    is_reversed = column("reversed", False) == True  # noqa: E712
+
+    # tag columns used by each direction of the OSM way
+    always = np.array([True, True, False, False])
+    along = np.tile(always | [False, False, False, True], (n, 1))
+    along[:, 2] |= bikes_oneway  # left side of a oneway street
+    against = np.tile(always | [False, False, True, False], (n, 1))
+
+    way_forward = _best(levels, ranks, along)
+    way_backward = _best(levels, ranks, against)
+
+    cycleway = _is_cycleway(df)
+    way_forward[cycleway] = "separate"
+    way_backward[cycleway] = "separate"
+    way_backward[bikes_oneway] = None
+
+    forward = np.where(is_reversed, way_backward, way_forward)
+    backward = np.where(is_reversed, way_forward, way_backward)
+
+    def scores(levels):
+        return np.where(levels == None, np.nan, _scores(levels))  # noqa: E711
+
+    return pd.DataFrame(
+        {
+            "separation_level_forward": forward,
+            "separation_level_forward_score": scores(forward),
+            "separation_level_backward": backward,
+            "separation_level_backward_score": scores(backward),
+        },
+        index=df.index,
+    )
@@ -0,0 +1,144 @@
+"""
+The model definition: category scores, thresholds and weights for every model.
+
+The spec lives in model_spec.json, which is the single source of truth for
+both the Python pipeline and the frontend (it has the same shape as the
+frontend's BikeInfrastructureModel, plus the extra fields the pipeline needs).
+It is loaded once at import and compiled into the lookup dicts and NumPy
+threshold arrays used by the models.
+
+Set BIKE_STRESS_MODEL_SPEC to use a different spec file.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+SPEC_PATH = os.environ.get(
+    "BIKE_STRESS_MODEL_SPEC",
+    os.path.join(os.path.dirname(__file__), "model_spec.json"),
+)
+
+# spec parameter -> sub-score column it produces
+SCORE_COLUMNS = {
+    "separation_level": "separation_level_score",
+    "speed_limit": "maxspeed_int_score",
+    "street_classification": "street_classification_score",
+    "lanes": "lanes_int_score",
+}
+
+
+def _hash(value) -> str:
+    """Stable content hash of a JSON-serializable value."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _thresholds(categories: dict, key: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Upper bounds and scores of threshold categories (in spec order);
+    a null bound means "no upper bound".
+    """
+    bounds = [np.inf if c[key] is None else float(c[key]) for c in categories.values()]
+    scores = [float(c["score"]) for c in categories.values()]
+    return np.array(bounds), np.array(scores)
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    raw: dict
+    hash: str
+    version: str
+
+    # separation level
+    separation_ranking: dict[str, float]
+
+    # street classification
+    street_classifications: dict[str, str]
+    classification_scores: dict[str, float]
+    default_classification: str
+
+    # speed: first category whose upper bound (mph) is >= the speed
+    speed_categories: list[str]
+    speed_thresholds: np.ndarray
+    speed_scores: np.ndarray
+
+    # lanes: first category whose upper bound is >= the number of lanes
+    lanes_thresholds: np.ndarray
+    lanes_scores: np.ndarray
+
+    # composite: profile -> {sub-score column: weight}, weights sum to 1
+    profiles: dict[str, dict[str, float]]
+
+    def section_hash(self, section: str) -> str:
+        """Hash of one part of the spec, for caching the stage that uses it."""
+        return _hash(self.raw[section])[:16]
+
+
+def threshold_scores(
+    values: np.ndarray, thresholds: np.ndarray, scores: np.ndarray, missing: float
+) -> np.ndarray:
+    """
+    Vectorized threshold lookup: the score of the first threshold >= each value.
+
+    Args:
+        values: float array, NaN where missing.
+        thresholds: Ascending upper bounds, the last one usually np.inf.
+        scores: Score for each threshold.
+        missing: Score for missing values.
+    """
+    present = ~np.isnan(values)
+    idx = np.searchsorted(thresholds, np.where(present, values, 0), side="left")
+    idx = np.minimum(idx, len(scores) - 1)
+    return np.where(present, scores[idx], missing)
+
+
+def compile_spec(raw: dict) -> ModelSpec:
+    """Compile a parsed spec into lookup tables."""
+    separation = raw["separation_level"]
+    street = raw["street_classification"]
+    speed = raw["speed_limit"]
+    lanes = raw["lanes"]
+
+    speed_thresholds, speed_scores = _thresholds(speed["categories"], "maxMph")
+    lanes_thresholds, lanes_scores = _thresholds(lanes["categories"], "maxLanes")
+
+    # default profile: the parameter weights themselves
+    profiles = {"default": {p: raw[p]["weight"] for p in SCORE_COLUMNS}}
+    profiles.update(raw.get("profiles", {}))
+
+    normalized = {}
+    for name, weights in profiles.items():
+        total = sum(weights.values())
+        normalized[name] = {
+            column: weights.get(p, 0) / total for p, column in SCORE_COLUMNS.items()
+        }
+
+    return ModelSpec(
+        raw=raw,
+        hash=_hash(raw),
+        version=raw["version"],
+        separation_ranking={
+            k: v["score"] for k, v in separation["categories"].items()
+        },
+        street_classifications=dict(street["highwayTypes"]),
+        classification_scores={k: v["score"] for k, v in street["categories"].items()},
+        default_classification=street["unknownCategory"],
+        speed_categories=list(speed["categories"]),
+        speed_thresholds=speed_thresholds,
+        speed_scores=speed_scores,
+        lanes_thresholds=lanes_thresholds,
+        lanes_scores=lanes_scores,
+        profiles=normalized,
+    )
+
+
+def load_spec(path: str = SPEC_PATH) -> ModelSpec:
+    with open(path, encoding="utf-8") as f:
+        return compile_spec(json.load(f))
+
+
+SPEC = load_spec()
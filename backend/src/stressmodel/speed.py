@@ -3,18 +3,18 @@ from typing import List, Union
 import numpy as np
 import pandas as pd
 
+from src import tags
+from src.stressmodel.spec import SPEC, threshold_scores
+
 SpeedInput = Union[str, float, List[str]]
 
 DEFAULT_SPEED_LIMIT = None  # Global default speed limit in mph
 
-SPEED_RANKINGS = [
-    (20, 0),  # <= 20 mph -> 0 points
-    (25, 1),  #
-    (30, 2.5),  #
-    (40, 3),  #
-    (50, 3.5),  #
-    (float("inf"), 4),  # > 50 mph -> 5 points
-]
+# columns read by run
+INPUTS = ["maxspeed", "highway"]
+
+# (upper bound in mph, score) pairs, see model_spec.json
+SPEED_RANKINGS = list(zip(SPEC.speed_thresholds.tolist(), SPEC.speed_scores.tolist()))
 
 
 def extract_maxspeed(value: SpeedInput) -> float:
@@ -70,11 +70,11 @@ def run(df):
     # make a copy
     df = df.copy()
 
-    # extract maxspeed
-    df["maxspeed_int"] = df["maxspeed"].apply(extract_maxspeed)
+    # extract maxspeed (the highest of a list), parsing each distinct value once
+    df["maxspeed_int"] = tags.max_value(df["maxspeed"], extract_maxspeed)
 
     # if "highway=residential" and maxspeed is missing, set to 20 mph
-    mask_residential_missing = (df["highway"] == "residential") & (
+    mask_residential_missing = (tags.single_value(df["highway"]) == "residential") & (
         df["maxspeed_int"].isna()
     )
     df.loc[mask_residential_missing, "maxspeed_int"] = 20
@@ -86,7 +86,12 @@ def run(df):
         )
 
     # calculate score (will be np.nan when maxspeed_int is np.nan)
-    df["maxspeed_int_score"] = df["maxspeed_int"].apply(get_speed_score)
+    df["maxspeed_int_score"] = threshold_scores(
+        df["maxspeed_int"].to_numpy("float64", na_value=np.nan),
+        SPEC.speed_thresholds,
+        SPEC.speed_scores,
+        missing=np.nan,
+    )
 
     # return maxspeed and score series
     return df["maxspeed_int"], df["maxspeed_int_score"]
@@ -0,0 +1,263 @@
+"""
+Arrow-native OSM tag columns.
+
+osmnx returns each tag of an edge as a string, or as a list of strings when
+simplification merged ways with different values, inside object columns.
+`to_arrow_tags` converts the tag columns once, after `ox.graph_to_gdfs`, to
+pandas ArrowDtype columns of type list<dictionary<int32, string>>:
+
+- every value is a list (a single value is a one-item list);
+- a missing value is a null list;
+- each distinct string is stored once per column, however many edges use it.
+
+The models then work on `flatten`ed tags, i.e. the distinct strings, one
+code per item and the offsets of each row's items. They parse each distinct
+string once and reduce each row's items with NumPy (`segment_max`,
+`segment_argmin`), so no stage walks per-row Python lists.
+
+>>> tags = flatten(pd.Series([["30 mph", "25 mph"], None, "25 mph"]))
+>>> tags.dictionary
+array(['30 mph', '25 mph'], dtype=object)
+>>> tags.codes, tags.offsets
+(array([0, 1, 1], dtype=int32), array([0, 2, 2, 3]))
+"""
+
+from itertools import chain
+from typing import Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+TAG_TYPE = pa.list_(pa.dictionary(pa.int32(), pa.string()))
+TAG_DTYPE = pd.ArrowDtype(TAG_TYPE)
+
+
+class FlatTags(NamedTuple):
+    """
+    dictionary: Distinct strings of the column (object array).
+    codes: Index into dictionary of every item, row after row.
+    offsets: Items of row i are codes[offsets[i]:offsets[i + 1]] (n + 1 values).
+    """
+
+    dictionary: np.ndarray
+    codes: np.ndarray
+    offsets: np.ndarray
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Row of every item."""
+        return np.repeat(np.arange(len(self.offsets) - 1), self.lengths)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+_type = np.frompyfunc(type, 1, 1)
+
+
+def _list_rows(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+    return pd.Series(_type(values)).isin([list, np.ndarray]).to_numpy()
+
+
+def _is_tag(values: np.ndarray) -> bool:
+    """True if values are all strings, lists of strings or missing."""
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind in ("string", "empty"):
+        return True
+    if kind != "mixed":
+        return False
+    # only the lists need a closer look
+    is_list = _list_rows(values)
+    scalars = pd.api.types.infer_dtype(values[~is_list], skipna=True)
+    if scalars not in ("string", "empty"):
+        return False
+    return all(
+        isinstance(item, str) or _is_missing(item)
+        for value in values[is_list]
+        for item in value
+    )
+
+
+def is_tag_column(series: pd.Series) -> bool:
+    """True for an Arrow tag column."""
+    return isinstance(series.dtype, pd.ArrowDtype) and series.dtype == TAG_DTYPE
+
+
+def tag_array(values) -> pa.Array:
+    """
+    list<dictionary<int32, string>> array of tag values (strings, lists or
+    arrays of strings, missing values). Other scalars are converted with
+    str(); missing items are dropped and empty lists become null.
+    """
+    if isinstance(values, pd.Series) and is_tag_column(values):
+        return values.array._pa_array.combine_chunks()
+
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.StringDtype):
+        # no lists in string columns: one item per non-missing row
+        strings = pa.array(values.to_numpy(dtype=object, na_value=None), pa.string())
+        present = strings.is_valid().to_numpy(zero_copy_only=False)
+        offsets = np.concatenate([[0], np.cumsum(present)])
+        return pa.ListArray.from_arrays(
+            pa.array(offsets, type=pa.int32()),
+            strings.drop_null().dictionary_encode(),
+            mask=pa.array(~present),
+        )
+
+    values = np.asarray(values, dtype=object)
+    is_list = _list_rows(values)
+    present = ~is_list & ~pd.isna(values)
+
+    # lists are the exception (merged ways): only they are walked in Python
+    list_rows = np.flatnonzero(is_list)
+    lists = [[str(v) for v in values[i] if not _is_missing(v)] for i in list_rows]
+    lengths = present.astype(np.int64)
+    lengths[list_rows] = [len(items) for items in lists]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    items = np.empty(offsets[-1], dtype=object)
+    scalars = values[present]
+    if pd.api.types.infer_dtype(scalars, skipna=False) not in ("string", "empty"):
+        scalars = np.array([str(v) for v in scalars], dtype=object)
+    items[offsets[:-1][present]] = scalars
+
+    # scatter the list items to their rows' slots
+    list_items = np.array(list(chain.from_iterable(lists)), dtype=object)
+    list_lengths = lengths[list_rows]
+    starts = offsets[list_rows] - (np.cumsum(list_lengths) - list_lengths)
+    items[np.repeat(starts, list_lengths) + np.arange(len(list_items))] = list_items
+
+    return pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()),
+        pa.array(items, type=pa.string()).dictionary_encode(),
+        mask=pa.array(lengths == 0),
+    )
+
+
+def to_tag_series(series: pd.Series) -> pd.Series:
+    """An Arrow tag column with the values of series."""
+    if is_tag_column(series):
+        return series
+    array = pd.arrays.ArrowExtensionArray(tag_array(series))
+    return pd.Series(array, index=series.index, name=series.name)
+
+
+def to_arrow_tags(
+    edges: pd.DataFrame, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Convert tag columns to Arrow tag columns.
+
+    Args:
+        edges: Edges, as from ox.graph_to_gdfs.
+        columns: Columns to convert. By default every object column whose
+            values are all strings or lists of strings (not osmid, geometry...).
+    Returns:
+        pd.DataFrame (or GeoDataFrame, if the input was one)
+    """
+    if columns is None:
+        columns = [
+            col
+            for col in edges.columns
+            if col != "geometry"
+            and (
+                isinstance(edges[col].dtype, pd.StringDtype)
+                or (edges[col].dtype == object and _is_tag(edges[col].to_numpy()))
+            )
+        ]
+
+    edges = edges.copy(deep=False)
+    for col in columns:
+        if col in edges:
+            edges[col] = to_tag_series(edges[col])
+    return edges
+
+
+def flatten(series: pd.Series) -> FlatTags:
+    """Distinct strings, item codes and row offsets of a tag column."""
+    array = tag_array(series)
+    lengths = pc.list_value_length(array).fill_null(0).to_numpy()
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    items = pc.list_flatten(array)
+    dictionary = items.dictionary.to_numpy(zero_copy_only=False).astype(object)
+    codes = items.indices.to_numpy(zero_copy_only=False)
+    return FlatTags(dictionary, codes, offsets)
+
+
+def parse(tags: FlatTags, fn: Callable, dtype=float) -> np.ndarray:
+    """fn of every item, calling fn once per distinct string."""
+    table = np.array([fn(v) for v in tags.dictionary], dtype=dtype)
+    return table[tags.codes] if len(table) else np.array([], dtype=dtype)
+
+
+def segment_max(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Max of each row's items, ignoring NaN (NaN if none)."""
+    n = len(offsets) - 1
+    result = np.full(n, np.nan)
+    nonempty = np.diff(offsets) > 0
+    if nonempty.any():
+        result[nonempty] = np.fmax.reduceat(values, offsets[:-1][nonempty])
+    return result
+
+
+def segment_argmin(keys: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Index of the first smallest item of each row (-1 if the row is empty)."""
+    lengths = np.diff(offsets)
+    if len(keys) == 0:
+        return np.full(len(lengths), -1)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    # sorted by row, then key, then position: each row's best item comes first
+    order = np.lexsort((np.arange(len(keys)), keys, rows))
+    return np.where(lengths > 0, order[np.minimum(offsets[:-1], len(keys) - 1)], -1)
+
+
+def segment_best(keys: np.ndarray, values: np.ndarray, offsets: np.ndarray, default):
+    """values of the first smallest-key item of each row (default if empty)."""
+    best = segment_argmin(keys, offsets)
+    result = np.full(len(best), default, dtype=values.dtype)
+    result[best >= 0] = values[best[best >= 0]]
+    return result
+
+
+def max_value(series: pd.Series, fn: Callable[[str], float]) -> np.ndarray:
+    """Largest parsed value of each row (NaN if none parses), e.g. maxspeed."""
+    tags = flatten(series)
+    return segment_max(parse(tags, fn), tags.offsets)
+
+
+def single_value(series: pd.Series) -> np.ndarray:
+    """The value of rows with exactly one item, None for the others."""
+    tags = flatten(series)
+    single = tags.lengths == 1
+    values = np.full(len(single), None, dtype=object)
+    values[single] = tags.dictionary[tags.codes[tags.offsets[:-1][single]]]
+    return values
+
+
+def first_value(series: pd.Series) -> np.ndarray:
+    """The first value of each row, None if missing."""
+    tags = flatten(series)
+    nonempty = tags.lengths > 0
+    values = np.full(len(nonempty), None, dtype=object)
+    values[nonempty] = tags.dictionary[tags.codes[tags.offsets[:-1][nonempty]]]
+    return values
+
+
+def labels(series: pd.Series) -> pd.Series:
+    """";"-joined label of each row (None if missing), as in schema.to_label."""
+    joined = pc.binary_join(tag_array(series).cast(pa.list_(pa.string())), ";")
+    return pd.Series(
+        joined.to_numpy(zero_copy_only=False),
+        index=series.index,
+        name=series.name,
+        dtype=object,
+    )
@@ -0,0 +1,264 @@
+"""
+Incremental network updates from OSM change files.
+
+Rebuilding a city re-fetches and re-scores every street, although a weekly
+OSM diff only touches a handful of ways. An update instead:
+
+1. finds the cached edges touched by the change: edges made of a changed
+   way (`osmid`), or ending at a changed node (`u_original`/`v_original`);
+2. re-fetches and consolidates only the neighborhood of those edges, the
+   changed nodes and the cached nodes of changed ways (their bounding box
+   plus a buffer, see `affected_bbox`);
+3. swaps the touched edges for their new versions (`splice_network`),
+   reusing the cached node ids so untouched edges stay valid;
+4. scores only the new edges and patches them into the artifact
+   (`patch_edges`).
+
+The orchestration (fetching, the stage cache and artifacts) lives in
+update.py at the backend root.
+
+Limitations: a moved node in the middle of an edge is only picked up if its
+way also changed, and consolidation is redone inside the neighborhood
+only, so a change that merges or splits an intersection next to untouched
+edges can differ from a full rebuild. `compare_edges` reports those
+differences (`python update.py --verify`).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.osc import OsmChange
+from src.schema import compact_edges
+
+# Buffer (meters) around the touched edges when re-fetching their neighborhood
+UPDATE_BUFFER = float(os.environ.get("BIKE_STRESS_UPDATE_BUFFER", "200"))
+
+
+def _ids(value) -> list:
+    """OSM id(s) of an osmid/osmid_original value (an id or a list of ids)."""
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return [int(v) for v in value]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [int(value)]
+
+
+def touched_mask(edges: pd.DataFrame, change: OsmChange) -> np.ndarray:
+    """Edges made of a changed way or ending at a changed node."""
+    ways = change.touched_ways
+    nodes = change.touched_nodes
+
+    mask = np.array(
+        [any(i in ways for i in _ids(osmid)) for osmid in edges["osmid"]],
+        dtype=bool,
+    )
+    for column in ["u_original", "v_original"]:
+        if column in edges:
+            mask |= edges[column].isin(nodes).to_numpy()
+    return mask
+
+
+def affected_bbox(
+    edges: pd.DataFrame,
+    change: OsmChange,
+    within: tuple[float, float, float, float] | None = None,
+    buffer: float = UPDATE_BUFFER,
+    nodes: pd.DataFrame | None = None,
+) -> tuple[float, float, float, float] | None:
+    """
+    (left, bottom, right, top) around the touched edges, the changed nodes
+    and the cached nodes of created or modified ways, plus buffer meters.
+
+    Args:
+        edges: The touched edges.
+        change: The OSM change.
+        within: Only count changed nodes inside these bounds (e.g. the
+            network's), since a planet diff changes nodes everywhere.
+        buffer: Buffer in meters.
+        nodes: The cached nodes, to locate ways through their node refs
+            (e.g. a new street between existing intersections, which has
+            no cached edge and no changed node).
+    Returns:
+        The bounding box, or None if nothing in the change is located there.
+    """
+    bounds = []
+    if len(edges):
+        bounds.append(edges.geometry.total_bounds)
+    if nodes is not None and change.ways:
+        lookup = _node_ids(nodes)
+        refs = {ref for way in change.ways.values() for ref in way["nodes"]}
+        located = list(dict.fromkeys(lookup[ref] for ref in refs if ref in lookup))
+        if located:
+            points = nodes.geometry.loc[located]
+            bounds.append(points.total_bounds)
+    if change.nodes:
+        xy = np.array(list(change.nodes.values()))
+        if within is not None:
+            left, bottom, right, top = within
+            xy = xy[
+                (xy[:, 0] >= left)
+                & (xy[:, 0] <= right)
+                & (xy[:, 1] >= bottom)
+                & (xy[:, 1] <= top)
+            ]
+        if len(xy):
+            bounds.append([*xy.min(axis=0), *xy.max(axis=0)])
+    if not bounds:
+        return None
+
+    bounds = np.array(bounds)
+    left, bottom = bounds[:, :2].min(axis=0)
+    right, top = bounds[:, 2:].max(axis=0)
+
+    # meters to degrees, at the box's latitude
+    dy = buffer / 111_320
+    dx = dy / np.cos(np.radians((bottom + top) / 2))
+    return (
+        float(left - dx), float(bottom - dy), float(right + dx), float(top + dy)
+    )
+
+
+def _node_ids(nodes: pd.DataFrame) -> dict:
+    """OSM node id -> id of the (consolidated) node it belongs to."""
+    originals = nodes["osmid_original"] if "osmid_original" in nodes else nodes.index
+    return {
+        osm_id: node
+        for node, original in zip(nodes.index, originals)
+        for osm_id in _ids(original)
+    }
+
+
+def splice_network(
+    nodes: pd.DataFrame,
+    edges: pd.DataFrame,
+    new_nodes: pd.DataFrame,
+    new_edges: pd.DataFrame,
+    change: OsmChange,
+):
+    """
+    Replace the touched edges of a network by those of a re-fetched
+    neighborhood.
+
+    Touched neighborhood edges are rewired to the cached node ids (matched
+    through their OSM node ids); neighborhood nodes unknown to the cache get
+    new ids.
+
+    Returns:
+        (nodes, edges, removed, added): the spliced network, the (u, v, key)
+        index of the dropped edges and of the new ones.
+    """
+    remove = touched_mask(edges, change)
+    take = new_edges[touched_mask(new_edges, change)]
+
+    # map neighborhood node ids to cached ones
+    lookup = _node_ids(nodes)
+    new_ids = {}
+    next_id = int(nodes.index.max()) + 1 if len(nodes) else 0
+    used = np.unique(
+        np.concatenate(
+            [take.index.get_level_values("u"), take.index.get_level_values("v")]
+        )
+    )
+    for node in used:
+        originals = _ids(new_nodes.loc[node].get("osmid_original", node))
+        known = [lookup[i] for i in originals if i in lookup]
+        if known:
+            new_ids[node] = known[0]
+        else:
+            new_ids[node] = next_id
+            next_id += 1
+
+    added_nodes = new_nodes.loc[
+        [node for node in used if new_ids[node] not in nodes.index]
+    ]
+    added_nodes = added_nodes.set_axis(
+        pd.Index([new_ids[n] for n in added_nodes.index], name=nodes.index.name)
+    )
+
+    kept = edges[~remove]
+    u = take.index.get_level_values("u").map(new_ids).to_numpy()
+    v = take.index.get_level_values("v").map(new_ids).to_numpy()
+
+    # keys continue after the kept parallel edges between the same nodes
+    kept_keys = (
+        pd.Series(kept.index.get_level_values("key"), index=kept.index.droplevel("key"))
+        .groupby(level=[0, 1])
+        .max()
+    )
+    start = np.array(
+        [kept_keys.get((a, b), -1) + 1 for a, b in zip(u, v)], dtype=np.int64
+    )
+    offset = pd.Series(0, index=range(len(take))).groupby([u, v]).cumcount().to_numpy()
+    take = take.set_axis(
+        pd.MultiIndex.from_arrays([u, v, start + offset], names=edges.index.names)
+    )
+
+    removed = edges.index[remove]
+    nodes = pd.concat([nodes, added_nodes])
+    edges = pd.concat([kept, take])
+    return nodes, edges, removed, take.index
+
+
+def patch_edges(
+    scored: pd.DataFrame, removed: pd.Index, added: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Drop the removed edges from a scored network and append the newly
+    scored ones, re-casting to the compact schema (categories may differ).
+    """
+    kept = scored[~scored.index.isin(removed)]
+    patched = pd.concat([kept, added[scored.columns]])
+    return compact_edges(patched)[scored.columns]
+
+
+def _edge_keys(edges: pd.DataFrame, precision: int = 6) -> pd.MultiIndex:
+    """Key of an edge independent of node ids: rounded end points and length."""
+    geometry = edges.geometry.array
+    ends = np.column_stack(
+        [
+            shapely.get_coordinates(shapely.get_point(geometry, 0)),
+            shapely.get_coordinates(shapely.get_point(geometry, -1)),
+        ]
+    )
+    frame = pd.DataFrame(np.round(ends, precision))
+    frame[4] = np.round(edges["length"].to_numpy(dtype=float), 1)
+    return pd.MultiIndex.from_frame(frame)
+
+
+def compare_edges(
+    patched: pd.DataFrame,
+    rebuilt: pd.DataFrame,
+    columns: tuple[str, ...] = ("composite_score", "separation_level"),
+) -> dict:
+    """
+    Compare an updated network with a full rebuild.
+
+    Node ids differ between builds, so edges are matched on their end point
+    coordinates and length.
+
+    Returns:
+        dict with the number of edges only in each network, and per column
+        the number of matched edges whose values differ.
+    """
+    a = patched.set_axis(_edge_keys(patched))
+    b = rebuilt.set_axis(_edge_keys(rebuilt))
+    a = a[~a.index.duplicated()]
+    b = b[~b.index.duplicated()]
+    common = a.index.intersection(b.index)
+
+    report = {
+        "edges": len(patched),
+        "rebuilt_edges": len(rebuilt),
+        "only_patched": len(a.index.difference(b.index)),
+        "only_rebuilt": len(b.index.difference(a.index)),
+        "matched": len(common),
+    }
+    for column in columns:
+        x = a.loc[common, column].astype(object)
+        y = b.loc[common, column].astype(object)
+        same = (x == y) | (x.isna() & y.isna())
+        report[f"{column}_mismatches"] = int((~same).sum())
+    return report
@@ -0,0 +1,40 @@
+import os
+from unittest import mock
+
+import pytest
+
+import main
+from tests.benchmarks.synthetic import grid_graph, synthetic_edges
+
+# Edge table sizes to benchmark, e.g. BIKE_STRESS_BENCH_SIZES=10000,100000,1000000
+SIZES = [
+    int(s) for s in os.environ.get("BIKE_STRESS_BENCH_SIZES", "10000").split(",")
+]
+
+# Side of the routing grid (side x side nodes)
+GRID_SIDE = int(os.environ.get("BIKE_STRESS_BENCH_GRID_SIDE", "50"))
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda n: f"{n}_rows")
+def raw_edges(request):
+    """Synthetic edges as fetched from OSM."""
+    return synthetic_edges(request.param)
+
+
+@pytest.fixture(scope="session")
+def processed_edges(raw_edges):
+    """Synthetic edges after process_network, the input of every model."""
+    return main.process_network(raw_edges.copy())
+
+
+@pytest.fixture(scope="session")
+def scored_edges(raw_edges):
+    """Synthetic edges through the whole pipeline."""
+    with mock.patch.object(main, "get_network", return_value=(None, raw_edges)):
+        _, edges = main.prepare_data_for_place("Benchmark City")
+    return edges
+
+
+@pytest.fixture(scope="session")
+def graph():
+    return grid_graph(GRID_SIDE)
@@ -0,0 +1,198 @@
+"""
+Synthetic OSM-like inputs for the benchmarks, so they run offline.
+
+`synthetic_edges` mimics the edges GeoDataFrame returned by
+`ox.graph_to_gdfs` for a bike network: list-valued tags where OSM ways were
+merged, maxspeed strings with "mph", cycleway:* combinations and widths in
+meters or feet. `grid_graph` is a projected street grid with scored edges
+for the routing benchmarks.
+"""
+
+import geopandas as gpd
+import networkx as nx
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.stressmodel.composite import PROFILES, profile_column
+
+# (value, probability) pairs, roughly the mix seen in Somerville/Cambridge
+HIGHWAY = [
+    ("residential", 0.40),
+    ("service", 0.14),
+    ("footway", 0.10),
+    ("tertiary", 0.08),
+    ("secondary", 0.07),
+    ("cycleway", 0.05),
+    ("path", 0.04),
+    ("primary", 0.04),
+    ("unclassified", 0.03),
+    ("living_street", 0.01),
+    (["residential", "service"], 0.02),
+    (["tertiary", "residential"], 0.02),
+]
+MAXSPEED = [
+    (np.nan, 0.55),
+    ("25 mph", 0.20),
+    ("20 mph", 0.08),
+    ("30 mph", 0.08),
+    ("35 mph", 0.03),
+    ("45 mph", 0.02),
+    ("30", 0.01),
+    (["25 mph", "30 mph"], 0.02),
+    (["20 mph", "25 mph"], 0.01),
+]
+LANES = [
+    (np.nan, 0.60),
+    ("2", 0.22),
+    ("1", 0.08),
+    ("4", 0.05),
+    ("3", 0.02),
+    (["2", "3"], 0.02),
+    (["1", "2"], 0.01),
+]
+WIDTH = [
+    (np.nan, 0.80),
+    ("10", 0.05),
+    ("3.5", 0.04),
+    ("12'", 0.03),
+    ("9'6\"", 0.02),
+    ("6.1", 0.03),
+    (["3.5", "4"], 0.02),
+    (["10'", "12'"], 0.01),
+]
+NAME = [
+    (np.nan, 0.30),
+    ("Broadway", 0.10),
+    ("Highland Avenue", 0.10),
+    ("Elm Street", 0.15),
+    ("Holland Street", 0.15),
+    ("Summer Street", 0.15),
+    (["Elm Street", "Holland Street"], 0.05),
+]
+BICYCLE = [(np.nan, 0.80), ("designated", 0.08), ("yes", 0.10), ("no", 0.02)]
+CYCLEWAY = [
+    (np.nan, 0.85),
+    ("lane", 0.05),
+    ("shared_lane", 0.04),
+    ("track", 0.02),
+    ("no", 0.02),
+    ("share_busway", 0.01),
+    (["lane", "no"], 0.01),
+]
+CYCLEWAY_SIDE = [
+    (np.nan, 0.88),
+    ("lane", 0.06),
+    ("no", 0.03),
+    ("track", 0.01),
+    ("shared_lane", 0.01),
+    ("separate", 0.01),
+]
+CYCLEWAY_BUFFER = [(np.nan, 0.94), ("yes", 0.03), ("no", 0.02), ("0.5", 0.01)]
+CYCLEWAY_SEPARATION = [(np.nan, 0.96), ("flex_post", 0.02), ("kerb", 0.02)]
+
+# approximate extent of Somerville, MA (EPSG:4326)
+BOUNDS = (-71.134, 42.373, -71.073, 42.418)
+
+
+def _sample(rng: np.random.Generator, dist: list, n: int) -> list:
+    """Draw n tag values from a list of (value, probability) pairs."""
+    values = [v for v, _ in dist]
+    p = np.array([p for _, p in dist])
+    idx = rng.choice(len(values), size=n, p=p / p.sum())
+    return [values[i] for i in idx]
+
+
+def synthetic_edges(n: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """
+    Edges GeoDataFrame shaped like `ox.graph_to_gdfs(G)[1]` after
+    consolidation, with n rows and a (u, v, key) MultiIndex.
+    """
+    rng = np.random.default_rng(seed)
+
+    # endpoints on a square grid of nodes, connecting neighbors
+    side = max(int(np.sqrt(n / 2)), 2)
+    u = rng.integers(0, side * side, n)
+    step = rng.choice([1, side], size=n)
+    v = (u + step) % (side * side)
+
+    # straight two-point segments, 50-150 m long
+    x0 = rng.uniform(BOUNDS[0], BOUNDS[2], n)
+    y0 = rng.uniform(BOUNDS[1], BOUNDS[3], n)
+    dx = rng.uniform(-0.0015, 0.0015, n)
+    dy = rng.uniform(-0.0010, 0.0010, n)
+    start = np.column_stack([x0, y0])
+    end = np.column_stack([x0 + dx, y0 + dy])
+    geometry = shapely.linestrings(np.stack([start, end], axis=1))
+
+    index = pd.MultiIndex.from_arrays(
+        [u, v, np.zeros(n, dtype=int)], names=["u", "v", "key"]
+    )
+    data = {
+        "osmid": rng.integers(1, 10**9, n),
+        "highway": _sample(rng, HIGHWAY, n),
+        "maxspeed": _sample(rng, MAXSPEED, n),
+        "lanes": _sample(rng, LANES, n),
+        "width": _sample(rng, WIDTH, n),
+        "name": _sample(rng, NAME, n),
+        "oneway": rng.random(n) < 0.3,
+        "reversed": rng.random(n) < 0.5,
+        "length": rng.uniform(5, 300, n),
+        "bicycle": _sample(rng, BICYCLE, n),
+        "cycleway": _sample(rng, CYCLEWAY, n),
+        "cycleway:left": _sample(rng, CYCLEWAY_SIDE, n),
+        "cycleway:right": _sample(rng, CYCLEWAY_SIDE, n),
+        "cycleway:both": _sample(rng, CYCLEWAY_SIDE, n),
+        "cycleway:buffer": _sample(rng, CYCLEWAY_BUFFER, n),
+        "cycleway:separation": _sample(rng, CYCLEWAY_SEPARATION, n),
+    }
+    # columns process_network drops
+    for column in ["ref", "service", "access", "bridge", "tunnel", "junction"]:
+        data[column] = np.nan
+
+    return gpd.GeoDataFrame(data, index=index, geometry=geometry, crs="EPSG:4326")
+
+
+def grid_graph(side: int, seed: int = 0) -> nx.MultiDiGraph:
+    """
+    side x side street grid (100 m blocks, projected CRS) with both
+    directions of every street and random composite/profile scores.
+    """
+    rng = np.random.default_rng(seed)
+
+    G = nx.MultiDiGraph(crs="EPSG:32619")
+    for i in range(side):
+        for j in range(side):
+            G.add_node(i * side + j, x=325000.0 + 100 * i, y=4695000.0 + 100 * j)
+
+    score_columns = ["composite_score"] + [profile_column(p) for p in PROFILES]
+    for i in range(side):
+        for j in range(side):
+            node = i * side + j
+            neighbors = []
+            if i + 1 < side:
+                neighbors.append(node + side)
+            if j + 1 < side:
+                neighbors.append(node + 1)
+            for other in neighbors:
+                attrs = {"length": float(rng.uniform(80, 120))}
+                attrs.update({c: float(rng.uniform(0, 10)) for c in score_columns})
+                G.add_edge(node, other, **attrs)
+                G.add_edge(other, node, **attrs)
+
+    return G
+
+
+def grid_points(G: nx.MultiDiGraph, n: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """Random census-block-like points inside a grid graph."""
+    rng = np.random.default_rng(seed)
+    xs = [d["x"] for _, d in G.nodes(data=True)]
+    ys = [d["y"] for _, d in G.nodes(data=True)]
+    x = rng.uniform(min(xs), max(xs), n)
+    y = rng.uniform(min(ys), max(ys), n)
+    ids = [f"{i:04d}" for i in range(n)]
+    return gpd.GeoDataFrame(
+        {"GEOID20": ids, "BLKGRP20": ids, "TRACT20": ids},
+        geometry=shapely.points(x, y),
+        crs=G.graph["crs"],
+    )
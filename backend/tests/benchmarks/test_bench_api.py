@@ -0,0 +1,33 @@
+import pytest
+
+from api import NetworkRequest, serialize_network
+from main import OUTPUT_COLUMNS
+from src.query import EdgeIndex
+
+
+@pytest.fixture(scope="module")
+def network(scored_edges):
+    """Scored edges as served by the API."""
+    return scored_edges[OUTPUT_COLUMNS]
+
+
+@pytest.fixture(scope="module")
+def index(network):
+    return EdgeIndex.from_edges(network)
+
+
+class TestBenchSerialize:
+    """Benchmarks for /getNetwork serialization."""
+
+    def test_full_network(self, benchmark, network, index):
+        request = NetworkRequest(city="Benchmark City")
+        benchmark(serialize_network, network, index, request)
+
+    def test_filtered(self, benchmark, network, index):
+        request = NetworkRequest(
+            city="Benchmark City",
+            bbox=[-71.11, 42.38, -71.09, 42.40],
+            min_score=2.5,
+            columns=["name", "composite_score"],
+        )
+        benchmark(serialize_network, network, index, request)
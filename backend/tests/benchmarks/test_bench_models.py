@@ -0,0 +1,29 @@
+import pytest
+
+import main
+import src.stressmodel as sm
+
+
+class TestBenchModels:
+    """Benchmarks for each stress model and the composite score."""
+
+    def test_process_network(self, benchmark, raw_edges):
+        benchmark(lambda: main.process_network(raw_edges.copy()))
+
+    def test_speed(self, benchmark, processed_edges):
+        benchmark(sm.speed.run, processed_edges)
+
+    def test_separation_level(self, benchmark, processed_edges):
+        benchmark(sm.separation_level.run, processed_edges)
+
+    def test_classification(self, benchmark, processed_edges):
+        benchmark(sm.classification.run, processed_edges)
+
+    def test_lanes(self, benchmark, processed_edges):
+        benchmark(sm.lanes.run, processed_edges)
+
+    def test_composite_all_profiles(self, benchmark, scored_edges):
+        benchmark(sm.composite.run, scored_edges)
+
+    def test_compute_composite_score(self, benchmark, scored_edges):
+        benchmark(main.compute_composite_score, scored_edges)
@@ -0,0 +1,40 @@
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+from src.odmatrix import compute_od_matrix
+from src.route import compute_routes_from_census_blocks_to_school, get_route_gdf
+from tests.benchmarks.synthetic import grid_points
+
+
+@pytest.fixture(scope="module")
+def corners(graph):
+    xs = [d["x"] for _, d in graph.nodes(data=True)]
+    ys = [d["y"] for _, d in graph.nodes(data=True)]
+    return Point(min(xs), min(ys)), Point(max(xs), max(ys))
+
+
+class TestBenchRouting:
+    """Benchmarks for routing on a synthetic street grid."""
+
+    @pytest.mark.parametrize("weight", ["composite_score", "length"])
+    def test_get_route_gdf(self, benchmark, graph, corners, weight):
+        start, end = corners
+        benchmark(get_route_gdf, graph, start, end, weight=weight)
+
+    def test_batch_routes_to_school(self, benchmark, graph, corners):
+        blocks = grid_points(graph, 50)
+        school = pd.Series(
+            {"geometry": corners[1], "Name": "Benchmark School", "GlobalID": "1"}
+        )
+        benchmark(compute_routes_from_census_blocks_to_school, graph, blocks, school)
+
+    def test_od_matrix_to_school(self, benchmark, graph, corners):
+        blocks = grid_points(graph, 50)
+        schools = gpd.GeoDataFrame(
+            {"Name": ["Benchmark School"], "GlobalID": ["1"]},
+            geometry=[corners[1]],
+            crs=graph.graph["crs"],
+        )
+        benchmark(compute_od_matrix, graph, blocks, schools, keep_routes=True)
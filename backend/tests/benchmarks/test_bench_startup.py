@@ -0,0 +1,11 @@
+import pytest
+
+from src.importtime import measure
+
+
+class TestBenchStartup:
+    """Benchmark for the API's cold import (what every uvicorn worker pays)."""
+
+    def test_import_api(self, benchmark):
+        times = benchmark.pedantic(measure, args=("api",), rounds=5)
+        benchmark.extra_info["import_api_s"] = times["api"]
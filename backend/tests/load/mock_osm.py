@@ -0,0 +1,314 @@
+"""
+Local stand-in for the Overpass and Nominatim APIs.
+
+Replays recorded responses, so osmnx (`ox.graph_from_place`, the API's
+builds) works offline and load tests never hit the public OSM services:
+
+    /api/status        Overpass status (always a free slot)
+    /api/interpreter   Overpass queries
+    /search, /lookup   Nominatim
+
+Each response is stored as <key>.json in the recordings directory, keyed by
+the endpoint and its sorted parameters (`request_key`). Record them once
+against the real services, then replay them:
+
+    python -m tests.load.mock_osm tests/load/recordings --record
+    python -m tests.load.mock_osm tests/load/recordings --port 8765
+
+    BIKE_STRESS_OVERPASS_URL=http://127.0.0.1:8765/api \\
+    BIKE_STRESS_NOMINATIM_URL=http://127.0.0.1:8765 \\
+        uv run uvicorn api:app
+
+Requests without a recording get a 404, or with --synthetic a made-up place:
+a square boundary around a point derived from the query, and a grid of
+streets (some with cycleways) 100 m apart inside the queried polygon.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+OVERPASS_UPSTREAM = "https://overpass-api.de/api"
+NOMINATIM_UPSTREAM = "https://nominatim.openstreetmap.org"
+
+OVERPASS_STATUS = (
+    "Connected as: 0\n"
+    "Current time: 1970-01-01T00:00:00Z\n"
+    "Announced endpoint: none\n"
+    "Rate limit: 0\n"
+    "2 slots available now.\n"
+)
+
+# Side of a synthetic place's boundary (meters)
+SYNTHETIC_SIZE = float(os.environ.get("BIKE_STRESS_MOCK_OSM_SIZE", "3000"))
+
+# Synthetic street grid spacing (degrees, about 100 m at 42N)
+GRID_LAT = 0.0009
+GRID_LON = 0.0012
+
+# (highway, extra tags) of synthetic streets, cycled through by street index
+SYNTHETIC_STREETS = [
+    ("residential", {"maxspeed": "25 mph"}),
+    ("residential", {"maxspeed": "25 mph", "cycleway": "shared_lane"}),
+    ("tertiary", {"maxspeed": "25 mph", "lanes": "2", "cycleway:right": "lane"}),
+    ("secondary", {"maxspeed": "30 mph", "lanes": "4"}),
+    ("residential", {"cycleway:both": "lane", "cycleway:buffer": "yes"}),
+    ("primary", {"maxspeed": "35 mph", "lanes": "4", "cycleway": "track"}),
+    ("cycleway", {}),
+    ("unclassified", {"oneway": "yes", "cycleway:left": "lane"}),
+]
+
+
+def request_key(endpoint: str, params: list[tuple[str, str]]) -> str:
+    """Recording key of a request, independent of parameter order."""
+    query = urlencode(sorted(params))
+    return hashlib.sha256(f"{endpoint}?{query}".encode()).hexdigest()[:20]
+
+
+def _endpoint(path: str) -> str:
+    """"interpreter", "status", "search" or "lookup" (or the bare path)."""
+    return path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def synthetic_place(query: str) -> list[dict]:
+    """Nominatim search result: a square around a point derived from query."""
+    digest = int(hashlib.sha256(query.lower().encode()).hexdigest(), 16)
+    lat = 42.0 + (digest % 1000) / 1000
+    lon = -72.0 + (digest // 1000 % 1000) / 1000
+
+    half_lat = SYNTHETIC_SIZE / 2 / 111_320
+    half_lon = half_lat / math.cos(math.radians(lat))
+    south, north = lat - half_lat, lat + half_lat
+    west, east = lon - half_lon, lon + half_lon
+    ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+    return [
+        {
+            "place_id": digest % 10**9,
+            "osm_type": "relation",
+            "osm_id": digest % 10**8,
+            "lat": str(lat),
+            "lon": str(lon),
+            "class": "boundary",
+            "type": "administrative",
+            "display_name": query,
+            "importance": 0.5,
+            "boundingbox": [str(south), str(north), str(west), str(east)],
+            "geojson": {"type": "Polygon", "coordinates": [ring]},
+        }
+    ]
+
+
+def synthetic_network(query: str) -> dict:
+    """Overpass response: a street grid covering the query's polygon."""
+    coords = re.search(r"poly:[\"']([^\"']+)[\"']", query)
+    if coords is None:
+        return {"version": 0.6, "elements": []}
+    values = [float(v) for v in coords.group(1).split()]
+    lats, lons = values[0::2], values[1::2]
+
+    # grid indices, global so that subdivided queries share node ids
+    rows = range(math.floor(min(lats) / GRID_LAT), math.ceil(max(lats) / GRID_LAT) + 1)
+    cols = range(math.floor(min(lons) / GRID_LON), math.ceil(max(lons) / GRID_LON) + 1)
+
+    def node_id(i, j):
+        return (i + 100_000) * 1_000_000 + (j + 200_000)
+
+    elements = [
+        {"type": "node", "id": node_id(i, j), "lat": i * GRID_LAT, "lon": j * GRID_LON}
+        for i in rows
+        for j in cols
+    ]
+    streets = [(10**12 + i, [node_id(i, j) for j in cols], i) for i in rows]
+    streets += [(2 * 10**12 + j, [node_id(i, j) for i in rows], j) for j in cols]
+    for way_id, nodes, index in streets:
+        highway, tags = SYNTHETIC_STREETS[index % len(SYNTHETIC_STREETS)]
+        elements.append(
+            {
+                "type": "way",
+                "id": way_id,
+                "nodes": nodes,
+                "tags": {"highway": highway, "name": f"Street {index}", **tags},
+            }
+        )
+    return {"version": 0.6, "elements": elements}
+
+
+class MockOSMServer(ThreadingHTTPServer):
+    """
+    HTTP server replaying (or recording) Overpass and Nominatim responses.
+
+    Args:
+        address: (host, port) to listen on, port 0 for any free port.
+        recordings: Directory of recorded responses.
+        record: Forward unrecorded requests to the real services and store
+            their responses.
+        synthetic: Answer unrecorded requests with a synthetic place.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        recordings: str,
+        record: bool = False,
+        synthetic: bool = False,
+        overpass_upstream: str = OVERPASS_UPSTREAM,
+        nominatim_upstream: str = NOMINATIM_UPSTREAM,
+    ):
+        super().__init__(address, MockOSMHandler)
+        self.recordings = recordings
+        self.record = record
+        self.synthetic = synthetic
+        self.upstreams = {
+            "interpreter": overpass_upstream,
+            "search": nominatim_upstream,
+            "lookup": nominatim_upstream,
+        }
+        # "replayed", "recorded", "synthetic" and "missing" requests
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.recordings, f"{key}.json")
+
+    def respond(self, endpoint: str, params: list[tuple[str, str]]):
+        """(status, body) of a request."""
+        path = self.path(request_key(endpoint, params))
+        if os.path.exists(path):
+            self.count("replayed")
+            with open(path, "rb") as f:
+                return 200, f.read()
+
+        if self.record and endpoint in self.upstreams:
+            status, body = self.forward(endpoint, params)
+            if status == 200:
+                os.makedirs(self.recordings, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+                self.count("recorded")
+            return status, body
+
+        if self.synthetic and endpoint in self.upstreams:
+            self.count("synthetic")
+            if endpoint == "interpreter":
+                result = synthetic_network(dict(params).get("data", ""))
+            else:
+                result = synthetic_place(dict(params).get("q", ""))
+            return 200, json.dumps(result).encode()
+
+        self.count("missing")
+        error = {"error": f"no recording for {endpoint} {urlencode(params)}"}
+        return 404, json.dumps(error).encode()
+
+    def forward(self, endpoint: str, params: list[tuple[str, str]]):
+        """(status, body) of the real service's response."""
+        url = f"{self.upstreams[endpoint].rstrip('/')}/{endpoint}"
+        data = urlencode(params).encode()
+        if endpoint == "interpreter":
+            request = urllib.request.Request(url, data=data, method="POST")
+        else:
+            request = urllib.request.Request(f"{url}?{data.decode()}")
+        request.add_header("User-Agent", "bike-stress-model load test recorder")
+        try:
+            with urllib.request.urlopen(request, timeout=180) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class MockOSMHandler(BaseHTTPRequestHandler):
+    server: MockOSMServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self._handle(url.path, parse_qsl(url.query, keep_blank_values=True))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        self._handle(url.path, params + parse_qsl(body, keep_blank_values=True))
+
+    def _handle(self, path: str, params: list[tuple[str, str]]):
+        endpoint = _endpoint(path)
+        if endpoint == "status":
+            status, body, media_type = 200, OVERPASS_STATUS.encode(), "text/plain"
+        else:
+            # osmnx adds its API key to Nominatim requests, never record it
+            params = [(k, v) for k, v in params if k != "key"]
+            status, body = self.server.respond(endpoint, params)
+            media_type = "application/json"
+
+        self.send_response(status)
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def running(recordings: str, port: int = 0, **kwargs):
+    """A MockOSMServer serving on localhost in a background thread."""
+    server = MockOSMServer(("127.0.0.1", port), recordings, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Overpass/Nominatim")
+    parser.add_argument("recordings", help="directory of recorded responses")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--record", action="store_true", help="record unknown requests upstream"
+    )
+    parser.add_argument(
+        "--synthetic", action="store_true", help="make up unknown places"
+    )
+    args = parser.parse_args()
+
+    server = MockOSMServer(
+        ("127.0.0.1", args.port),
+        args.recordings,
+        record=args.record,
+        synthetic=args.synthetic,
+    )
+    print(f"> Overpass: {server.url}/api, Nominatim: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"> {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""
+Load test of the API, offline.
+
+Starts the FastAPI app (uvicorn, in a fresh working directory so every
+artifact, stage and boundary cache starts cold) against the local
+Overpass/Nominatim stand-in of tests/load/mock_osm.py, builds the warm places
+once, then sends a weighted mix of concurrent requests:
+
+    cold     POST /getNetwork for a place not built yet (a new build)
+    warm     POST /getNetwork for a built place, full network
+    bbox     POST /getNetwork for the central quarter of a built place
+    rescore  POST /rescore of a built place, with random weights
+
+and reports p50/p95/p99 latency and throughput per scenario, and the peak
+RSS of the server process and of each of its workers (uvicorn workers,
+build processes; Linux only).
+
+    python -m tests.load.run --synthetic --mix warm=6,bbox=3,rescore=1 \\
+        --concurrency 8 --requests 200 --json before.json
+
+--synthetic makes up the places (see mock_osm.py); without it, the places
+must have recorded responses in --recordings. Server settings can be
+changed with --env, e.g. --env BIKE_STRESS_BUILD_EXECUTOR=thread.
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from tests.load.mock_osm import running
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), "recordings")
+
+SCENARIOS = ["cold", "warm", "bbox", "rescore"]
+
+# model parameters sent to /rescore (see api.BikeInfrastructureModel)
+RESCORE_PARAMETERS = ["separation_level", "street_classification", "speed_limit"]
+
+
+@dataclass
+class Sample:
+    scenario: str
+    start: float
+    latency_s: float
+    status: int
+    bytes: int
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """"warm=6,bbox=3" -> {"warm": 6.0, "bbox": 3.0} (zero weights dropped)."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {SCENARIOS}")
+        weights[name] = float(weight or 1)
+    return {name: w for name, w in weights.items() if w > 0}
+
+
+def percentiles(latencies) -> dict:
+    """p50/p95/p99, mean and max latency in milliseconds."""
+    ms = np.asarray(latencies, dtype=float) * 1000
+    if len(ms) == 0:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "mean_ms": round(float(ms.mean()), 1),
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+
+def summarize(samples: list[Sample], wall_s: float) -> dict:
+    """Latency percentiles, status codes and throughput per scenario and total."""
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample.scenario, []).append(sample)
+    groups["total"] = samples
+
+    summary = {}
+    for name, group in groups.items():
+        statuses = {}
+        for s in group:
+            statuses[str(s.status)] = statuses.get(str(s.status), 0) + 1
+        ok = [s for s in group if 200 <= s.status < 300]
+        summary[name] = {
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "statuses": statuses,
+            **percentiles([s.latency_s for s in ok]),
+            "throughput_rps": round(len(ok) / wall_s, 2) if wall_s > 0 else None,
+            "mb": round(sum(s.bytes for s in ok) / 1e6, 1),
+        }
+    return summary
+
+
+def extent(geojson: dict) -> tuple[float, float, float, float]:
+    """(minx, miny, maxx, maxy) of a GeoJSON FeatureCollection."""
+    xs, ys = [], []
+    for feature in geojson["features"]:
+        for x, y in _points(feature["geometry"]["coordinates"]):
+            xs.append(x)
+            ys.append(y)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _points(coords):
+    if coords and isinstance(coords[0], (int, float)):
+        yield coords[:2]
+        return
+    for c in coords:
+        yield from _points(c)
+
+
+def central_bbox(bounds) -> list[float]:
+    """The central quarter (half of each side) of bounds."""
+    minx, miny, maxx, maxy = bounds
+    dx, dy = (maxx - minx) / 4, (maxy - miny) / 4
+    return [minx + dx, miny + dy, maxx - dx, maxy - dy]
+
+
+class RSSSampler:
+    """
+    Peak RSS (VmHWM) of a process and its descendants, polled in a thread
+    so that workers that exit before the end are still counted.
+    """
+
+    def __init__(self, pid: int, workers: int, interval: float = 0.2):
+        self.pid = pid
+        self.workers = workers
+        self.interval = interval
+        self.peaks = {}  # pid -> {"pid", "role", "peak_rss_mb"}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> list[dict]:
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+        return sorted(self.peaks.values(), key=lambda p: p["pid"])
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        for pid, depth in self._tree():
+            peak = _read_status(pid, "VmHWM")
+            if peak is None or _is_helper(pid):
+                continue
+            if depth == 0:
+                role = "server"
+            elif depth == 1 and self.workers > 1:
+                role = "worker"
+            else:
+                role = "build"
+            previous = self.peaks.get(pid, {}).get("peak_rss_mb", 0)
+            self.peaks[pid] = {
+                "pid": pid,
+                "role": role,
+                "peak_rss_mb": max(previous, round(peak / 1024, 1)),
+            }
+
+    def _tree(self) -> list[tuple[int, int]]:
+        """(pid, depth) of the process and every descendant."""
+        parents = {}
+        for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+            if entry.isdigit():
+                ppid = _read_status(int(entry), "PPid")
+                if ppid is not None:
+                    parents.setdefault(ppid, []).append(int(entry))
+
+        tree, frontier = [], [(self.pid, 0)]
+        while frontier:
+            pid, depth = frontier.pop()
+            tree.append((pid, depth))
+            frontier.extend((child, depth + 1) for child in parents.get(pid, []))
+        return tree
+
+
+def _read_status(pid: int, field: str) -> int | None:
+    """A numeric field of /proc/<pid>/status (kB for memory), None if gone."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+def _is_helper(pid: int) -> bool:
+    """multiprocessing's resource tracker, not a worker."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"resource_tracker" in f.read()
+    except OSError:
+        return True
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, body: dict | None = None, timeout: float = 600):
+    """(status, response body) of a GET, or a POST of body as JSON."""
+    data = None if body is None else json.dumps(body).encode()
+    req = urllib.request.Request(url, data=data)
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        return 0, b""
+
+
+class LoadTest:
+    """One server (and mock OSM) under load, see run_load_test."""
+
+    def __init__(self, base_url: str, args):
+        self.base_url = base_url
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.cold_places = list(args.cold_places)
+        self.synthetic_count = 0
+        self.bboxes = {}  # warm place -> central bbox
+        self.model = None
+        self._lock = threading.Lock()
+
+    def timed(self, scenario: str, path: str, body: dict | None = None):
+        start = time.perf_counter()
+        status, data = request(
+            self.base_url + path, body, timeout=self.args.client_timeout
+        )
+        sample = Sample(scenario, start, time.perf_counter() - start, status, len(data))
+        return sample, data
+
+    def warm_up(self) -> list[Sample]:
+        """Build the warm places (one cold request each), one at a time."""
+        samples = []
+        for place in self.args.warm_places:
+            sample, data = self.timed("warmup", "/getNetwork", {"city": place})
+            samples.append(sample)
+            if sample.status != 200:
+                raise RuntimeError(f"Could not build {place}: {data[:500]!r}")
+            self.bboxes[place] = central_bbox(extent(json.loads(data)))
+
+        status, data = request(self.base_url + "/model")
+        spec = json.loads(data)["spec"]
+        self.model = {p: spec[p] for p in RESCORE_PARAMETERS}
+        return samples
+
+    def next_cold_place(self) -> str | None:
+        with self._lock:
+            if self.cold_places:
+                return self.cold_places.pop(0)
+            if self.args.synthetic:
+                self.synthetic_count += 1
+                return f"Load Test City {self.synthetic_count}, USA"
+        return None
+
+    def one(self, scenario: str, seed: int) -> Sample | None:
+        rng = random.Random(seed)
+        place = rng.choice(self.args.warm_places) if self.args.warm_places else None
+
+        if scenario == "cold":
+            place = self.next_cold_place()
+            if place is None:
+                return None
+            return self.timed(scenario, "/getNetwork", {"city": place})[0]
+        if scenario == "warm":
+            return self.timed(scenario, "/getNetwork", {"city": place})[0]
+        if scenario == "bbox":
+            body = {"city": place, "bbox": self.bboxes[place]}
+            return self.timed(scenario, "/getNetwork", body)[0]
+
+        model = json.loads(json.dumps(self.model))
+        for parameter in model.values():
+            parameter["weight"] = rng.uniform(0, 100)
+        body = {"city": place, "model": model}
+        return self.timed(scenario, "/rescore", body)[0]
+
+    def drive(self, mix: dict[str, float]) -> tuple[list[Sample], float]:
+        """Send args.requests requests of the mix, returns (samples, wall_s)."""
+        names = list(mix)
+        weights = [mix[n] for n in names]
+        picks = self.rng.choices(names, weights=weights, k=self.args.requests)
+        seeds = [self.rng.randrange(2**32) for _ in picks]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.args.concurrency) as pool:
+            samples = list(pool.map(self.one, picks, seeds))
+        wall_s = time.perf_counter() - start
+        return [s for s in samples if s is not None], wall_s
+
+
+def start_server(workdir: str, osm_url: str, args) -> subprocess.Popen:
+    """uvicorn serving api:app from workdir, once it answers GET /."""
+    env = {
+        **os.environ,
+        "BIKE_STRESS_OVERPASS_URL": f"{osm_url}/api",
+        "BIKE_STRESS_NOMINATIM_URL": osm_url,
+        "BIKE_STRESS_WARM_PLACES": "",
+        "BIKE_STRESS_REQUEST_TIMEOUT": str(args.client_timeout),
+    }
+    env.update(item.split("=", 1) for item in args.env)
+
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api:app",
+            "--app-dir",
+            os.path.abspath(BACKEND_DIR),
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=workdir,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited, see {log.name}")
+        if request(f"http://127.0.0.1:{args.port}/", timeout=1)[0] == 200:
+            return server
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"Server did not start in {args.startup_timeout}s")
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def run_load_test(args) -> dict:
+    """Run the load test described by the command line args, returns the report."""
+    mix = parse_mix(args.mix)
+    if set(mix) - {"cold"} and not args.warm_places:
+        raise ValueError("warm, bbox and rescore requests need --warm-places")
+    args.port = args.port or _free_port()
+    workdir = tempfile.mkdtemp(prefix="bike-stress-load-")
+
+    with running(args.recordings, synthetic=args.synthetic) as osm:
+        server = start_server(workdir, osm.url, args)
+        sampler = RSSSampler(server.pid, args.workers)
+        sampler.start()
+        try:
+            test = LoadTest(f"http://127.0.0.1:{args.port}", args)
+            warmup = test.warm_up()
+            samples, wall_s = test.drive(mix)
+        finally:
+            peaks = sampler.stop()
+            stop_server(server)
+        osm_stats = dict(osm.stats)
+
+    return {
+        "config": {
+            "mix": mix,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "warm_places": args.warm_places,
+            "env": args.env,
+        },
+        "wall_s": round(wall_s, 2),
+        "warmup": [asdict(s) for s in warmup],
+        "scenarios": summarize(samples, wall_s),
+        "peak_rss": peaks,
+        "osm": osm_stats,
+        "workdir": workdir,
+    }
+
+
+def print_report(report: dict):
+    print(f"> {report['config']['requests']} requests in {report['wall_s']} s")
+    print(
+        f"{'scenario':<10}{'requests':>9}{'errors':>8}{'p50 ms':>10}"
+        f"{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}"
+    )
+    for name, s in report["scenarios"].items():
+        print(
+            f"{name:<10}{s['requests']:>9}{s['errors']:>8}{s['p50_ms'] or '-':>10}"
+            f"{s['p95_ms'] or '-':>10}{s['p99_ms'] or '-':>10}"
+            f"{s['throughput_rps'] or '-':>8}"
+        )
+    for sample in report["warmup"]:
+        print(f"> warm-up build: {sample['latency_s']:.1f} s ({sample['status']})")
+    for peak in report["peak_rss"]:
+        print(f"> peak RSS {peak['role']} {peak['pid']}: {peak['peak_rss_mb']} MB")
+    print(f"> OSM requests: {report['osm']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API offline")
+    parser.add_argument(
+        "--mix", default="warm=6,bbox=3,rescore=1", help="scenario=weight,..."
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument(
+        "--warm-places",
+        nargs="*",
+        default=None,
+        help="places built before the load (default: one synthetic place)",
+    )
+    parser.add_argument(
+        "--cold-places", nargs="*", default=[], help="places for cold requests"
+    )
+    parser.add_argument("--recordings", default=RECORDINGS_DIR)
+    parser.add_argument(
+        "--synthetic", action="store_true", help="make up unrecorded places"
+    )
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--client-timeout", type=float, default=600)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.warm_places is None:
+        args.warm_places = ["Load Test Town, USA"] if args.synthetic else []
+
+    report = run_load_test(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+import osmnx as ox
+import pytest
+
+from tests.load.mock_osm import request_key, running
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@pytest.fixture
+def osmnx_settings():
+    saved = (ox.settings.overpass_url, ox.settings.nominatim_url, ox.settings.use_cache)
+    ox.settings.use_cache = False
+    yield ox.settings
+    ox.settings.overpass_url, ox.settings.nominatim_url, ox.settings.use_cache = saved
+
+
+class TestRequestKey:
+    """Tests for request_key function."""
+
+    def test_parameter_order(self):
+        a = request_key("search", [("q", "Somerville"), ("format", "json")])
+        b = request_key("search", [("format", "json"), ("q", "Somerville")])
+        assert a == b
+        assert a != request_key("lookup", [("q", "Somerville"), ("format", "json")])
+
+
+class TestMockOSMServer:
+    """Tests for MockOSMServer."""
+
+    def test_missing(self, tmp_path):
+        with running(str(tmp_path)) as server:
+            status, body = get(f"{server.url}/search?q=Nowhere")
+            assert status == 404
+            assert "no recording" in json.loads(body)["error"]
+            assert server.stats == {"missing": 1}
+
+    def test_status(self, tmp_path):
+        with running(str(tmp_path)) as server:
+            status, body = get(f"{server.url}/api/status")
+        assert status == 200
+        assert body.decode().split("\n")[4].startswith("2 slots")
+
+    def test_record_then_replay(self, tmp_path):
+        query = urlencode({"format": "json", "q": "Testville, USA"})
+        with running(str(tmp_path / "upstream"), synthetic=True) as upstream:
+            with running(
+                str(tmp_path / "recorded"),
+                record=True,
+                nominatim_upstream=upstream.url,
+            ) as recorder:
+                _, recorded = get(f"{recorder.url}/search?{query}")
+                assert recorder.stats == {"recorded": 1}
+
+        with running(str(tmp_path / "recorded")) as server:
+            status, replayed = get(f"{server.url}/search?{query}")
+            assert server.stats == {"replayed": 1}
+        assert status == 200
+        assert replayed == recorded
+
+    def test_graph_from_place(self, tmp_path, osmnx_settings):
+        with running(str(tmp_path), synthetic=True) as server:
+            osmnx_settings.overpass_url = f"{server.url}/api"
+            osmnx_settings.nominatim_url = server.url
+            G = ox.graph_from_place("Testville, USA", network_type="bike")
+            assert server.stats == {"synthetic": 2}
+
+        _, edges = ox.graph_to_gdfs(G)
+        assert len(edges) > 1000
+        assert {"cycleway", "primary", "residential"} <= set(edges["highway"])
@@ -0,0 +1,56 @@
+import pytest
+
+from tests.load.run import Sample, central_bbox, extent, parse_mix, summarize
+
+
+class TestParseMix:
+    """Tests for parse_mix function."""
+
+    def test_weights(self):
+        assert parse_mix("warm=6, bbox=3,cold=0,rescore") == {
+            "warm": 6.0,
+            "bbox": 3.0,
+            "rescore": 1.0,
+        }
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            parse_mix("warm=1,stampede=2")
+
+
+class TestSummarize:
+    """Tests for summarize function."""
+
+    def test_percentiles(self):
+        samples = [Sample("warm", 0, i / 1000, 200, 10) for i in range(1, 101)]
+        samples += [Sample("cold", 0, 5.0, 503, 0)]
+
+        summary = summarize(samples, wall_s=2.0)
+
+        assert summary["warm"]["p50_ms"] == pytest.approx(50.5)
+        assert summary["warm"]["p99_ms"] == pytest.approx(99.0)
+        assert summary["warm"]["throughput_rps"] == 50
+        # errors are counted, but not part of the latencies
+        assert summary["cold"]["errors"] == 1
+        assert summary["cold"]["p50_ms"] is None
+        assert summary["total"]["requests"] == 101
+        assert summary["total"]["statuses"] == {"200": 100, "503": 1}
+
+
+class TestExtent:
+    """Tests for extent and central_bbox functions."""
+
+    def test_central_quarter(self):
+        geojson = {
+            "features": [
+                {"geometry": {"type": "LineString", "coordinates": [[0, 0], [2, 1]]}},
+                {
+                    "geometry": {
+                        "type": "MultiLineString",
+                        "coordinates": [[[4, 4], [3, 2]]],
+                    }
+                },
+            ]
+        }
+        assert extent(geojson) == (0, 0, 4, 4)
+        assert central_bbox(extent(geojson)) == [1, 1, 3, 3]
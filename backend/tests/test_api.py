@@ -0,0 +1,210 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from main import OUTPUT_COLUMNS, score_edges
+from src import artifacts
+from src.jobs import NetworkBuilder
+from src.stressmodel.spec import SPEC
+from tests.benchmarks.synthetic import synthetic_edges
+
+PLACE = "Test City"
+SLUG = artifacts.place_slug(PLACE)
+
+
+@pytest.fixture(scope="module")
+def network():
+    edges = score_edges(synthetic_edges(200), PLACE, collapse_two_way=True)
+    return edges[OUTPUT_COLUMNS]
+
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch, network):
+    builder = NetworkBuilder(
+        lambda place: network, executor="thread", artifact_dir=str(tmp_path)
+    )
+    monkeypatch.setattr(api, "builder", builder)
+    yield builder
+    builder.shutdown()
+
+
+@pytest.fixture
+def client(builder):
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def blocked(tmp_path, monkeypatch, network):
+    """Builder whose builds wait until the returned event is set."""
+    gate = threading.Event()
+
+    def build(place):
+        gate.wait(10)
+        return network
+
+    builder = NetworkBuilder(
+        build, max_pending=1, executor="thread", artifact_dir=str(tmp_path)
+    )
+    monkeypatch.setattr(api, "builder", builder)
+    yield gate
+    gate.set()
+    builder.shutdown()
+
+
+def off_event_loop(function, calls):
+    """Wrap function to record whether it ran on an event loop thread."""
+
+    def wrapped(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread")
+        return function(*args, **kwargs)
+
+    return wrapped
+
+
+def names(response) -> set:
+    return {f["properties"]["name"] for f in json.loads(response.content)["features"]}
+
+
+class TestGetNetworkCached:
+    """Tests for GET /networks/{slug}."""
+
+    def test_not_built(self, client):
+        assert client.get(f"/networks/{SLUG}").status_code == 404
+
+    def test_revalidation(self, client, builder, network):
+        artifacts.save_artifact(PLACE, network, builder.artifact_dir)
+        response = client.get(f"/networks/{SLUG}")
+        assert response.status_code == 200
+        assert len(json.loads(response.content)["features"]) == len(network)
+
+        etag = response.headers["etag"]
+        response = client.get(f"/networks/{SLUG}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_updated_artifact(self, client, builder, network):
+        artifacts.save_artifact(PLACE, network, builder.artifact_dir)
+        old = client.get(f"/networks/{SLUG}")
+        assert "Patched Street" not in names(old)
+
+        # as update.py does, while the old network is cached in memory
+        patched = network.assign(name="Patched Street")
+        artifacts.save_artifact(PLACE, patched, builder.artifact_dir)
+
+        new = client.get(f"/networks/{SLUG}")
+        assert new.headers["etag"] != old.headers["etag"]
+        assert names(new) == {"Patched Street"}
+
+        versioned = client.get(new.headers["content-location"])
+        assert versioned.status_code == 200
+        assert names(versioned) == {"Patched Street"}
+        assert client.get(old.headers["content-location"]).status_code == 404
+
+
+class TestGetNetwork:
+    """Tests for POST /getNetwork."""
+
+    def test_built_on_request(self, client, network):
+        response = client.post("/getNetwork", json={"city": PLACE})
+        assert response.status_code == 200
+        assert len(json.loads(response.content)["features"]) == len(network)
+
+    def test_queue_full(self, blocked):
+        client = TestClient(api.app)
+        assert client.post("/jobs", json={"city": "Other City"}).status_code == 202
+
+        response = client.post("/getNetwork", json={"city": PLACE})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(api.RETRY_AFTER)
+        assert client.post("/jobs", json={"city": PLACE}).status_code == 503
+
+    def test_deadline(self, blocked):
+        client = TestClient(api.app)
+        response = client.post("/getNetwork", json={"city": PLACE, "timeout": 0.1})
+        assert response.status_code == 504
+        assert "POST /jobs" in response.json()["detail"]
+
+    @pytest.mark.parametrize("timeout", [0, -1])
+    def test_invalid_timeout(self, client, timeout):
+        response = client.post("/getNetwork", json={"city": PLACE, "timeout": timeout})
+        assert response.status_code == 422
+
+
+class TestRescore:
+    """Tests for POST /rescore."""
+
+    def test_scores(self, client, builder, network):
+        artifacts.save_artifact(PLACE, network, builder.artifact_dir)
+        model = {p: SPEC.raw[p] for p in api.PARAMETERS}
+        response = client.post(
+            "/rescore", json={"city": PLACE, "model": model, "format": "json"}
+        )
+        assert response.status_code == 200
+        assert len(response.json()["composite_score"]) == len(network)
+
+    def test_matches_pipeline(self, client, builder, network):
+        # edges saved without a classification: score_edges gives an edge
+        # without a highway tag the unknown classification
+        unknown = network["street_classification"] == SPEC.default_classification
+        classification = network["street_classification"].where(~unknown)
+        artifacts.save_artifact(
+            PLACE,
+            network.assign(street_classification=classification),
+            builder.artifact_dir,
+        )
+        model = {p: SPEC.raw[p] for p in api.PARAMETERS}
+        response = client.post(
+            "/rescore", json={"city": PLACE, "model": model, "format": "json"}
+        )
+
+        assert unknown.any()
+        scores = np.array(response.json()["composite_score"], dtype=float)
+        np.testing.assert_allclose(scores, network["composite_score"], rtol=1e-6)
+
+
+class TestOffEventLoop:
+    """Loading networks and building their indexes never blocks the event loop."""
+
+    def test_get_network_and_rescore(self, client, builder, network, monkeypatch):
+        artifacts.save_artifact(PLACE, network, builder.artifact_dir)
+        calls = []
+        monkeypatch.setattr(builder, "get", off_event_loop(builder.get, calls))
+        monkeypatch.setattr(
+            builder, "get_derived", off_event_loop(builder.get_derived, calls)
+        )
+
+        assert client.post("/getNetwork", json={"city": PLACE}).status_code == 200
+        model = {p: SPEC.raw[p] for p in api.PARAMETERS}
+        response = client.post("/rescore", json={"city": PLACE, "model": model})
+        assert response.status_code == 200
+
+        assert len(calls) >= 4
+        assert set(calls) == {"thread"}
+
+
+class TestJobs:
+    """Tests for POST /jobs and GET /jobs/{job_id}."""
+
+    def test_build(self, client):
+        job = client.post("/jobs", json={"city": PLACE})
+        assert job.status_code == 202
+
+        end = time.time() + 10
+        while job.json()["status"] in ("pending", "running"):
+            assert time.time() < end, "job did not finish"
+            time.sleep(0.01)
+            job = client.get(f"/jobs/{job.json()['id']}")
+        assert job.json()["status"] == "done"
+        assert client.get(f"/networks/{SLUG}").status_code == 200
+
+    def test_unknown(self, client):
+        assert client.get("/jobs/nope").status_code == 404
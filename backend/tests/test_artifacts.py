@@ -0,0 +1,55 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString
+
+from src.artifacts import artifact_path, load_artifact, save_artifact
+
+
+def make_edges():
+    index = pd.MultiIndex.from_arrays(
+        [[1, 2, 3], [2, 3, 1], [0, 0, 0]], names=["u", "v", "key"]
+    )
+    return gpd.GeoDataFrame(
+        {
+            "name": pd.Categorical(["Elm Street", None, "Broadway"]),
+            "oneway": [True, False, False],
+            "composite_score": np.array([1.5, np.nan, 3.25], dtype="float32"),
+        },
+        index=index,
+        geometry=[
+            LineString([(0, 0), (1, 1)]),
+            LineString([(1, 1), (2, 0)]),
+            LineString([(2, 0), (0, 0)]),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+class TestArtifacts:
+    """Tests for save_artifact and load_artifact."""
+
+    def test_round_trip(self, tmp_path):
+        edges = make_edges()
+        save_artifact("Somerville", edges, str(tmp_path))
+        loaded = load_artifact("Somerville", str(tmp_path))
+
+        assert artifact_path("Somerville", str(tmp_path)).endswith(".arrow")
+        assert loaded.crs == edges.crs
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(loaded.drop(columns="geometry")),
+            pd.DataFrame(edges.drop(columns="geometry")),
+        )
+        assert loaded.geometry.geom_equals(edges.geometry).all()
+
+    def test_floats_are_memory_mapped(self, tmp_path):
+        save_artifact("Somerville", make_edges(), str(tmp_path))
+        loaded = load_artifact("Somerville", str(tmp_path))
+
+        # backed by the read-only mapping, not a private copy
+        scores = loaded["composite_score"].to_numpy()
+        assert not scores.flags.writeable
+        assert np.isnan(scores[1])
+
+    def test_missing(self, tmp_path):
+        assert load_artifact("Nowhere", str(tmp_path)) is None
@@ -0,0 +1,50 @@
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+from src.boundaries import get_boundary, normalize_place, place_key, preload
+
+
+class TestNormalizePlace:
+    """Tests for normalize_place function."""
+
+    @pytest.mark.parametrize(
+        "place",
+        [
+            "Somerville, Massachusetts, USA",
+            "Somerville, MA, USA",
+            "somerville, ma, us",
+            " Somerville ,  Massachusetts, United States of America",
+        ],
+    )
+    def test_aliases(self, place):
+        assert normalize_place(place) == "somerville, massachusetts, usa"
+        assert place_key(place) == "somerville_massachusetts_usa"
+
+    def test_first_part_kept(self):
+        # a place actually named like a state abbreviation
+        assert normalize_place("Me, Norway") == "me, norway"
+
+
+class TestBoundaryStore:
+    """Tests for preload and get_boundary functions."""
+
+    def test_preload_then_get(self, tmp_path):
+        polygons = gpd.GeoDataFrame(
+            {"place": ["Somerville, MA, USA", "Somerville, MA, USA", "Medford, MA, USA"]},
+            geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(5, 5, 6, 6)],
+            crs="EPSG:4326",
+        )
+        path = tmp_path / "boundaries.geojson"
+        polygons.to_file(path, driver="GeoJSON")
+
+        store = str(tmp_path / "store")
+        assert preload(str(path), boundary_dir=store) == [
+            "Somerville, MA, USA",
+            "Medford, MA, USA",
+        ]
+
+        # found under another spelling, without geocoding
+        boundary = get_boundary("Somerville, Massachusetts, USA", boundary_dir=store)
+        assert len(boundary) == 1
+        assert boundary.union_all().area == pytest.approx(2)
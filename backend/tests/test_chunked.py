@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import shapely
+
+from main import score_edges
+from src.chunked import (
+    chunk_bounds,
+    read_edges,
+    read_scored,
+    score_parquet,
+    to_table,
+    write_edges,
+)
+from tests.benchmarks.synthetic import synthetic_edges
+
+
+@pytest.fixture(scope="module")
+def edges():
+    """Synthetic edges with reverse copies of half the streets."""
+    edges = synthetic_edges(2000)
+    edges = edges[~edges.index.duplicated()]
+    half = edges.iloc[::2]
+    reverse = half.copy()
+    reverse.index = half.index.reorder_levels(["v", "u", "key"])
+    reverse.index.names = ["u", "v", "key"]
+    reverse["reversed"] = True
+    reverse = reverse.set_geometry(shapely.reverse(half.geometry.values))
+    edges = pd.concat([edges, reverse])
+    edges = edges[~edges.index.duplicated()]
+
+    # merged ways have lists of osmids
+    osmid = np.array(edges["osmid"], dtype=object)
+    osmid[::7] = [[1, 2]] * len(osmid[::7])
+    return edges.assign(osmid=osmid)
+
+
+def assert_same_edges(expected, result):
+    expected, result = expected.sort_index(), result.sort_index()
+    assert list(result.columns) == list(expected.columns)
+    assert result.index.equals(expected.index)
+    assert result.crs == expected.crs
+    for col in expected.columns:
+        assert result[col].dtype == expected[col].dtype, col
+        if col == "geometry":
+            assert result.geometry.geom_equals_exact(expected.geometry, 0).all()
+        else:
+            values = result[col].astype(object)
+            assert values.equals(expected[col].astype(object)), col
+
+
+class TestChunkBounds:
+    """Tests for chunk_bounds function."""
+
+    def test_cover_all_rows(self):
+        bounds = chunk_bounds(np.arange(10), 3)
+        assert bounds == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+    def test_never_split_pairs(self):
+        pairs = np.array([0, 0, 1, 1, 2, 3, 3, 4])
+        bounds = chunk_bounds(pairs, 3)
+        assert bounds[0][0] == 0 and bounds[-1][1] == len(pairs)
+        for start, _ in bounds[1:]:
+            assert pairs[start] != pairs[start - 1]
+
+    def test_empty(self):
+        assert chunk_bounds(np.array([], dtype=int), 3) == []
+
+
+class TestWriteEdges:
+    """Tests for write_edges function."""
+
+    def test_round_trip(self, edges, tmp_path):
+        path = str(tmp_path / "edges.parquet")
+        chunks = write_edges(edges, path, chunk_rows=300)
+
+        source = pq.ParquetFile(path)
+        assert source.num_row_groups == chunks > 1
+        result = read_edges(source.read())
+        assert result.index.names == edges.index.names
+        assert result.crs == edges.crs
+        assert len(result) == len(edges)
+
+        result = result.loc[edges.index]
+        assert result.geometry.geom_equals_exact(edges.geometry, 0).all()
+        assert result["length"].equals(edges["length"])
+
+        # mixed values and lists are stored as lists, first item unchanged
+        highway = edges["highway"].map(lambda v: v if isinstance(v, str) else v[0])
+        assert result["highway"].map(lambda v: v[0]).equals(highway)
+
+    def test_pairs_share_row_groups(self, edges, tmp_path):
+        path = str(tmp_path / "edges.parquet")
+        write_edges(edges, path, chunk_rows=300)
+
+        source = pq.ParquetFile(path)
+        groups = [
+            read_edges(source.read_row_group(i)).index.to_frame().assign(group=i)
+            for i in range(source.num_row_groups)
+        ]
+        index = pd.concat(groups)
+        first = np.minimum(index["u"], index["v"])
+        second = np.maximum(index["u"], index["v"])
+        assert index.groupby([first, second])["group"].nunique().max() == 1
+
+    def test_table_keeps_tags(self, edges):
+        result = read_edges(to_table(edges.head(50)))
+        assert list(result["osmid"].iloc[0]) == [1, 2]
+        assert list(result.columns) == list(edges.columns)
+
+
+class TestScoreParquet:
+    """Tests for score_parquet function."""
+
+    @pytest.mark.parametrize("collapse_two_way", [False, True])
+    def test_matches_in_memory(self, edges, tmp_path, collapse_two_way):
+        def score(chunk):
+            return score_edges(chunk, "test", collapse_two_way=collapse_two_way)
+
+        write_edges(edges, str(tmp_path / "edges.parquet"), chunk_rows=300)
+        rows = score_parquet(
+            str(tmp_path / "edges.parquet"), str(tmp_path / "scored.parquet"), score
+        )
+
+        expected = score(edges)
+        result = read_scored(str(tmp_path / "scored.parquet"))
+        assert rows == len(expected)
+        assert_same_edges(expected, result)
+
+    def test_failed_run_keeps_output(self, edges, tmp_path):
+        write_edges(edges, str(tmp_path / "edges.parquet"), chunk_rows=300)
+        out = tmp_path / "scored.parquet"
+        out.write_bytes(b"previous")
+
+        def fail(chunk):
+            raise RuntimeError("model failed")
+
+        with pytest.raises(RuntimeError):
+            score_parquet(str(tmp_path / "edges.parquet"), str(out), fail)
+        assert out.read_bytes() == b"previous"
@@ -0,0 +1,27 @@
+import pandas as pd
+
+import src.stressmodel.classification
+from src.stressmodel.classification import run
+from src.tags import to_arrow_tags
+
+
+class TestRun:
+    """Tests for run function."""
+
+    def test_best_of_list(self):
+        edges = pd.DataFrame({"highway": ["residential", ["primary", "cycleway"]]})
+        classifications, scores = run(edges)
+        assert classifications.tolist() == ["residential", "dedicated_path"]
+        assert scores.tolist() == [2, 0]
+
+    def test_fractional_scores(self, monkeypatch):
+        scores = {"residential": 2.5, "medium-capacity": 2.2}
+        monkeypatch.setattr(
+            src.stressmodel.classification,
+            "CLASSIFICATION_SCORES",
+            {**src.stressmodel.classification.CLASSIFICATION_SCORES, **scores},
+        )
+        edges = pd.DataFrame({"highway": ["residential", ["residential", "primary"]]})
+        classifications, scores = run(to_arrow_tags(edges, ["highway"]))
+        assert classifications.tolist() == ["residential", "medium-capacity"]
+        assert scores.tolist() == [2.5, 2.2]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from src.stressmodel.composite import (
+    PROFILES,
+    profile_column,
+    run,
+    weighted_scores,
+)
+
+
+class TestWeightedScores:
+    """Tests for weighted_scores function."""
+
+    def test_all_present(self):
+        scores = np.array([[4.0, 2.0]])
+        weights = np.array([[0.5, 1.0], [0.5, 0.0]])
+        np.testing.assert_allclose(weighted_scores(scores, weights), [[3.0, 4.0]])
+
+    def test_missing_renormalized(self):
+        scores = np.array([[4.0, np.nan]])
+        weights = np.array([[0.6], [0.4]])
+        np.testing.assert_allclose(weighted_scores(scores, weights), [[4.0]])
+
+    def test_all_missing(self):
+        scores = np.array([[np.nan, np.nan]])
+        weights = np.array([[0.6], [0.4]])
+        assert np.isnan(weighted_scores(scores, weights)[0, 0])
+
+
+class TestRun:
+    """Tests for run function."""
+
+    def test_default_profile_matches_original_weights(self):
+        df = pd.DataFrame(
+            {
+                "separation_level_score": [4.0, 1.0],
+                "maxspeed_int_score": [np.nan, 2.5],
+                "street_classification_score": [2.0, 3.0],
+                "lanes_int_score": [4.0, 0.0],
+            }
+        )
+        result = run(df)
+
+        assert list(result.columns) == [profile_column(p) for p in PROFILES]
+        expected = [
+            (0.6 * 4.0 + 0.2 * 2.0) / 0.8,
+            0.6 * 1.0 + 0.2 * 2.5 + 0.2 * 3.0,
+        ]
+        np.testing.assert_allclose(result["composite_score_default"], expected)
@@ -0,0 +1,99 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString
+
+from src.consolidate import consolidate_intersections, node_pairs
+
+# meters -> degrees near Somerville
+LON_M = 1 / 82000
+LAT_M = 1 / 111000
+
+
+def make_network(nodes_m: dict, edges: list, street_count=None):
+    """Nodes/edges GeoDataFrames like ox.graph_to_gdfs, node positions in meters."""
+    ids = list(nodes_m)
+    x = [-71.1 + nodes_m[n][0] * LON_M for n in ids]
+    y = [42.38 + nodes_m[n][1] * LAT_M for n in ids]
+    nodes = gpd.GeoDataFrame(
+        {"x": x, "y": y, "street_count": street_count or [3] * len(ids)},
+        index=pd.Index(ids, name="osmid"),
+        geometry=gpd.points_from_xy(x, y),
+        crs="EPSG:4326",
+    )
+    xy = dict(zip(ids, zip(x, y)))
+    edges = gpd.GeoDataFrame(
+        {"osmid": range(len(edges)), "length": 100.0},
+        index=pd.MultiIndex.from_tuples(
+            [(u, v, 0) for u, v in edges], names=["u", "v", "key"]
+        ),
+        geometry=[LineString([xy[u], xy[v]]) for u, v in edges],
+        crs="EPSG:4326",
+    )
+    return nodes, edges
+
+
+class TestConsolidateIntersections:
+    """Tests for consolidate_intersections function."""
+
+    def test_merges_connected_nodes(self):
+        # 1 and 2 are 6 m apart and connected: one intersection
+        nodes, edges = make_network(
+            {1: (0, 0), 2: (6, 0), 3: (0, 100), 4: (106, 0)},
+            [(1, 2), (1, 3), (2, 4)],
+        )
+        new_nodes, new_edges = consolidate_intersections(nodes, edges, tolerance=10)
+
+        assert len(new_nodes) == 3
+        assert sorted(map(str, new_nodes["osmid_original"])) == ["3", "4", "[1, 2]"]
+        # the edge inside the cluster is dropped, the others reconnected
+        assert sorted(zip(new_edges["u_original"], new_edges["v_original"])) == [
+            (1, 3),
+            (2, 4),
+        ]
+        # extended by 3 m to the merged node
+        assert np.allclose(new_edges["length"], 103, atol=0.1)
+        assert (new_edges.geometry.apply(lambda g: len(g.coords)) == 3).all()
+
+    def test_keeps_unconnected_nodes_apart(self):
+        # 1 and 2 are close but not connected to each other (e.g. a bridge)
+        nodes, edges = make_network(
+            {1: (0, 0), 2: (6, 0), 3: (0, 100), 4: (106, 0)}, [(1, 3), (2, 4)]
+        )
+        new_nodes, new_edges = consolidate_intersections(nodes, edges, tolerance=10)
+
+        assert len(new_nodes) == 4
+        assert len(new_edges) == 2
+
+    def test_drops_dead_ends(self):
+        nodes, edges = make_network(
+            {1: (0, 0), 2: (100, 0), 3: (0, 100)},
+            [(1, 2), (1, 3)],
+            street_count=[3, 3, 1],
+        )
+        new_nodes, new_edges = consolidate_intersections(nodes, edges, tolerance=10)
+
+        assert sorted(new_nodes["osmid_original"]) == [1, 2]
+        assert len(new_edges) == 1
+
+
+class TestNodePairs:
+    """Tests for node_pairs function."""
+
+    def test_tiles_find_pairs_across_seams(self):
+        rng = np.random.default_rng(0)
+        xy = rng.uniform(0, 1000, (2000, 2))
+
+        expected = {tuple(sorted(p)) for p in node_pairs(xy, 20)}
+        tiled = {tuple(sorted(p)) for p in node_pairs(xy, 20, tile_size=100)}
+        assert tiled == expected
+
+    def test_tiles_find_each_pair_once(self):
+        rng = np.random.default_rng(1)
+        xy = rng.uniform(0, 1000, (3000, 2))
+
+        expected = node_pairs(xy, 20)
+        for tile_size in [100, 15]:  # tiles smaller than the radius too
+            tiled = node_pairs(xy, 20, tile_size=tile_size)
+            assert len(tiled) == len(expected)
+            assert np.array_equal(np.unique(tiled, axis=0), np.unique(expected, axis=0))
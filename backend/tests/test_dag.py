@@ -0,0 +1,121 @@
+import pandas as pd
+import pytest
+
+from src.dag import Stage, critical_path, dependencies, run_dag
+from src.instrument import collect
+
+
+def double(df):
+    return df["a"] * 2
+
+
+def add(df):
+    return df["a"] + df["b2"], df["a"] - df["b2"]
+
+
+def columns(df):
+    return pd.Series(",".join(df.columns), index=df.index)
+
+
+STAGES = [
+    Stage("double", double, inputs=("a",), outputs=("b2",)),
+    Stage("add", add, inputs=("a", "b2"), outputs=("sum", "diff"), gil=False),
+    Stage("columns", columns, inputs=("a", "missing"), outputs=("seen",)),
+]
+
+
+class TestDependencies:
+    """Tests for dependencies function."""
+
+    def test_from_producers(self):
+        assert dependencies(STAGES) == {
+            "double": set(),
+            "add": {"double"},
+            "columns": set(),
+        }
+
+    def test_duplicate_output(self):
+        with pytest.raises(ValueError):
+            dependencies([*STAGES, Stage("again", double, ("a",), ("b2",))])
+
+    def test_cycle(self):
+        cycle = [
+            Stage("one", double, inputs=("b2",), outputs=("c",)),
+            Stage("two", double, inputs=("c",), outputs=("b2",)),
+        ]
+        with pytest.raises(ValueError, match="cycle"):
+            dependencies([*STAGES[2:], *cycle])
+
+
+class TestCriticalPath:
+    """Tests for critical_path function."""
+
+    def test_longest_chain(self):
+        deps = {"a": set(), "b": {"a"}, "c": set(), "d": {"b", "c"}}
+        durations = {"a": 1.0, "b": 1.0, "c": 3.0, "d": 0.5}
+        assert critical_path(deps, durations) == (["c", "d"], 3.5)
+
+    def test_cycle(self):
+        with pytest.raises(ValueError):
+            critical_path({"a": {"b"}, "b": {"a"}}, {})
+
+
+class TestRunDag:
+    """Tests for run_dag function."""
+
+    @pytest.mark.parametrize("executor", ["thread", "process", "serial"])
+    def test_outputs(self, executor):
+        frame = pd.DataFrame({"a": [1, 2, 3], "other": ["x", "y", "z"]})
+        with collect() as records:
+            result, report = run_dag(STAGES, frame, executor=executor)
+
+        assert result["b2"].tolist() == [2, 4, 6]
+        assert result["sum"].tolist() == [3, 6, 9]
+        assert result["diff"].tolist() == [-1, -2, -3]
+        # only the declared (and present) input columns reach a stage
+        assert result["seen"].tolist() == ["a"] * 3
+        assert "b2" not in frame
+
+        assert sorted(r.name for r in records) == ["add", "columns", "double"]
+        assert set(report.stage_s) == {"double", "add", "columns"}
+        assert report.critical_path[-1] in {"add", "columns"}
+
+    def test_cache(self, tmp_path, monkeypatch):
+        import src.dag
+
+        calls = []
+
+        def store(stage, key, result):
+            calls.append(("store", stage, key))
+            (tmp_path / f"{stage}-{key}").write_text(",".join(map(str, result)))
+
+        def load(stage, key):
+            path = tmp_path / f"{stage}-{key}"
+            if not path.exists():
+                return None
+            return pd.Series([int(v) for v in path.read_text().split(",")])
+
+        monkeypatch.setattr(src.dag, "store_stage", store)
+        monkeypatch.setattr(src.dag, "load_stage", load)
+
+        stages = [Stage("double", double, ("a",), ("b2",), cache_key="k")]
+        frame = pd.DataFrame({"a": [1, 2]})
+        run_dag(stages, frame, executor="serial")
+        result, _ = run_dag(stages, frame.assign(a=[5, 5]), executor="serial")
+
+        assert calls == [("store", "double", "k")]
+        assert result["b2"].tolist() == [2, 4]
+
+    @pytest.mark.parametrize("executor", ["thread", "serial"])
+    def test_cycle(self, executor):
+        cycle = [
+            Stage("one", double, inputs=("a", "b2"), outputs=("c",)),
+            Stage("two", double, inputs=("a", "c"), outputs=("b2",)),
+        ]
+        frame = pd.DataFrame({"a": [1, 2, 3]})
+        with pytest.raises(ValueError):
+            run_dag(cycle, frame, executor=executor)
+
+    def test_unknown_executor(self):
+        with pytest.raises(ValueError):
+            run_dag(STAGES, pd.DataFrame({"a": [1]}), executor="gpu")
@@ -0,0 +1,113 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from src.equity import aggregate, area_geometries, pairs_from_od, write_equity
+from src.odmatrix import ODMatrix
+
+# blocks 1 and 2 are in block group ...0011, block 3 in ...0012 (same tract)
+BLOCKS = ["250173501001001", "250173501001002", "250173501002001"]
+
+
+@pytest.fixture
+def pairs():
+    return pd.DataFrame(
+        {
+            "block": BLOCKS * 2,
+            "school": ["a"] * 3 + ["b"] * 3,
+            "sum_length": [100.0, 300.0, 200.0, 400.0, 100.0, 50.0],
+            "weighted_mean_score": [1.0, 3.0, 2.0, 2.0, 1.0, np.nan],
+            "max_score": [1.5, 4.0, 2.0, 3.0, 1.0, np.nan],
+            "detour_ratio": [1.0, 1.2, 1.1, 1.4, 1.0, np.nan],
+        }
+    )
+
+
+@pytest.fixture
+def blocks():
+    return gpd.GeoDataFrame(
+        {"GEOID20": BLOCKS},
+        geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 2, 2)],
+        crs="EPSG:26986",
+    )
+
+
+class TestAggregate:
+    """Tests for aggregate function."""
+
+    def test_block_groups_by_school(self, pairs):
+        by_school, _ = aggregate(pairs, "block_group", low_stress=2)
+        row = by_school.set_index(["area", "school"]).loc[("250173501001", "a")]
+
+        assert row["length_weighted_score"] == pytest.approx((100 + 900) / 400)
+        assert row["low_stress_share"] == 0.5
+        assert row["median_detour"] == pytest.approx(1.1)
+        assert row["n_blocks"] == 2
+
+    def test_overall(self, pairs):
+        _, overall = aggregate(pairs, "block_group", low_stress=2)
+        overall = overall.set_index("area")
+
+        # block 2 has a low-stress route to school b
+        assert overall.loc["250173501001", "low_stress_share"] == 1.0
+        # unscored route does not count towards the weighted score
+        assert overall.loc["250173501002", "length_weighted_score"] == 2.0
+        assert overall.loc["250173501002", "n_routes"] == 2
+
+    def test_zero_length_route(self, pairs):
+        # block 3 sits on school b's node: no edges, so no scores
+        pairs.loc[5, "sum_length"] = 0.0
+        by_school, _ = aggregate(pairs, "block_group", low_stress=2)
+        row = by_school.set_index(["area", "school"]).loc[("250173501002", "b")]
+
+        assert row["low_stress_share"] == 1.0
+        assert np.isnan(row["length_weighted_score"])
+
+    def test_tracts(self, pairs):
+        _, overall = aggregate(pairs, "tract")
+        assert overall["area"].tolist() == ["25017350100"]
+        assert overall["n_blocks"].tolist() == [3]
+
+    def test_unknown_level(self, pairs):
+        with pytest.raises(ValueError):
+            aggregate(pairs, "county")
+
+
+class TestPairsFromOd:
+    """Tests for pairs_from_od function."""
+
+    def test_drops_unreachable(self):
+        sum_length = np.array([[100, 400], [300, np.nan]], dtype=np.float32)
+        od = ODMatrix(
+            blocks=pd.Index(BLOCKS[:2]),
+            schools=pd.Index(["a", "b"]),
+            weight="composite_score",
+            metrics={
+                name: sum_length
+                for name in ["sum_length", "weighted_mean_score", "max_score", "detour_ratio"]
+            },
+        )
+        pairs = pairs_from_od(od)
+        assert pairs[["block", "school"]].values.tolist() == [
+            [BLOCKS[0], "a"],
+            [BLOCKS[1], "a"],
+            [BLOCKS[0], "b"],
+        ]
+        assert pairs["sum_length"].tolist() == [100, 300, 400]
+
+
+class TestWriteEquity:
+    """Tests for write_equity function."""
+
+    def test_geoparquet(self, pairs, blocks, tmp_path):
+        paths = write_equity(pairs, blocks, str(tmp_path))
+        assert len(paths) == 4
+
+        block_groups = gpd.read_parquet(tmp_path / "block_group.parquet")
+        assert block_groups.crs == blocks.crs
+        assert block_groups.set_index("area").loc["250173501001"].geometry.area == 2
+
+    def test_area_geometries(self, blocks):
+        assert len(area_geometries(blocks, "tract")) == 1
@@ -0,0 +1,75 @@
+import gzip
+import os
+
+from src.http_cache import (
+    choose_encoding,
+    content_digest,
+    etag,
+    etag_matches,
+    write_variants,
+)
+
+
+class TestChooseEncoding:
+    """Tests for choose_encoding function."""
+
+    def test_preference(self):
+        available = {"br": "", "gzip": "", "identity": ""}
+        assert choose_encoding("gzip, deflate, br", available) == "br"
+        assert choose_encoding("gzip, br;q=0", available) == "gzip"
+        assert choose_encoding("gzip", {"gzip": "", "identity": ""}) == "gzip"
+        assert choose_encoding("*", {"gzip": "", "identity": ""}) == "gzip"
+
+    def test_identity(self):
+        available = {"gzip": "", "identity": ""}
+        assert choose_encoding(None, available) == "identity"
+        assert choose_encoding("deflate", available) == "identity"
+        assert choose_encoding("gzip;q=0", available) == "identity"
+
+
+class TestEtagMatches:
+    """Tests for etag_matches function."""
+
+    def test_any_encoding_of_version(self):
+        assert etag_matches(etag("abc", "default"), "abc", "default")
+        assert etag_matches('W/"abc-default-gzip"', "abc", "default")
+        assert etag_matches('"old-default", "abc-default-br"', "abc", "default")
+        assert etag_matches("*", "abc", "default")
+
+    def test_other_version_or_profile(self):
+        assert not etag_matches(None, "abc", "default")
+        assert not etag_matches('"old-default"', "abc", "default")
+        assert not etag_matches('"abc-child"', "abc", "default")
+
+
+class TestWriteVariants:
+    """Tests for write_variants function."""
+
+    def test_written_once(self, tmp_path):
+        artifact = tmp_path / "city-1234.arrow"
+        artifact.write_bytes(b"v1")
+        calls = []
+
+        def serialize():
+            calls.append(1)
+            return '{"type": "FeatureCollection"}'
+
+        version = content_digest(str(artifact))[:16]
+        paths = write_variants(str(artifact), version, "default", serialize)
+        assert write_variants(str(artifact), version, "default", serialize) == paths
+        assert len(calls) == 1
+
+        with open(paths["gzip"], "rb") as f:
+            assert gzip.decompress(f.read()) == b'{"type": "FeatureCollection"}'
+
+    def test_new_version_replaces_old(self, tmp_path):
+        artifact = tmp_path / "city-1234.arrow"
+        artifact.write_bytes(b"v1")
+        old = write_variants(str(artifact), content_digest(str(artifact)), "default", lambda: "1")
+
+        artifact.write_bytes(b"v2 (updated)")
+        new = write_variants(str(artifact), content_digest(str(artifact)), "default", lambda: "2")
+
+        assert old != new
+        assert not any(os.path.exists(p) for p in old.values())
+        assert all(os.path.exists(p) for p in new.values())
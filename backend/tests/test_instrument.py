@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.instrument import StageRecord, add_sink, collect, remove_sink, stage
+
+
+class TestStage:
+    """Tests for stage context manager."""
+
+    def test_records_timing_and_rows(self):
+        with collect() as records:
+            with stage("speed", place="Somerville", rows=3) as record:
+                record.rows = 5
+
+        assert len(records) == 1
+        assert isinstance(records[0], StageRecord)
+        assert records[0].name == "speed"
+        assert records[0].place == "Somerville"
+        assert records[0].rows == 5
+        assert records[0].wall_s >= 0
+        assert records[0].cpu_s >= 0
+
+    def test_collect_does_not_publish(self):
+        published = []
+        add_sink(published.append)
+        try:
+            with collect():
+                with stage("lanes"):
+                    pass
+            assert published == []
+
+            with stage("lanes"):
+                pass
+            assert [r.name for r in published] == ["lanes"]
+        finally:
+            remove_sink(published.append)
+
+        with stage("lanes"):
+            pass
+        assert len(published) == 1
+
+    @pytest.mark.skipif(
+        not os.path.exists("/proc/self/statm"), reason="needs /proc"
+    )
+    def test_rss_delta(self):
+        with collect() as records:
+            with stage("allocate"):
+                data = np.ones(64 * 1024 * 1024 // 8)
+            with stage("free"):
+                del data
+
+        allocate, free = records
+        assert allocate.rss_delta_bytes > 32 * 1024 * 1024
+        assert free.rss_delta_bytes < -32 * 1024 * 1024
+        assert free.peak_rss_growth_bytes == 0
@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from main import OUTPUT_COLUMNS, score_edges
+from src import artifacts
+from src.jobs import DeadlineExceededError, NetworkBuilder, QueueFullError
+from tests.benchmarks.synthetic import synthetic_edges
+
+
+@pytest.fixture(scope="module")
+def network():
+    edges = score_edges(synthetic_edges(50), "Test City", collapse_two_way=True)
+    return edges[OUTPUT_COLUMNS]
+
+
+class StubBuild:
+    """build_fn counting its calls, blocked until release() (or failing)."""
+
+    def __init__(self, network, error: Exception | None = None):
+        self.network = network
+        self.error = error
+        self.calls = []
+        self.gate = threading.Event()
+
+    def __call__(self, place: str):
+        self.calls.append(place)
+        self.gate.wait(10)
+        if self.error is not None:
+            raise self.error
+        return self.network
+
+    def release(self):
+        self.gate.set()
+
+
+@pytest.fixture
+def make_builder(tmp_path):
+    builders = []
+
+    def make(build_fn, **kwargs):
+        builder = NetworkBuilder(
+            build_fn, executor="thread", artifact_dir=str(tmp_path), **kwargs
+        )
+        builders.append(builder)
+        return builder
+
+    yield make
+    for builder in builders:
+        builder.shutdown()
+
+
+def wait_finished(builder: NetworkBuilder, job_id: str, timeout: float = 10):
+    """Poll a job until it is no longer pending or running."""
+    end = time.time() + timeout
+    while builder.job(job_id).status in ("pending", "running"):
+        assert time.time() < end, "job did not finish"
+        time.sleep(0.01)
+    return builder.job(job_id)
+
+
+class TestGetOrBuild:
+    """Tests for NetworkBuilder.get_or_build method."""
+
+    def test_single_flight(self, make_builder, network):
+        build = StubBuild(network)
+        builder = make_builder(build)
+
+        async def requests():
+            waiting = [builder.get_or_build("Test City") for _ in range(5)]
+            tasks = [asyncio.ensure_future(w) for w in waiting]
+            await asyncio.sleep(0.05)
+            build.release()
+            return await asyncio.gather(*tasks)
+
+        results = asyncio.run(requests())
+
+        assert build.calls == ["Test City"]
+        assert all(edges is results[0] for edges in results)
+        assert len(results[0]) == len(network)
+        assert artifacts.has_artifact("Test City", builder.artifact_dir)
+
+    def test_cached(self, make_builder, network, tmp_path):
+        artifacts.save_artifact("Test City", network, str(tmp_path))
+        build = StubBuild(network)
+        builder = make_builder(build)
+
+        edges = asyncio.run(builder.get_or_build("Test City"))
+        assert len(edges) == len(network)
+        assert build.calls == []
+
+    def test_artifact_saved_meanwhile(self, make_builder, network, tmp_path):
+        build = StubBuild(network)
+        builder = make_builder(build)
+        get = builder.get
+        calls = []
+
+        def racing_get(place):
+            try:
+                asyncio.get_running_loop()
+                calls.append("event loop")
+            except RuntimeError:
+                calls.append("thread")
+            if len(calls) == 1:
+                # another worker saves the artifact right after this miss
+                artifacts.save_artifact(place, network, str(tmp_path))
+                return None
+            return get(place)
+
+        builder.get = racing_get
+        edges = asyncio.run(builder.get_or_build("Test City"))
+
+        assert len(edges) == len(network)
+        assert build.calls == []
+        assert calls == ["thread", "thread"]
+
+    def test_failed_build(self, make_builder, network):
+        build = StubBuild(network, error=RuntimeError("Overpass is down"))
+        build.release()
+        builder = make_builder(build)
+
+        with pytest.raises(RuntimeError, match="Overpass is down"):
+            asyncio.run(builder.get_or_build("Test City"))
+        assert builder.get("Test City") is None
+
+
+class TestLimits:
+    """Tests for the NetworkBuilder queue limit and request deadlines."""
+
+    def test_queue_full(self, make_builder, network):
+        build = StubBuild(network)
+        builder = make_builder(build, max_pending=1)
+
+        builder.submit("Test City")
+        with pytest.raises(QueueFullError):
+            builder.submit("Other City")
+        with pytest.raises(QueueFullError):
+            asyncio.run(builder.get_or_build("Other City"))
+
+        # the place already in flight is still shared
+        assert builder.submit("Test City").place == "Test City"
+        build.release()
+
+    def test_deadline_keeps_running_build(self, make_builder, network):
+        build = StubBuild(network)
+        builder = make_builder(build)
+
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(builder.get_or_build("Test City", deadline=time.time() + 0.1))
+
+        # already started: it finishes for the next request
+        job = builder._flights["test_city"].job
+        build.release()
+        assert wait_finished(builder, job.id).status == "done"
+        assert builder.get("Test City") is not None
+
+    def test_deadline_cancels_queued_build(self, make_builder, network):
+        build = StubBuild(network)
+        builder = make_builder(build, max_workers=1)
+        first = builder.submit("Test City")  # occupies the only worker
+
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(builder.get_or_build("Other City", deadline=time.time() + 0.1))
+
+        cancelled = [job for job in builder.jobs.values() if job.place == "Other City"]
+        assert [job.status for job in cancelled] == ["cancelled"]
+        assert "other_city" not in builder._flights
+
+        build.release()
+        assert wait_finished(builder, first.id).status == "done"
+        assert build.calls == ["Test City"]
+
+
+class TestJobs:
+    """Tests for NetworkBuilder.submit and NetworkBuilder.job methods."""
+
+    def test_status_transitions(self, make_builder, network):
+        build = StubBuild(network)
+        builder = make_builder(build, max_workers=1)
+
+        first = builder.submit("Test City")
+        second = builder.submit("Other City")
+        assert builder.submit("Test City") is first
+
+        end = time.time() + 10
+        while builder.job(first.id).status != "running":
+            assert time.time() < end
+            time.sleep(0.01)
+        assert builder.job(second.id).status == "pending"
+
+        build.release()
+        assert wait_finished(builder, first.id).status == "done"
+        assert wait_finished(builder, second.id).status == "done"
+        assert first.finished is not None and first.error is None
+
+        # once built, a new job is done at once
+        assert builder.submit("Test City").status == "done"
+        assert build.calls == ["Test City", "Other City"]
+
+    def test_failed(self, make_builder, network):
+        build = StubBuild(network, error=RuntimeError("Overpass is down"))
+        build.release()
+        builder = make_builder(build)
+
+        job = wait_finished(builder, builder.submit("Test City").id)
+        assert job.status == "failed"
+        assert job.error == "Overpass is down"
+
+        # a failed build can be retried
+        assert builder.submit("Test City").id != job.id
+
+    def test_unknown(self, make_builder, network):
+        assert make_builder(StubBuild(network)).job("nope") is None
+
+
+class TestWarm:
+    """Tests for NetworkBuilder.warm method."""
+
+    def test_loads_and_builds(self, make_builder, network, tmp_path):
+        artifacts.save_artifact("Test City", network, str(tmp_path))
+        build = StubBuild(network)
+        build.release()
+        builder = make_builder(build)
+
+        cached, built = builder.warm(["Test City", "Other City"])
+        assert cached.status == "done"
+        assert "test_city" in builder.networks
+        assert wait_finished(builder, built.id).status == "done"
+        assert build.calls == ["Other City"]
@@ -0,0 +1,95 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from src.odmatrix import METRICS, ODMatrix, compute_od_matrix
+from src.route import get_route_gdf
+from tests.benchmarks.synthetic import grid_graph, grid_points
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return grid_graph(8)
+
+
+@pytest.fixture(scope="module")
+def blocks(graph):
+    return grid_points(graph, 12)
+
+
+@pytest.fixture(scope="module")
+def schools(graph):
+    return gpd.GeoDataFrame(
+        {"Name": ["North", "South"], "GlobalID": ["n", "s"]},
+        geometry=shapely.points([(325050, 4695650), (325650, 4695020)]),
+        crs=graph.graph["crs"],
+    )
+
+
+class TestComputeOdMatrix:
+    """Tests for compute_od_matrix function."""
+
+    def test_matches_get_route_gdf(self, graph, blocks, schools):
+        od = compute_od_matrix(graph, blocks, schools)
+
+        for i, block in blocks.iterrows():
+            for j, school in schools.iterrows():
+                route = get_route_gdf(graph, block.geometry, school.geometry).iloc[0]
+                if route["sum_length"] == 0:
+                    continue  # block and school snap to the same node
+                for metric in METRICS[:4]:
+                    assert od.metrics[metric][i, j] == pytest.approx(
+                        route[metric], rel=1e-5
+                    )
+
+    def test_detour_ratio(self, graph, blocks, schools):
+        od = compute_od_matrix(graph, blocks, schools)
+        ratio = od.metrics["detour_ratio"]
+        assert np.nanmin(ratio) >= 1 - 1e-6
+
+        by_length = compute_od_matrix(graph, blocks, schools, weight="length")
+        routed = ~np.isnan(by_length.metrics["detour_ratio"])
+        assert np.allclose(by_length.metrics["detour_ratio"][routed], 1)
+
+    def test_routes_follow_edges(self, graph, blocks, schools):
+        od = compute_od_matrix(graph, blocks, schools, keep_routes=True)
+        block, school = blocks["GEOID20"].iloc[0], "n"
+
+        edges = od.route(block, school)
+        assert all(graph.has_edge(u, v, k) for u, v, k in edges)
+        assert all(a[1] == b[0] for a, b in zip(edges[:-1], edges[1:]))
+        length = sum(graph.edges[u, v, k]["length"] for u, v, k in edges)
+        assert length == pytest.approx(od.metric("sum_length").loc[block, school], rel=1e-5)
+
+    def test_unknown_weight(self, graph, blocks, schools):
+        with pytest.raises(ValueError):
+            compute_od_matrix(graph, blocks, schools, weight="speed")
+
+
+class TestODMatrix:
+    """Tests for the ODMatrix class."""
+
+    def test_save_load(self, graph, blocks, schools, tmp_path):
+        od = compute_od_matrix(graph, blocks, schools, keep_routes=True)
+        loaded = ODMatrix.load(od.save(str(tmp_path / "od")))
+
+        assert loaded.weight == "composite_score"
+        assert list(loaded.blocks) == list(od.blocks)
+        assert isinstance(loaded.metrics["sum_length"], np.memmap)
+        assert np.array_equal(
+            loaded.metrics["max_score"], od.metrics["max_score"], equal_nan=True
+        )
+        block = od.blocks[3]
+        assert np.array_equal(loaded.route(block, "s"), od.route(block, "s"))
+
+    def test_blocks_within(self, graph, blocks, schools):
+        od = compute_od_matrix(graph, blocks, schools)
+        length = od.metric("sum_length")["n"]
+        score = od.metric("max_score")["n"]
+
+        near = od.blocks_within("n", max_length=length.median())
+        assert set(near) == set(length.index[length <= length.median()])
+
+        calm = od.blocks_within("n", max_length=np.inf, max_score=5)
+        assert set(calm) == set(score.index[score <= 5])
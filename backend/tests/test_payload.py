@@ -0,0 +1,87 @@
+import json
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString
+
+from src.payload import serialize, shrink_geometry, simplify, to_topojson
+
+
+@pytest.fixture
+def edges():
+    # a gently curving street (~1 m off a straight line) and its reverse
+    x = np.linspace(-71.1, -71.09, 50)
+    y = 42.39 + 1e-5 * np.sin(np.linspace(0, np.pi, 50))
+    curve = LineString(np.column_stack([x, y]))
+    return gpd.GeoDataFrame(
+        {"name": ["A St", "A St", "B St"], "composite_score": [1.5, 1.5, np.nan]},
+        geometry=[
+            curve,
+            curve.reverse(),
+            LineString([(-71.1, 42.39), (-71.1, 42.4)]),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+class TestSimplify:
+    """Tests for simplify function."""
+
+    def test_tolerance_in_meters(self, edges):
+        coarse = simplify(edges.geometry, 5)
+        fine = simplify(edges.geometry, 0.1)
+        assert shapely.get_num_coordinates(coarse.array).tolist() == [2, 2, 2]
+        assert shapely.get_num_coordinates(fine.array)[0] > 2
+
+    def test_keeps_end_points(self, edges):
+        simplified = simplify(edges.geometry, 5)
+        for before, after in zip(edges.geometry, simplified):
+            assert np.allclose(before.coords[0], after.coords[0])
+            assert np.allclose(before.coords[-1], after.coords[-1])
+
+
+class TestShrinkGeometry:
+    """Tests for shrink_geometry function."""
+
+    def test_rounds_coordinates(self, edges):
+        shrunk = shrink_geometry(edges, tolerance=0, precision=3)
+        coords = shapely.get_coordinates(shrunk.geometry.array)
+        assert np.array_equal(coords, np.round(coords, 3))
+        # input untouched
+        assert len(edges.geometry.iloc[0].coords) == 50
+
+
+class TestToTopojson:
+    """Tests for to_topojson function."""
+
+    def test_shared_arcs(self, edges):
+        topology = json.loads(to_topojson(edges, precision=6))
+        geometries = topology["objects"]["streets"]["geometries"]
+
+        assert len(topology["arcs"]) == 2
+        assert geometries[0]["arcs"] == [0]
+        assert geometries[1]["arcs"] == [~0]
+        assert geometries[2]["properties"] == {"name": "B St", "composite_score": None}
+
+    def test_decodes_to_input(self, edges):
+        topology = json.loads(to_topojson(edges, precision=6))
+        scale = topology["transform"]["scale"]
+        translate = topology["transform"]["translate"]
+
+        arc = np.cumsum(topology["arcs"][1], axis=0) * scale + translate
+        assert np.allclose(arc, edges.geometry.iloc[2].coords, atol=1e-6)
+
+
+class TestSerialize:
+    """Tests for serialize function."""
+
+    def test_smaller_than_full_precision(self, edges):
+        full = edges.to_json()
+        assert len(serialize(edges, "geojson")) < len(full)
+        assert len(serialize(edges, "topojson")) < len(full)
+
+    def test_unknown_format(self, edges):
+        with pytest.raises(ValueError):
+            serialize(edges, "kml")
@@ -0,0 +1,53 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import LineString
+
+from src.query import EdgeIndex, edge_mask, select_columns
+
+
+@pytest.fixture
+def edges():
+    return gpd.GeoDataFrame(
+        {
+            "name": ["A St", "B St", "C St"],
+            "separation_level": ["lane", "none", "track"],
+            "composite_score": [2.0, np.nan, 0.5],
+        },
+        geometry=[
+            LineString([(0, 0), (1, 1)]),
+            LineString([(5, 5), (6, 6)]),
+            LineString([(0.5, 0), (0.5, 2)]),
+        ],
+    )
+
+
+class TestEdgeMask:
+    """Tests for edge_mask function."""
+
+    def test_no_filters(self, edges):
+        assert edge_mask(edges, EdgeIndex.from_edges(edges)).all()
+
+    def test_bbox(self, edges):
+        mask = edge_mask(edges, EdgeIndex.from_edges(edges), bbox=(0, 0, 2, 2))
+        assert list(mask) == [True, False, True]
+
+    def test_score_bounds_drop_missing(self, edges):
+        mask = edge_mask(edges, EdgeIndex.from_edges(edges), min_score=1.0)
+        assert list(mask) == [True, False, False]
+
+    def test_separation_level(self, edges):
+        index = EdgeIndex.from_edges(edges)
+        mask = edge_mask(edges, index, separation_level=["none", "track"])
+        assert list(mask) == [False, True, True]
+
+
+class TestSelectColumns:
+    """Tests for select_columns function."""
+
+    def test_keeps_geometry(self, edges):
+        assert list(select_columns(edges, ["name"]).columns) == ["name", "geometry"]
+
+    def test_unknown_column(self, edges):
+        with pytest.raises(KeyError):
+            select_columns(edges, ["nope"])
@@ -0,0 +1,143 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import LineString
+
+from main import score_edges
+from src.reciprocal import collapse_reciprocal_edges, expand_two_way
+from tests.benchmarks.synthetic import synthetic_edges
+
+
+def make_edges(rows):
+    """rows: (u, v, key, highway, cycleway:left, reversed)"""
+    u, v, key, highway, left, reversed_ = zip(*rows)
+    return gpd.GeoDataFrame(
+        {
+            "highway": list(highway),
+            "cycleway:left": list(left),
+            "reversed": list(reversed_),
+            "length": 100.0,
+        },
+        index=pd.MultiIndex.from_arrays([u, v, key], names=["u", "v", "key"]),
+        geometry=[LineString([(a, 0), (b, 0)]) for a, b in zip(u, v)],
+    )
+
+
+class TestCollapseReciprocalEdges:
+    """Tests for collapse_reciprocal_edges function."""
+
+    def test_collapses_two_way_street(self):
+        edges = make_edges(
+            [
+                (1, 2, 0, "residential", "lane", False),
+                (2, 1, 0, "residential", "lane", True),
+            ]
+        )
+        result = collapse_reciprocal_edges(edges)
+
+        assert list(result.index) == [(1, 2, 0)]
+        assert result["two_way"].tolist() == [True]
+
+    def test_keeps_osm_direction(self):
+        # the way is drawn 2 -> 1, so keep that copy
+        edges = make_edges(
+            [
+                (1, 2, 0, "residential", np.nan, True),
+                (2, 1, 0, "residential", np.nan, False),
+            ]
+        )
+        result = collapse_reciprocal_edges(edges)
+
+        assert list(result.index) == [(2, 1, 0)]
+
+    def test_merged_way_direction(self):
+        # a merged way drawn 2 -> 1 starts with an unreversed OSM way
+        edges = make_edges(
+            [
+                (1, 2, 0, "residential", np.nan, True),
+                (2, 1, 0, "residential", np.nan, [False, True]),
+            ]
+        )
+        result = collapse_reciprocal_edges(edges)
+
+        assert list(result.index) == [(2, 1, 0)]
+
+    def test_keeps_different_edges(self):
+        edges = make_edges(
+            [
+                (1, 2, 0, ["residential", "service"], np.nan, False),
+                (2, 1, 0, ["residential", "tertiary"], np.nan, True),
+                (2, 3, 0, "residential", np.nan, False),
+            ]
+        )
+        result = collapse_reciprocal_edges(edges)
+
+        assert len(result) == 3
+        assert not result["two_way"].any()
+
+    def test_parallel_pairs(self):
+        edges = make_edges(
+            [
+                (1, 2, 0, "residential", np.nan, False),
+                (1, 2, 1, "residential", np.nan, False),
+                (2, 1, 0, "residential", np.nan, True),
+                (2, 1, 1, "residential", np.nan, True),
+            ]
+        )
+        result = collapse_reciprocal_edges(edges)
+
+        assert list(result.index) == [(1, 2, 0), (1, 2, 1)]
+
+
+class TestExpandTwoWay:
+    """Tests for expand_two_way function."""
+
+    def test_adds_reverse_copies(self):
+        edges = make_edges(
+            [
+                (1, 2, 0, "residential", "lane", False),
+                (2, 1, 0, "residential", "lane", True),
+                (2, 1, 1, "primary", None, True),  # other street, one way
+            ]
+        )
+        collapsed = collapse_reciprocal_edges(edges).assign(
+            composite_score_directed=[2.0, 3.0],
+            composite_score_directed_backward=[1.0, None],
+        )
+        result = expand_two_way(collapsed)
+
+        # the reverse copy takes the next free key
+        assert list(result.index) == [(1, 2, 0), (2, 1, 1), (2, 1, 2)]
+        back = result.loc[(2, 1, 2)]
+        assert back["composite_score_directed"] == 1.0
+        assert back["composite_score_directed_backward"] == 2.0
+        assert back["reversed"]
+        assert back["geometry"].equals(LineString([(2, 0), (1, 0)]))
+
+    def test_nothing_collapsed(self):
+        edges = make_edges([(1, 2, 0, "residential", "lane", False)])
+        assert expand_two_way(edges) is edges
+
+    def test_matches_uncollapsed_scores(self):
+        # half the streets two-way, as osmnx returns them
+        edges = synthetic_edges(500)
+        edges = edges[~edges.index.duplicated()]
+        two_way = edges.iloc[::2].assign(reversed=False, oneway=False)
+        reverse = two_way.set_geometry(shapely.reverse(two_way.geometry.values))
+        reverse.index = two_way.index.reorder_levels(["v", "u", "key"])
+        reverse.index.names = ["u", "v", "key"]
+        edges = pd.concat([two_way, edges.iloc[1::2], reverse.assign(reversed=True)])
+        edges = edges[~edges.index.duplicated()]
+
+        expected = score_edges(edges, "test")
+        result = expand_two_way(score_edges(edges, "test", collapse_two_way=True))
+
+        def by_pair(scored):
+            scores = scored["composite_score_directed"].reset_index()
+            return scores.sort_values(["u", "v", "composite_score_directed"])[
+                ["u", "v", "composite_score_directed"]
+            ].reset_index(drop=True)
+
+        assert len(result) == len(expected)
+        assert by_pair(result).equals(by_pair(expected))
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.rescore import CategoryCodes, rescore
+from src.stressmodel.spec import SPEC
+
+
+@pytest.fixture
+def edges():
+    return pd.DataFrame(
+        {
+            "separation_level": ["lane", "none", None],
+            "street_classification": ["residential", "motorway", "residential"],
+            "maxspeed_int": [20.0, 45.0, np.nan],
+        }
+    )
+
+
+@pytest.fixture
+def category_scores():
+    return {
+        "separation_level": {"lane": 2.5, "none": 4},
+        "street_classification": {"residential": 2, "motorway": 4},
+        "speed_limit": {"20_mph_or_less": 0, "50_mph": 3.5},
+    }
+
+
+class TestCategoryCodes:
+    """Tests for CategoryCodes."""
+
+    def test_speed_buckets(self, edges):
+        codes = CategoryCodes.from_edges(edges)
+        speed = codes.codes["speed_limit"]
+        categories = codes.categories["speed_limit"] + ["missing"]
+        assert [categories[c] for c in speed] == ["20_mph_or_less", "50_mph", "missing"]
+
+    def test_missing_classification(self, edges):
+        codes = CategoryCodes.from_edges(edges.assign(street_classification=None))
+        categories = codes.categories["street_classification"]
+        assert categories == [SPEC.default_classification]
+        assert (codes.codes["street_classification"] == 0).all()
+
+    def test_missing_separation_level(self, edges):
+        codes = CategoryCodes.from_edges(edges)
+        assert codes.codes["separation_level"][2] == len(
+            codes.categories["separation_level"]
+        )
+
+
+class TestRescore:
+    """Tests for rescore function."""
+
+    def test_weighted_mean(self, edges, category_scores):
+        weights = {"separation_level": 60, "street_classification": 20, "speed_limit": 20}
+        scores = rescore(CategoryCodes.from_edges(edges), category_scores, weights)
+
+        assert scores.dtype == np.float32
+        np.testing.assert_allclose(
+            scores,
+            [
+                (60 * 2.5 + 20 * 2 + 20 * 0) / 100,
+                (60 * 4 + 20 * 4 + 20 * 3.5) / 100,
+                2.0,  # only street classification is known
+            ],
+            rtol=1e-6,
+        )
+
+    def test_unscored_classification(self, edges, category_scores):
+        # scored as the unknown classification, like the pipeline does
+        category_scores["street_classification"] = {
+            "residential": 2,
+            SPEC.default_classification: 3,
+        }
+        weights = {"separation_level": 0, "street_classification": 1, "speed_limit": 0}
+        scores = rescore(CategoryCodes.from_edges(edges), category_scores, weights)
+        np.testing.assert_allclose(scores, [2, 3, 2])
+
+    def test_zero_weights(self, edges, category_scores):
+        weights = {"separation_level": 0, "street_classification": 0, "speed_limit": 0}
+        scores = rescore(CategoryCodes.from_edges(edges), category_scores, weights)
+        assert np.isnan(scores).all()
@@ -0,0 +1,141 @@
+import dataclasses
+
+import geopandas as gpd
+import pyarrow.dataset as ds
+import pytest
+import shapely
+
+import src.route_batch
+from src.route import compute_routes_from_census_blocks_to_all_schools
+from src.route_batch import load_manifest, read_routes, routes_dataset, run_routes
+from tests.benchmarks.synthetic import grid_graph, grid_points
+
+KEY = ["to_school_id", "from_block_geoid"]
+
+
+@pytest.fixture(scope="module")
+def graph():
+    G = grid_graph(6)
+    G.add_node(-1, x=325500.0, y=0.0)  # unreachable
+    return G
+
+
+@pytest.fixture(scope="module")
+def blocks():
+    return grid_points(grid_graph(6), 7)
+
+
+@pytest.fixture(scope="module")
+def schools(graph):
+    return gpd.GeoDataFrame(
+        {"Name": ["North", "South", "East"], "GlobalID": ["n", "s", "e"]},
+        geometry=shapely.points([(325050, 4695450), (325450, 4695020), (325500, 0)]),
+        crs=graph.graph["crs"],
+    )
+
+
+def sort(routes):
+    return routes.sort_values(KEY).reset_index(drop=True)
+
+
+class TestRunRoutes:
+    """Tests for run_routes function."""
+
+    def test_matches_in_memory(self, graph, blocks, schools, tmp_path):
+        expected, expected_errors = compute_routes_from_census_blocks_to_all_schools(
+            graph, blocks, schools
+        )
+        errors = run_routes(graph, blocks, schools, str(tmp_path), chunk_size=3)
+
+        routes = read_routes(str(tmp_path))
+        assert routes.crs == expected.crs
+        assert sorted(errors) == sorted(expected_errors)
+        assert sort(routes)[expected.columns].equals(sort(expected))
+
+        manifest = load_manifest(str(tmp_path))
+        assert len(manifest["chunks"]) == 3 * 3
+        assert sum(c["rows"] for c in manifest["chunks"].values()) == len(routes)
+
+    def test_resume(self, graph, blocks, schools, tmp_path, monkeypatch):
+        route = src.route_batch.compute_routes_from_census_blocks_to_school
+        calls = []
+
+        def crash_after_four(*args, **kwargs):
+            if len(calls) == 4:
+                raise KeyboardInterrupt
+            calls.append(args[2]["GlobalID"])
+            return route(*args, **kwargs)
+
+        monkeypatch.setattr(
+            src.route_batch,
+            "compute_routes_from_census_blocks_to_school",
+            crash_after_four,
+        )
+        with pytest.raises(KeyboardInterrupt):
+            run_routes(graph, blocks, schools, str(tmp_path), chunk_size=3)
+        assert len(load_manifest(str(tmp_path))["chunks"]) == 4
+
+        # completed chunks are readable before the run finishes
+        assert set(read_routes(str(tmp_path))["to_school_id"]) == {"n", "s"}
+
+        calls.clear()
+        monkeypatch.setattr(
+            src.route_batch, "compute_routes_from_census_blocks_to_school", route
+        )
+        run_routes(graph, blocks, schools, str(tmp_path), chunk_size=3)
+        routes = read_routes(str(tmp_path))
+
+        assert not routes.duplicated(KEY).any()
+        assert len(routes) == 2 * len(blocks)  # "e" is unreachable
+
+    def test_errors_of_every_school(self, graph, blocks, schools, tmp_path):
+        far = schools.assign(geometry=shapely.points([(325500, 0)] * 3))
+        errors = run_routes(graph, blocks, far, str(tmp_path), weight="length")
+        assert len(errors) == 3 * len(blocks)
+        assert {e.split(":")[0] for e in errors} == {"North", "South", "East"}
+        assert read_routes(str(tmp_path)).empty
+
+    def test_other_parameters(self, graph, blocks, schools, tmp_path):
+        run_routes(graph, blocks, schools.head(1), str(tmp_path))
+        with pytest.raises(ValueError):
+            run_routes(graph, blocks, schools.head(1), str(tmp_path), weight="length")
+        with pytest.raises(ValueError):
+            run_routes(graph, blocks.head(3), schools.head(1), str(tmp_path))
+
+    def test_other_network(self, graph, blocks, schools, tmp_path, monkeypatch):
+        run_routes(graph, blocks, schools.head(1), str(tmp_path))
+        assert len(load_manifest(str(tmp_path))["chunks"]) == 1
+
+        # rescored network
+        rescored = graph.copy()
+        u, v, key = next(iter(rescored.edges(keys=True)))
+        rescored.edges[u, v, key]["composite_score"] += 1
+        with pytest.raises(ValueError):
+            run_routes(rescored, blocks, schools.head(1), str(tmp_path))
+
+        # other model
+        other = dataclasses.replace(src.route_batch.SPEC, hash="other")
+        monkeypatch.setattr(src.route_batch, "SPEC", other)
+        with pytest.raises(ValueError):
+            run_routes(graph, blocks, schools.head(1), str(tmp_path))
+
+
+class TestReadRoutes:
+    """Tests for read_routes function."""
+
+    def test_columns_and_filter(self, graph, blocks, schools, tmp_path):
+        run_routes(graph, blocks, schools, str(tmp_path), chunk_size=2)
+
+        routes = read_routes(
+            str(tmp_path),
+            columns=["to_school_id", "sum_length"],
+            filter=ds.field("to_school_id") == "s",
+        )
+        assert list(routes.columns) == ["to_school_id", "sum_length"]
+        assert set(routes["to_school_id"]) == {"s"}
+        assert len(routes) == len(blocks)
+
+    def test_lazy_dataset(self, graph, blocks, schools, tmp_path):
+        run_routes(graph, blocks, schools, str(tmp_path), chunk_size=2)
+        batches = list(routes_dataset(str(tmp_path)).to_batches())
+        assert sum(b.num_rows for b in batches) == 2 * len(blocks)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schema import compact_edges, to_label
+
+
+class TestToLabel:
+    """Tests for to_label function."""
+
+    def test_string(self):
+        assert to_label("residential") == "residential"
+
+    def test_list(self):
+        assert to_label(["residential", "service"]) == "residential;service"
+        assert to_label(np.array(["25 mph", "30 mph"])) == "25 mph;30 mph"
+
+    def test_missing(self):
+        assert to_label(np.nan) is None
+        assert to_label(None) is None
+        assert to_label([]) is None
+
+
+class TestCompactEdges:
+    """Tests for compact_edges function."""
+
+    @pytest.fixture
+    def edges(self):
+        return pd.DataFrame(
+            {
+                "highway": ["residential", ["path", "service"]],
+                "lanes": ["2", ["2", "3"]],
+                "lanes_int": pd.array([2, pd.NA], dtype="Int64"),
+                "maxspeed_int_score": [1.0, np.nan],
+                "separation_level": ["lane", "none"],
+                "composite_score": [1.5, 3.25],
+            }
+        )
+
+    def test_dtypes(self, edges):
+        compact = compact_edges(edges)
+        assert compact["highway"].dtype == "category"
+        assert compact["separation_level"].dtype == "category"
+        assert compact["lanes_int"].dtype == np.float32
+        assert compact["composite_score"].dtype == np.float32
+        assert list(compact["highway"]) == ["residential", "path;service"]
+        assert np.isnan(compact["lanes_int"].iloc[1])
+
+    def test_keeps_unknown_categories(self, edges):
+        edges["separation_level"] = ["lane", "opposite_lane"]
+        compact = compact_edges(edges)
+        assert list(compact["separation_level"]) == ["lane", "opposite_lane"]
+
+    def test_drops_raw_tags(self, edges):
+        assert "lanes" not in compact_edges(edges).columns
+        assert "lanes" in compact_edges(edges, keep_raw_tags=True).columns
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.stressmodel.separation_level import run, run_directed
+from src.tags import to_arrow_tags
+
+
+@pytest.fixture
+def edges():
+    return pd.DataFrame(
+        {
+            "highway": ["residential"] * 5 + ["path"],
+            "bicycle": [np.nan] * 5 + ["designated"],
+            "cycleway": [np.nan, ["lane", "shared_lane"], *[np.nan] * 4],
+            "cycleway:both": [np.nan] * 6,
+            "cycleway:left": [np.nan, np.nan, "lane", "lane", "lane", np.nan],
+            "cycleway:right": ["track", *[np.nan] * 5],
+            "cycleway:buffer": [np.nan, "yes", *[np.nan] * 4],
+            "cycleway:separation": ["flex_post", *[np.nan] * 5],
+            "oneway": [False, False, True, True, False, True],
+            "oneway:bicycle": [np.nan, np.nan, np.nan, "no", np.nan, np.nan],
+            "reversed": [False, False, False, False, True, False],
+        }
+    )
+
+
+class TestRun:
+    """Tests for run function."""
+
+    def test_best_of_all_tags(self, edges):
+        levels, scores = run(edges)
+        assert levels.tolist() == [
+            "lane_buffered",  # track with flex posts
+            "lane_buffered",  # lane with buffer, from a list
+            "lane",
+            "lane",
+            "lane",
+            "separate",  # path + bicycle=designated
+        ]
+        assert scores.tolist() == [1.5, 1.5, 2.5, 2.5, 2.5, 0]
+
+    def test_arrow_tags(self, edges):
+        levels, scores = run(edges)
+        arrow_levels, arrow_scores = run(to_arrow_tags(edges))
+        assert arrow_levels.tolist() == levels.tolist()
+        assert arrow_scores.tolist() == scores.tolist()
+
+    def test_no_in_list(self, edges):
+        # "no" in a merged way's list means no infrastructure, not the best level
+        left = edges["cycleway:left"].astype(object)
+        left[2] = ["no", "shared_lane"]
+        edges["cycleway:left"] = left
+        levels, scores = run(edges)
+        assert levels[2] == "shared_lane"
+        assert scores[2] == 3.5
+
+
+class TestRunDirected:
+    """Tests for run_directed function."""
+
+    def test_side_tags(self, edges):
+        result = run_directed(edges)
+        forward = result["separation_level_forward"].tolist()
+        backward = result["separation_level_backward"].tolist()
+
+        # track on the right only serves travel along the way
+        assert (forward[0], backward[0]) == ("lane_buffered", "none")
+        # untagged sides
+        assert (forward[1], backward[1]) == ("lane_buffered", "lane_buffered")
+        # oneway: every side serves the allowed direction, no way back
+        assert forward[2] == "lane" and pd.isna(backward[2])
+        # contraflow lane on the left of a oneway street
+        assert (forward[3], backward[3]) == ("none", "lane")
+        # edge drawn against the way: left side is its forward direction
+        assert (forward[4], backward[4]) == ("lane", "none")
+        assert forward[5] == "separate" and pd.isna(backward[5])
+
+    def test_scores(self, edges):
+        result = run_directed(edges)
+        assert result["separation_level_forward_score"].tolist()[:2] == [1.5, 1.5]
+        assert np.isnan(result["separation_level_backward_score"][2])
@@ -0,0 +1,48 @@
+import copy
+
+import numpy as np
+import pytest
+
+from src.stressmodel.speed import get_speed_score
+from src.stressmodel.spec import SPEC, compile_spec, threshold_scores
+
+
+class TestThresholdScores:
+    """Tests for threshold_scores function."""
+
+    def test_matches_scalar_speed_score(self):
+        speeds = np.array([0, 20, 21, 25, 30, 35, 50, 51, 80, np.nan])
+        result = threshold_scores(
+            speeds, SPEC.speed_thresholds, SPEC.speed_scores, missing=np.nan
+        )
+        expected = [get_speed_score(s) for s in speeds]
+        np.testing.assert_array_equal(result, expected)
+
+    def test_missing(self):
+        result = threshold_scores(
+            np.array([np.nan]), SPEC.lanes_thresholds, SPEC.lanes_scores, missing=0.0
+        )
+        assert result[0] == 0.0
+
+
+class TestCompileSpec:
+    """Tests for compile_spec function."""
+
+    def test_default_profile_uses_parameter_weights(self):
+        assert SPEC.profiles["default"] == pytest.approx(
+            {
+                "separation_level_score": 0.6,
+                "maxspeed_int_score": 0.2,
+                "street_classification_score": 0.2,
+                "lanes_int_score": 0.0,
+            }
+        )
+
+    def test_section_hash_only_changes_for_changed_section(self):
+        raw = copy.deepcopy(SPEC.raw)
+        raw["lanes"]["categories"]["3_lanes"]["score"] = 3
+        changed = compile_spec(raw)
+
+        assert changed.hash != SPEC.hash
+        assert changed.section_hash("lanes") != SPEC.section_hash("lanes")
+        assert changed.section_hash("speed_limit") == SPEC.section_hash("speed_limit")
@@ -0,0 +1,13 @@
+from src.importtime import HEAVY_MODULES, measure
+
+
+class TestApiStartup:
+    """Tests for the API's import path."""
+
+    def test_api_does_not_import_heavy_modules(self):
+        times = measure("api")
+        assert "api" in times
+        assert [m for m in HEAVY_MODULES if m in times] == []
+
+    def test_main_defers_osmnx(self):
+        assert "osmnx" not in measure("main")
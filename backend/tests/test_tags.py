@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from src.tags import (
+    TAG_DTYPE,
+    flatten,
+    labels,
+    max_value,
+    segment_argmin,
+    segment_best,
+    segment_max,
+    single_value,
+    to_arrow_tags,
+)
+
+VALUES = pd.Series([["30 mph", "25 mph"], None, "25 mph", np.nan, np.array(["20"])])
+
+
+def parse_speed(value):
+    try:
+        return float(value.replace("mph", ""))
+    except ValueError:
+        return np.nan
+
+
+class TestFlatten:
+    """Tests for flatten function."""
+
+    def test_items_and_offsets(self):
+        tags = flatten(VALUES)
+        assert tags.dictionary.tolist() == ["30 mph", "25 mph", "20"]
+        assert tags.codes.tolist() == [0, 1, 1, 2]
+        assert tags.offsets.tolist() == [0, 2, 2, 3, 3, 4]
+        assert tags.rows.tolist() == [0, 0, 2, 4]
+
+    def test_arrow_column(self):
+        arrow = to_arrow_tags(pd.DataFrame({"maxspeed": VALUES}))["maxspeed"]
+        tags, expected = flatten(arrow), flatten(VALUES)
+        assert tags.dictionary[tags.codes].tolist() == [
+            "30 mph",
+            "25 mph",
+            "25 mph",
+            "20",
+        ]
+        assert tags.offsets.tolist() == expected.offsets.tolist()
+
+    def test_missing_items_dropped(self):
+        tags = flatten(pd.Series([["lane", np.nan], [np.nan], 3]))
+        assert tags.dictionary[tags.codes].tolist() == ["lane", "3"]
+        assert tags.offsets.tolist() == [0, 1, 1, 2]
+
+
+class TestToArrowTags:
+    """Tests for to_arrow_tags function."""
+
+    def test_only_tag_columns(self):
+        edges = pd.DataFrame(
+            {
+                "osmid": [1, [2, 3]],
+                "highway": ["residential", ["path", "service"]],
+                "name": ["Elm Street", np.nan],
+                "oneway": [True, False],
+                "length": [1.0, 2.0],
+            }
+        )
+        arrow = to_arrow_tags(edges)
+
+        assert arrow["highway"].dtype == TAG_DTYPE
+        assert arrow["name"].dtype == TAG_DTYPE
+        assert arrow["osmid"].dtype == object
+        assert arrow["oneway"].dtype == bool
+        assert list(arrow["highway"].tolist()[1]) == ["path", "service"]
+        assert pd.isna(arrow["name"].tolist()[1])
+
+    def test_idempotent(self):
+        arrow = to_arrow_tags(pd.DataFrame({"highway": ["residential", "path"]}))
+        again = to_arrow_tags(arrow)
+        assert again["highway"].dtype == TAG_DTYPE
+        assert labels(again["highway"]).tolist() == ["residential", "path"]
+
+
+class TestSegments:
+    """Tests for segment_max, segment_argmin and segment_best functions."""
+
+    def test_max(self):
+        offsets = np.array([0, 2, 2, 4])
+        result = segment_max(np.array([1.0, 3.0, np.nan, np.nan]), offsets)
+        assert result[0] == 3.0
+        assert np.isnan(result[1]) and np.isnan(result[2])
+
+    def test_argmin_first_of_ties(self):
+        offsets = np.array([0, 3, 3, 5])
+        keys = np.array([2.0, 1.0, 1.0, 0.0, 0.0])
+        assert segment_argmin(keys, offsets).tolist() == [1, -1, 3]
+
+    def test_best(self):
+        offsets = np.array([0, 2, 2])
+        values = np.array(["track", "lane"], dtype=object)
+        result = segment_best(np.array([1.0, 2.5]), values, offsets, "none")
+        assert result.tolist() == ["track", "none"]
+
+
+class TestValues:
+    """Tests for max_value, single_value and labels functions."""
+
+    def test_max_value(self):
+        result = max_value(VALUES, parse_speed)
+        assert result[0] == 30.0 and result[2] == 25.0 and result[4] == 20.0
+        assert np.isnan(result[1]) and np.isnan(result[3])
+
+    def test_single_value(self):
+        assert single_value(VALUES).tolist() == [None, None, "25 mph", None, "20"]
+
+    def test_labels(self):
+        assert labels(VALUES).tolist() == ["30 mph;25 mph", None, "25 mph", None, "20"]
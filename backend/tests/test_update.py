@@ -0,0 +1,163 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString, Point
+
+from src.osc import OsmChange, read_osc
+from src.update import affected_bbox, splice_network, touched_mask
+
+OSC = """<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6">
+  <create>
+    <node id="5" lat="42.39" lon="-71.1"/>
+  </create>
+  <modify>
+    <way id="20">
+      <nd ref="1"/><nd ref="2"/>
+      <tag k="highway" v="residential"/>
+      <tag k="cycleway:right" v="lane"/>
+    </way>
+  </modify>
+  <delete>
+    <way id="30"/>
+    <node id="4"/>
+  </delete>
+</osmChange>
+"""
+
+
+def network(ways, osm_nodes, xs):
+    """Consolidated-looking network: node i has OSM ids osm_nodes[i]."""
+    nodes = gpd.GeoDataFrame(
+        {"osmid_original": osm_nodes},
+        index=pd.RangeIndex(len(osm_nodes), name="osmid"),
+        geometry=[Point(x, 42.39) for x in xs],
+        crs="EPSG:4326",
+    )
+    u, v, osmid = zip(*ways)
+    first = lambda ids: ids[0] if isinstance(ids, list) else ids  # noqa: E731
+    edges = gpd.GeoDataFrame(
+        {
+            "osmid": osmid,
+            "u_original": [first(osm_nodes[i]) for i in u],
+            "v_original": [first(osm_nodes[i]) for i in v],
+            "length": 80.0,
+        },
+        index=pd.MultiIndex.from_arrays([u, v, [0] * len(u)], names=["u", "v", "key"]),
+        geometry=[LineString([(xs[a], 42.39), (xs[b], 42.39)]) for a, b in zip(u, v)],
+        crs="EPSG:4326",
+    )
+    return nodes, edges
+
+
+@pytest.fixture
+def change(tmp_path):
+    path = tmp_path / "change.osc"
+    path.write_text(OSC)
+    return read_osc(str(path))
+
+
+class TestReadOsc:
+    """Tests for read_osc function."""
+
+    def test_changes(self, change):
+        assert change.ways == {
+            20: {"tags": {"highway": "residential", "cycleway:right": "lane"}, "nodes": [1, 2]}
+        }
+        assert change.deleted_ways == {30}
+        assert change.nodes == {5: (-71.1, 42.39)}
+        assert change.deleted_nodes == {4}
+        assert change.touched_ways == {20, 30}
+
+
+class TestTouchedMask:
+    """Tests for touched_mask function."""
+
+    def test_ways_and_nodes(self, change):
+        _, edges = network(
+            [(0, 1, 10), (1, 2, [10, 20]), (2, 3, 11), (3, 0, 12)],
+            [1, 2, [3, 4], 6],
+            [0.0, 0.001, 0.002, 0.003],
+        )
+        # 20 is in a merged edge; node 4 was merged into node 2 (not an end)
+        assert touched_mask(edges, change).tolist() == [False, True, False, False]
+
+        edges["v_original"] = [2, 3, 4, 1]
+        assert touched_mask(edges, change).tolist() == [False, True, True, False]
+
+    def test_empty_change(self):
+        _, edges = network([(0, 1, 10)], [1, 2], [0.0, 0.001])
+        assert not touched_mask(edges, OsmChange()).any()
+
+
+class TestAffectedBbox:
+    """Tests for affected_bbox function."""
+
+    def test_buffer_and_within(self, change):
+        _, edges = network([(0, 1, 20)], [1, 2], [-71.11, -71.109])
+        change.nodes[7] = (10.0, 10.0)  # outside the network's bounds
+
+        left, bottom, right, top = affected_bbox(
+            edges, change, within=(-71.2, 42.3, -71.0, 42.5), buffer=100
+        )
+        assert top - 42.39 == pytest.approx(100 / 111_320)
+        assert left < -71.11 and right > -71.1 and right < -71.09
+
+    def test_created_way_between_existing_nodes(self):
+        nodes, edges = network(
+            [(0, 1, 10), (1, 2, 11)], [1, 2, [3, 4]], [-71.11, -71.109, -71.108]
+        )
+        change = OsmChange(ways={40: {"tags": {}, "nodes": [1, 4]}})
+        assert not touched_mask(edges, change).any()
+        assert affected_bbox(edges.iloc[:0], change) is None
+
+        left, bottom, right, top = affected_bbox(
+            edges.iloc[:0], change, nodes=nodes, buffer=0
+        )
+        assert (left, right) == (-71.11, -71.108)
+        assert bottom == top == 42.39
+
+    def test_nothing_located(self):
+        _, edges = network([(0, 1, 20)], [1, 2], [0.0, 0.001])
+        assert affected_bbox(edges.iloc[:0], OsmChange()) is None
+
+
+class TestSpliceNetwork:
+    """Tests for splice_network function."""
+
+    def test_rewires_to_cached_nodes(self, change):
+        nodes, edges = network(
+            [(0, 1, 10), (1, 2, 20), (2, 1, 20)], [9, 1, 2], [0.0, 0.001, 0.002]
+        )
+        # re-fetched neighborhood with other node ids: way 20 now runs
+        # from OSM node 1 to 2 and on to a new node 8
+        new_nodes, new_edges = network(
+            [(2, 1, 20), (1, 0, 20), (3, 2, 10)], [8, 2, 1, 9], [0.003, 0.002, 0.001, 0.0]
+        )
+
+        nodes, edges, removed, added = splice_network(
+            nodes, edges, new_nodes, new_edges, change
+        )
+
+        assert list(removed) == [(1, 2, 0), (2, 1, 0)]
+        # node 2 (OSM 2) is reused, OSM node 8 gets the new id 3
+        assert list(added) == [(1, 2, 0), (2, 3, 0)]
+        assert list(edges.index) == [(0, 1, 0), (1, 2, 0), (2, 3, 0)]
+        assert nodes.loc[3, "osmid_original"] == 8
+        assert np.array_equal(edges.loc[(2, 3, 0), "osmid"], 20)
+
+    def test_created_way_between_existing_nodes(self):
+        nodes, edges = network([(0, 1, 10), (1, 2, 11)], [1, 2, 3], [0.0, 0.001, 0.002])
+        change = OsmChange(ways={40: {"tags": {}, "nodes": [1, 3]}})
+        new_nodes, new_edges = network(
+            [(0, 1, 10), (1, 2, 11), (0, 2, 40)], [1, 2, 3], [0.0, 0.001, 0.002]
+        )
+
+        nodes, edges, removed, added = splice_network(
+            nodes, edges, new_nodes, new_edges, change
+        )
+
+        assert len(removed) == 0
+        assert list(added) == [(0, 2, 0)]
+        assert len(nodes) == 3 and len(edges) == 3
@@ -0,0 +1,115 @@
+"""
+Apply an OSM change file (.osc) to a cached city build instead of
+rebuilding it (see src/update.py):
+
+    python update.py "Somerville, Massachusetts, USA" changes.osc [--verify]
+
+The city must have been built with the stage cache (the API's builds,
+build_network) so its fetched network is under cache/stages/network/ and
+its scored edges are an artifact. Both are patched in place. Running API
+workers serve the new artifact from their next request for the city (they
+reload an artifact when its file changes), no restart needed.
+
+--verify also rebuilds the city from scratch and compares the two.
+"""
+
+import argparse
+import json
+import logging
+
+from main import (
+    COLLAPSE_TWO_WAY,
+    OUTPUT_COLUMNS,
+    get_network,
+    network_cache_key,
+    prepare_data_for_place,
+    score_edges,
+)
+from src import artifacts
+from src.instrument import stage
+from src.osc import read_osc
+from src.stage_cache import load_stage, store_stage
+from src.update import (
+    affected_bbox,
+    compare_edges,
+    patch_edges,
+    splice_network,
+    touched_mask,
+)
+
+
+def update_place(place: str, osc_path: str, verify: bool = False) -> dict:
+    """
+    Patch a place's cached network and artifact with an OSM change file.
+
+    Returns:
+        dict report: touched/removed/added edge counts, and with verify=True
+        the comparison with a full rebuild (see compare_edges).
+    """
+    change = read_osc(osc_path)
+
+    network_key = network_cache_key(place)
+    cached = load_stage("network", network_key)
+    scored = artifacts.load_artifact(place)
+    if cached is None or scored is None:
+        raise FileNotFoundError(
+            f"No cached build of '{place}', run build_network('{place}') first"
+        )
+    nodes, edges = cached
+
+    touched = touched_mask(edges, change)
+    report = {"place": place, "touched_edges": int(touched.sum())}
+
+    bbox = affected_bbox(
+        edges[touched], change, within=edges.geometry.total_bounds, nodes=nodes
+    )
+    if bbox is None:
+        report.update(removed_edges=0, added_edges=0)
+        return report
+
+    # re-fetch and consolidate only the neighborhood of the change
+    new_nodes, new_edges = get_network(place, bbox=bbox)
+
+    with stage("splice", place) as record:
+        nodes, edges, removed, added = splice_network(
+            nodes, edges, new_nodes, new_edges, change
+        )
+        record.rows = len(added)
+    store_stage("network", network_key, (nodes, edges))
+
+    # score only the new edges, then patch them into the artifact
+    if len(added):
+        new_scored = score_edges(
+            edges.loc[added], place, collapse_two_way=COLLAPSE_TWO_WAY
+        )
+    else:
+        new_scored = scored.iloc[:0]
+    patched = patch_edges(scored, removed, new_scored[OUTPUT_COLUMNS])
+
+    with stage("save_artifact", place, rows=len(patched)):
+        artifacts.save_artifact(place, patched)
+
+    report.update(removed_edges=len(removed), added_edges=len(added))
+
+    if verify:
+        _, rebuilt = prepare_data_for_place(place, collapse_two_way=COLLAPSE_TWO_WAY)
+        report["verify"] = compare_edges(patched, rebuilt[OUTPUT_COLUMNS])
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("place", help='e.g. "Somerville, Massachusetts, USA"')
+    parser.add_argument("osc", help="OSM change file (.osc or .osc.gz)")
+    parser.add_argument(
+        "--verify", action="store_true", help="compare with a full rebuild"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(json.dumps(update_place(args.place, args.osc, verify=args.verify), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -85,4 +85,7 @@ def first_if_list(series: pd.Series) -> pd.Series:
     -----
     >>> edges['cycleway'] = first_if_list(edges['cycleway'])
     """
+    # Arrow tag columns (src/tags.py): every value is a list
+    if isinstance(series.dtype, pd.ArrowDtype) and hasattr(series, "list"):
+        return series.list[0]
     return series.apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else x)
@@ -9,6 +9,9 @@ cp backend/data/out/main/cambridge_streets.geojson frontend/public/cambridge_str
 # copy everett
 cp backend/data/out/main/everett_streets.geojson frontend/public/everett_streets.geojson
 
+# copy model spec
+cp backend/src/stressmodel/model_spec.json frontend/src/data/model_spec.json
+
 # copy charts, if any
 cp backend/data/out/notebook/chart*.html deployed-charts
 
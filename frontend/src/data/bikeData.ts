@@ -1,5 +1,7 @@
 import type { BikeInfrastructureModel } from '@/types'
 
+import modelSpec from './model_spec.json'
+
 /**
  * BIKE INFRASTRUCTURE SCORING MODEL
  *
@@ -15,143 +17,14 @@ import type { BikeInfrastructureModel } from '@/types'
  * 1. Read these fields from your GeoJSON
  * 2. Look up the score for each category in this model
  * 3. Calculate a weighted composite score based on the model weights
+ *
+ * The categories, scores and weights come from model_spec.json, which is copied
+ * from the backend (backend/src/stressmodel/model_spec.json, see copy.sh) so the
+ * Python pipeline and the frontend always use the same model.
  */
 
 export const BIKE_INFRASTRUCTURE_MODEL: BikeInfrastructureModel = {
-  // 1️⃣ Separation Level (60%)
-  separation_level: {
-    weight: 60,
-    displayLabel: 'Separation Level',
-    defaultCategory: 'none',
-    img: '',
-    link: 'https://wiki.openstreetmap.org/wiki/Key:cycleway',
-    notes: '',
-    categories: {
-      separate: {
-        score: 0,
-        displayLabel: 'Completely Separated',
-        img: '',
-        notes: 'Completely separated infrastructure',
-      },
-      track: {
-        score: 1,
-        displayLabel: 'Protected Track',
-        img: '',
-        notes: 'Physically separated bike track (protected bike lane)',
-      },
-      lane_buffered: {
-        score: 1.5,
-        displayLabel: 'Buffered Bike Lane',
-        img: '',
-        notes:
-          'Could be a painted buffer or physical buffer (e.g., bollards) separating bike lane from traffic. In the data, sometimes used interchangeably with "track".',
-      },
-      lane: {
-        score: 2.5,
-        displayLabel: 'Painted Bike Lane',
-        img: '',
-        notes: 'Dedicated bike lane painted on the road, not physically separated from traffic',
-      },
-      share_busway: {
-        score: 3,
-        displayLabel: 'Shared Bus Lane',
-        img: '',
-        notes: 'Cyclists share a dedicated lane with buses',
-      },
-      shared_lane: {
-        score: 3.5,
-        displayLabel: 'Shared Lane',
-        img: '',
-        notes: 'Cyclists share a lane with motor vehicle traffic (sharrows, marked shared lanes)',
-      },
-      none: {
-        score: 4,
-        displayLabel: 'No Separation',
-        img: '',
-        notes: 'No separation & probably no markings',
-      },
-    },
-  },
-
-  // 2️⃣ Street Classification / Busyness (20%)
-  street_classification: {
-    weight: 20,
-    displayLabel: 'Busyness',
-    defaultCategory: 'residential',
-    img: '',
-    notes:
-      'Evaluates the type of street and its primary function. Lower-traffic streets and dedicated paths score higher.',
-    categories: {
-      dedicated_path: {
-        score: 0,
-        displayLabel: 'Dedicated Path',
-        img: '',
-        notes:
-          'Path dedicated exclusively to cyclists and pedestrians, separate from the road network',
-      },
-      residential: {
-        score: 2,
-        displayLabel: 'Residential Street',
-        img: '',
-        notes: 'Low-traffic residential streets with minimal through traffic',
-      },
-      'medium-capacity': {
-        score: 3,
-        displayLabel: 'Medium-Capacity Road',
-        notes: 'Arterial roads or collectors with moderate to high traffic volumes',
-      },
-      motorway: {
-        score: 4,
-        displayLabel: 'Motorway',
-        notes: 'High-speed highways or motorways (generally prohibited for cyclists)',
-      },
-    },
-  },
-
-  // 3️⃣ Speed Limit (20%)
-  speed_limit: {
-    weight: 20,
-    displayLabel: 'Speed Limit',
-    defaultCategory: 25, // Integer value, will be mapped to '25_mph' category
-    img: '',
-    notes: '',
-    categories: {
-      '20_mph_or_less': {
-        score: 0,
-        displayLabel: '≤ 20 mph',
-        img: '',
-        notes: '',
-      },
-      '25_mph': {
-        score: 1,
-        displayLabel: '25 mph',
-        img: '',
-        notes: '',
-      },
-      '30_mph': {
-        score: 2.5,
-        displayLabel: '30 mph',
-        img: '',
-        notes: '',
-      },
-      '40_mph': {
-        score: 3,
-        displayLabel: '40 mph',
-        img: '',
-        notes: '',
-      },
-      '50_mph': {
-        score: 3.5,
-        displayLabel: '50 mph',
-        img: '',
-        notes: '',
-      },
-      over_50_mph: {
-        score: 4,
-        displayLabel: '> 50 mph',
-        img: '',
-        notes: '',
-      },
-    },
-  },
+  separation_level: modelSpec.separation_level,
+  street_classification: modelSpec.street_classification,
+  speed_limit: modelSpec.speed_limit,
 }
@@ -5,6 +5,7 @@ export interface CategoryData {
   displayLabel: string
   img?: string
   notes: string
+  maxMph?: number | null // Upper bound of a speed_limit category (null: no upper bound)
 }
 
 export interface ParameterData {
@@ -60,14 +60,14 @@ export const calculateSpeedScore = (
 ): number | null => {
   const maxspeedValue = properties.maxspeed_int
 
-  // Helper function to map speed to category
+  // Helper function to map speed to category: the first category (in model
+  // order) whose upper bound the speed does not exceed
   const speedToCategory = (speed: number): string => {
-    if (speed <= 20) return '20_mph_or_less'
-    if (speed <= 25) return '25_mph'
-    if (speed <= 30) return '30_mph'
-    if (speed <= 40) return '40_mph'
-    if (speed <= 50) return '50_mph'
-    return 'over_50_mph'
+    const categories = Object.entries(modelConfig.speed_limit.categories)
+    const match = categories.find(
+      ([, category]) => category.maxMph == null || speed <= category.maxMph,
+    )
+    return match?.[0] ?? 'over_50_mph'
   }
 
   // Return null if data is missing